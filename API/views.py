@@ -18,6 +18,7 @@ from rest_framework.permissions import IsAuthenticated
 from .models import Equipamentos, TipoEquipamento, MarcaEquipamento
 from .serializers import EquipamentosSerializer, TipoEquipamentoSerializer, MarcaEquipamentoSerializer, ClienteSerializer
 from situacao_veiculo.models import Cliente
+from utils import pdf_jobs
 
 import re
 import unicodedata
@@ -134,9 +135,9 @@ def cliente_search(request):
     serial = (request.data.get('serial') or '').strip()
     if not serial:
         return Response({'ok': False, 'message': 'Informe o serial.'}, status=400)
-    try:
-        cliente = Cliente.objects.get(serial=serial)
-    except Cliente.DoesNotExist:
+    # Mais antigo primeiro: com cadastros ainda sem serial_norm pode haver repetidos
+    cliente = Cliente.objects.por_serial(serial).order_by('id').first()
+    if cliente is None:
         return Response({'ok': False, 'message': 'Serial não encontrado.'}, status=404)
 
     serializer = ClienteSerializer(cliente)
@@ -377,25 +378,34 @@ def generate_pdf(request):
             validade = datetime(hoje.year, hoje.month + 1, 1)
         
         template_data['validadeRelatorio'] = validade.strftime('%d/%m/%Y')
+        # Só a data: mesmos dados no mesmo dia reaproveitam o PDF do cache
         template_data['dataGeracao'] = hoje.strftime('%d/%m/%Y')
-        template_data['horaGeracao'] = hoje.strftime('%H:%M')
-        
-        # 6. Renderizar HTML e Gerar PDF
-        html_string = render_to_string('api/pdf_simulador.html', template_data)
-        pdf = html_to_pdf_weasyprint(html_string)
         
-        # 7. Retornar Resposta
-        if pdf:
-            # Retorna o PDF como anexo
-            response = HttpResponse(pdf, content_type='application/pdf')
-            raw_nome = data.get('nomeCliente') or ""
-            safe_nome = sanitize_filename_component(raw_nome)
+        # 6. Renderizar HTML e Gerar PDF (fila de PDFs; o HTML só é montado se o PDF não estiver no cache)
+
+        raw_nome = data.get('nomeCliente') or ""
+        safe_nome = sanitize_filename_component(raw_nome)
 
-            # Se não tiver nomeCliente válido, cai na data/hora
-            suffix = safe_nome or hoje.strftime('%Y-%m-%d_%H-%M')
+        # Se não tiver nomeCliente válido, cai na data/hora
+        suffix = safe_nome or hoje.strftime('%Y-%m-%d_%H-%M')
 
-            # Nome final (com acento)
-            filename = f"Simulação_de_Venda_{suffix}.pdf"
+        # Nome final (com acento)
+        filename = f"Simulação_de_Venda_{suffix}.pdf"
+
+        job, future = pdf_jobs.submeter(
+            'simulacao',
+            template_data,
+            lambda: html_to_pdf_weasyprint(render_to_string('api/pdf_simulador.html', template_data)),
+            filename=filename,
+        )
+        if data.get('async'):
+            return pdf_jobs.resposta_job(job)
+        job = pdf_jobs.aguardar(job, future)
+
+        # 7. Retornar Resposta
+        if job['status'] == pdf_jobs.STATUS_PRONTO:
+            # Retorna o PDF como anexo
+            response = pdf_jobs.resposta_pdf(job)
 
             # Fallback ASCII (sem acento) pra browsers antigos
             filename_ascii = ascii_fallback(filename) or f"Simulacao_de_Venda_{hoje.strftime('%Y-%m-%d_%H-%M')}.pdf"
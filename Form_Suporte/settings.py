@@ -100,6 +100,63 @@ CHANNEL_LAYERS = {
     },
 }
 
+# Cache compartilhado entre os workers (opções de filtro, permissões, etc.).
+# Sem REDIS_HOST (dev) cai no cache em memória local do processo.
+if os.getenv('REDIS_HOST'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': f"redis://{os.getenv('REDIS_HOST')}:6379/1",
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Intervalo (segundos) do agendador interno que marca ocorrências com prazo vencido
+# como atrasadas. 0 desativa (use o comando atualizar_status_ocorrencias no cron).
+OCORRENCIA_STATUS_INTERVALO = int(os.getenv('OCORRENCIA_STATUS_INTERVALO', '0'))
+# O agendador só roda no processo com OCORRENCIA_STATUS_AGENDADOR=1: defina em
+# exatamente um processo (não nos workers em geral nem nos comandos do manage.py).
+OCORRENCIA_STATUS_AGENDADOR = os.getenv('OCORRENCIA_STATUS_AGENDADOR', '0') in ('1', 'true', 'True')
+
+# Usuário que recebe as notificações do chat quando quem escreve é o próprio responsável
+CHAT_GESTOR_USERNAME = os.getenv('CHAT_GESTOR_USERNAME', 'welton')
+
+# Contador de notificações: por padrão chega só pelo WebSocket (ws/notifications/).
+# NOTIFICACOES_POLLING=1 faz a página também consultar /notificacoes/contar/.
+NOTIFICACOES_POLLING = os.getenv('NOTIFICACOES_POLLING', '0') in ('1', 'true', 'True')
+
+# Mensagens do chat enviadas por página (ao conectar e a cada "carregar anteriores")
+CHAT_HISTORICO_LIMITE = int(os.getenv('CHAT_HISTORICO_LIMITE', '50'))
+
+# Tamanho máximo (bytes, já decodificado) de uma imagem enviada pelo chat
+CHAT_IMAGEM_MAX_BYTES = int(os.getenv('CHAT_IMAGEM_MAX_BYTES', str(10 * 1024 * 1024)))
+
+# Cache (segundos) da consulta de situação por serial (situacao_veiculo.services.situacao)
+SITUACAO_CACHE_TIMEOUT = int(os.getenv('SITUACAO_CACHE_TIMEOUT', '600'))
+
+# Busca de serial no serviço externo quando não está em Cliente (situacao_veiculo.services.busca_externa).
+# Disjuntor: após BUSCA_EXTERNA_FALHAS falhas seguidas, responde "SEM DADOS" por BUSCA_EXTERNA_PAUSA segundos.
+BUSCA_EXTERNA_URL = os.getenv('BUSCA_EXTERNA_URL', 'http://20.83.150.13:8088/search_codes')
+BUSCA_EXTERNA_COOKIE = os.getenv('BUSCA_EXTERNA_COOKIE', 'eyJ1c2VyX2lkIjoiZWFhdGFkbWluIn0.aV_2TA.URbvR1qfUJFd6H56IRWZc_hSSp0')
+BUSCA_EXTERNA_TIMEOUT = float(os.getenv('BUSCA_EXTERNA_TIMEOUT', '5'))
+BUSCA_EXTERNA_WORKERS = int(os.getenv('BUSCA_EXTERNA_WORKERS', '4'))
+BUSCA_EXTERNA_CACHE_POSITIVO = int(os.getenv('BUSCA_EXTERNA_CACHE_POSITIVO', '600'))
+BUSCA_EXTERNA_CACHE_NEGATIVO = int(os.getenv('BUSCA_EXTERNA_CACHE_NEGATIVO', '60'))
+BUSCA_EXTERNA_FALHAS = int(os.getenv('BUSCA_EXTERNA_FALHAS', '5'))
+BUSCA_EXTERNA_PAUSA = int(os.getenv('BUSCA_EXTERNA_PAUSA', '30'))
+
+# Tradução de textos das ocorrências (PDF e /traduzir/).
+# TRADUCAO_BACKEND=local usa um backend sem rede (desenvolvimento/testes).
+TRADUCAO_BACKEND = os.getenv('TRADUCAO_BACKEND', 'deepl')
+DEEPL_API_KEY = os.getenv('DEEPL_API_KEY', '71437a8a-e2de-43da-a9d7-ef10bd2550cf:fx')
+DEEPL_API_URL = os.getenv('DEEPL_API_URL', 'https://api-free.deepl.com/v2/translate')
+TRADUCAO_TIMEOUT = float(os.getenv('TRADUCAO_TIMEOUT', '10'))
+
 CORS_ALLOW_ALL_ORIGINS = True
 # CORS_ALLOWED_ORIGINS = [
 #     "http://localhost:3000",
@@ -111,6 +168,23 @@ APPEND_SLASH = True
 MEDIA_URL = '/media/'
 MEDIA_ROOT = '/home/ubuntu/Sistema_Suporte'
 
+# Download de anexos: '' (Django envia em streaming), 'x-accel-redirect' (nginx) ou
+# 'x-sendfile' (apache/lighttpd). No nginx, DOWNLOAD_ACCEL_PREFIX é a location
+# `internal` que aponta para o MEDIA_ROOT.
+DOWNLOAD_SENDFILE_MODE = os.getenv('DOWNLOAD_SENDFILE_MODE', '')
+DOWNLOAD_ACCEL_PREFIX = os.getenv('DOWNLOAD_ACCEL_PREFIX', '/protected-media/')
+
+# ZIP de todos os anexos de uma ocorrência: cópias prontas por conjunto de anexos.
+# Extensões gravadas sem compressão: ZIP_EXTENSOES_SEM_COMPRESSAO (padrão em services/arquivos.py)
+ZIP_CACHE_DIR = os.getenv('ZIP_CACHE_DIR', os.path.join(MEDIA_ROOT, 'zip_cache'))
+ZIP_CACHE_DIAS = int(os.getenv('ZIP_CACHE_DIAS', '7'))
+
+# Fila de PDFs (utils/pdf_jobs.py): threads de renderização e PDFs prontos em disco
+PDF_JOB_WORKERS = int(os.getenv('PDF_JOB_WORKERS', '2'))
+PDF_JOB_TIMEOUT = int(os.getenv('PDF_JOB_TIMEOUT', '120'))
+PDF_CACHE_DIR = os.getenv('PDF_CACHE_DIR', os.path.join(MEDIA_ROOT, 'pdf_cache'))
+PDF_CACHE_DIAS = int(os.getenv('PDF_CACHE_DIAS', '7'))
+
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
@@ -4,6 +4,8 @@ from django.conf import settings
 from django.conf.urls.static import static
 from django.conf.urls.i18n import i18n_patterns
 
+from utils import pdf_jobs
+
 urlpatterns = [
     # URLs sem prefixo de idioma
     path('admin/', admin.site.urls),
@@ -16,6 +18,10 @@ urlpatterns = [
 
     # URL para trocar idioma
     path('i18n/', include('django.conf.urls.i18n')),
+
+    # Fila de PDFs: status e download dos jobs de renderização
+    path("pdf-jobs/<str:job_id>/", pdf_jobs.status_job_view, name="pdf_job_status"),
+    path("pdf-jobs/<str:job_id>/download/", pdf_jobs.download_job_view, name="pdf_job_download"),
 ]
 
 
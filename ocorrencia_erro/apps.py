@@ -1,3 +1,6 @@
+import os
+import sys
+
 from django.apps import AppConfig
 
 
@@ -10,4 +13,17 @@ class OcorrenciaErroConfig(AppConfig):
         """
         Este método é executado quando o aplicativo está pronto.
         É o local recomendado para importar os sinais.
-        """
\ No newline at end of file
+        """
+        import ocorrencia_erro.signals
+
+        from django.conf import settings
+        intervalo = getattr(settings, 'OCORRENCIA_STATUS_INTERVALO', 0)
+        # Só no processo designado; no runserver, não no processo pai do autoreload
+        designado = getattr(settings, 'OCORRENCIA_STATUS_AGENDADOR', False)
+        pai_do_autoreload = (
+            'runserver' in sys.argv and '--noreload' not in sys.argv
+            and os.environ.get('RUN_MAIN') != 'true'
+        )
+        if intervalo and designado and not pai_do_autoreload:
+            from ocorrencia_erro.services.status import iniciar_agendador_status
+            iniciar_agendador_status(intervalo)
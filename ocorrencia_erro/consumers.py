@@ -1,8 +1,12 @@
 import json
 import base64
+from urllib.parse import parse_qs
 from channels.generic.websocket import AsyncWebsocketConsumer
+from django.conf import settings
 from channels.db import database_sync_to_async
 from .models import ChatMessage, Record, Notificacao
+from .services.chat_contexto import carregar_contexto_chat, grupo_chat
+from .services.chat_imagens import aplicar_imagem, dados_imagem, dados_imagem_legada, ids_legados, migrar_mensagens
 from django.contrib.auth import get_user_model
 from django.db.models import Q
 import re
@@ -17,7 +21,7 @@ class ChatConsumer(AsyncWebsocketConsumer):
             return
 
         self.record_id = self.scope['url_route']['kwargs']['record_id']
-        self.record_group_name = f'chat_{self.record_id}'
+        self.record_group_name = grupo_chat(self.record_id)
 
         await self.channel_layer.group_add(
             self.record_group_name,
@@ -25,16 +29,20 @@ class ChatConsumer(AsyncWebsocketConsumer):
         )
         await self.accept()
 
-        chat_history = await self.get_chat_history()
-        for message in chat_history:
-            await self.send(text_data=json.dumps({
-                'message': message['message'],
-                'author': message['author__username'],
-                'timestamp': message['timestamp'].isoformat(),
-                'image_base64': message.get('image_base64'),
-                'image_type': message.get('image_type'),
-                'image_name': message.get('image_name')
-            }))
+        # Destinatário das notificações e código da ocorrência: resolvidos uma vez
+        # por conexão (recarregados só quando o responsável muda, ver contexto_atualizado)
+        self.contexto = await self.carregar_contexto()
+
+        # Reconexão: ws/chat/<id>/?after_id=<último id recebido> envia só o que chegou depois
+        query = parse_qs(self.scope.get('query_string', b'').decode())
+        after_id = self._cursor(query.get('after_id', [None])[0])
+        if after_id:
+            mensagens, has_more = await self.get_chat_history(after_id=after_id)
+            # Muitas mensagens perdidas: recomeça pelas últimas N em vez de reenviar tudo
+            await self.send_history(mensagens, has_more, 'reset' if has_more else 'resume')
+        else:
+            mensagens, has_more = await self.get_chat_history()
+            await self.send_history(mensagens, has_more, 'initial')
             
     async def disconnect(self, close_code):
         if self.user.is_authenticated:
@@ -43,8 +51,33 @@ class ChatConsumer(AsyncWebsocketConsumer):
                 self.channel_name
             )
 
+    @staticmethod
+    def _cursor(valor):
+        try:
+            return int(valor) if valor else None
+        except (TypeError, ValueError):
+            return None
+
+    async def send_history(self, mensagens, has_more, mode):
+        """Um único frame com uma página do histórico (ordem cronológica)."""
+        await self.send(text_data=json.dumps({
+            'type': 'history',
+            'mode': mode,
+            'messages': mensagens,
+            'has_more': has_more,
+        }))
+
     async def receive(self, text_data):
         text_data_json = json.loads(text_data)
+
+        # "Carregar anteriores": {"action": "load_older", "before_id": <id mais antigo exibido>}
+        if text_data_json.get('action') == 'load_older':
+            before_id = self._cursor(text_data_json.get('before_id'))
+            if before_id:
+                mensagens, has_more = await self.get_chat_history(before_id=before_id)
+                await self.send_history(mensagens, has_more, 'older')
+            return
+
         message = text_data_json.get('message', '')
         image_base64 = text_data_json.get('image_base64')
         image_type = text_data_json.get('image_type')
@@ -52,20 +85,19 @@ class ChatConsumer(AsyncWebsocketConsumer):
         
         # Salva a mensagem no banco de dados
         saved_message = await self.save_message(message, image_base64, image_type, image_name)
+        if saved_message is None:
+            # Anexo recusado (não é PNG/JPEG/GIF/WebP ou passa do limite): só quem enviou é avisado
+            await self.send(text_data=json.dumps({
+                'type': 'error',
+                'message': 'Imagem inválida ou grande demais.',
+            }))
+            return
 
-        # Prepara os dados para enviar para o grupo
+        # Prepara os dados para enviar para o grupo (imagem vai só como URL)
         message_data = {
             'type': 'chat_message',
-            'message': message,
-            'author': self.user.username,
-            'timestamp': saved_message.timestamp.isoformat()
+            **self.serializar_mensagem(saved_message),
         }
-        
-        # Adiciona dados da imagem se existirem
-        if image_base64:
-            message_data['image_base64'] = image_base64
-            message_data['image_type'] = image_type
-            message_data['image_name'] = image_name
 
         # Envia a mensagem para o grupo do chat
         await self.channel_layer.group_send(
@@ -74,7 +106,7 @@ class ChatConsumer(AsyncWebsocketConsumer):
         )
 
         # Lógica para enviar a notificação
-        recipient_id = await self.get_recipient_id()
+        recipient_id = self.contexto['recipient_id'] if self.contexto else None
         if recipient_id:
             recipient_group_name = f'user_{recipient_id}'
             await self.channel_layer.group_send(
@@ -86,23 +118,28 @@ class ChatConsumer(AsyncWebsocketConsumer):
                     'record_id': self.record_id,
                 }
             )
-            await self.criar_notificacao_feedback(self.record_id, recipient_id, self.user.username)
+            await self.criar_notificacao_feedback(recipient_id, self.user.username)
+
+    @database_sync_to_async
+    def carregar_contexto(self):
+        return carregar_contexto_chat(self.record_id, self.user)
+
+    async def contexto_atualizado(self, event):
+        # O responsável da ocorrência mudou: recalcula o destinatário
+        self.contexto = await self.carregar_contexto()
 
     @database_sync_to_async
-    def criar_notificacao_feedback(self, record_id, recipient_user_id, sender_username):
+    def criar_notificacao_feedback(self, recipient_user_id, sender_username):
         """
         Cria uma notificação quando uma nova mensagem de chat é enviada
         """
         try:
-            record = Record.objects.get(id=record_id)
-            usuario = User.objects.get(id=recipient_user_id)
-            
-            titulo = f"Nova mensagem na ocorrência #{record.codigo_externo or record.id}"
+            titulo = f"Nova mensagem na ocorrência #{self.contexto['codigo']}"
             resumo = f"{sender_username} mandou uma nova mensagem"
             
             Notificacao.objects.create(
-                user=usuario,
-                record=record,
+                user_id=recipient_user_id,
+                record_id=self.record_id,
                 tipo='conversa_chat',
                 titulo=titulo,
                 resumo=resumo
@@ -113,45 +150,81 @@ class ChatConsumer(AsyncWebsocketConsumer):
 
     async def chat_message(self, event):
         message_data = {
-            'message': event['message'],
-            'author': event['author'],
-            'timestamp': event['timestamp']
+            key: value for key, value in event.items() if key != 'type'
         }
         
-        # Adiciona dados da imagem se existirem
-        if 'image_base64' in event:
-            message_data['image_base64'] = event['image_base64']
-            message_data['image_type'] = event.get('image_type')
-            message_data['image_name'] = event.get('image_name')
-        
         await self.send(text_data=json.dumps(message_data))
+
+    @staticmethod
+    def serializar_mensagem(msg):
+        message_data = {
+            'id': msg.id,
+            'message': msg.message,
+            'author': msg.author.username,
+            'timestamp': msg.timestamp.isoformat(),
+        }
+        # Adiciona dados da imagem (URLs do original e da miniatura) se existirem
+        message_data.update(dados_imagem(msg.imagem, msg.miniatura, msg.image_type, msg.image_name))
+        return message_data
         
     @database_sync_to_async
-    def get_chat_history(self):
-        return list(
-            ChatMessage.objects.filter(record_id=self.record_id)
+    def get_chat_history(self, before_id=None, after_id=None):
+        """
+        Uma página do histórico por cursor de id (ids crescem com o timestamp):
+          - sem cursor: as últimas CHAT_HISTORICO_LIMITE mensagens
+          - before_id: as anteriores à mensagem mais antiga exibida
+          - after_id: as posteriores à última recebida (reconexão)
+        Retorna (mensagens em ordem cronológica, has_more).
+        """
+        limite = getattr(settings, 'CHAT_HISTORICO_LIMITE', 50)
+        mensagens = ChatMessage.objects.filter(record_id=self.record_id)
+        if before_id:
+            mensagens = mensagens.filter(id__lt=before_id)
+        if after_id:
+            mensagens = mensagens.filter(id__gt=after_id)
+
+        # Uma a mais para saber se ainda há mensagens além da página
+        pagina = list(mensagens.order_by('-id').values_list('id', flat=True)[:limite + 1])
+        has_more = len(pagina) > limite
+        ids = pagina[:limite]
+
+        # Converte na hora imagens antigas ainda em Base64 (normalmente já feito por migrar_imagens_chat)
+        legados = list(ids_legados(ChatMessage.objects.filter(id__in=ids)))
+        nao_convertidas = {}
+        if legados:
+            _, falhas = migrar_mensagens(legados)
+            if falhas:
+                # Ficaram em Base64 (formato/tamanho fora das regras): vão como data: URL
+                nao_convertidas = {
+                    msg_id: dados_imagem_legada(image_base64, image_type, image_name)
+                    for msg_id, image_base64, image_type, image_name in ids_legados(
+                        ChatMessage.objects.filter(id__in=legados)
+                    ).values_list('id', 'image_base64', 'image_type', 'image_name')
+                }
+        mensagens = []
+        for msg in (
+            ChatMessage.objects.filter(id__in=ids)
             .select_related('author')
-            .order_by('timestamp')
-            .values('message', 'author__username', 'timestamp', 'image_base64', 'image_type', 'image_name')
-        )
+            .defer('image_base64')
+            .order_by('id')
+        ):
+            dados = self.serializar_mensagem(msg)
+            dados.update(nao_convertidas.get(msg.id, {}))
+            mensagens.append(dados)
+        return mensagens, has_more
 
     @database_sync_to_async
     def save_message(self, message, image_base64=None, image_type=None, image_name=None):
-        # Se a imagem em Base64 for muito grande, você pode truncar para salvar no banco
-        # Ou considerar armazenar apenas o fato de que há uma imagem
-        if image_base64 and len(image_base64) > 10000:  # Exemplo: se for maior que 10k caracteres
-            # Pode salvar apenas uma flag ou um thumbnail muito pequeno
-            # Para este exemplo, vamos salvar normalmente
-            pass
-            
-        msg = ChatMessage.objects.create(
+        msg = ChatMessage(
             record_id=self.record_id,
             author=self.user,
             message=message,
-            image_base64=image_base64,
-            image_type=image_type,
-            image_name=image_name
         )
+        if image_base64:
+            # Decodifica uma vez e grava original + miniatura no storage de mídia
+            if not aplicar_imagem(msg, image_base64, image_type, image_name):
+                return None
+        msg.save()
         # Se a mensagem tiver formato de solução, salva em Record.solution
         try:
             sol_pattern = re.compile(r"(?i)solu[cç][aã]o\s*[:\-]\s*(.+)")
@@ -161,17 +234,3 @@ class ChatConsumer(AsyncWebsocketConsumer):
         except Exception:
             pass
         return msg
-    @database_sync_to_async
-    def get_recipient_id(self):
-        try:
-            ocorrencia = Record.objects.get(id=self.record_id)
-            
-            responsible_user = User.objects.filter(username=ocorrencia.responsible).first()
-            if self.user.username == ocorrencia.responsible:
-                manager_user = User.objects.filter(username='welton').first()
-                return manager_user.id if manager_user else None
-            else:
-                return responsible_user.id if responsible_user else None
-                
-        except Record.DoesNotExist:
-            return None
\ No newline at end of file
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from ocorrencia_erro.services.status import atualizar_status_vencidos
+
+
+class Command(BaseCommand):
+    help = "Marca como atrasadas (LATE / AWAITING_CHINA_LATE) as ocorrências com prazo vencido. Use em crontab/Task Scheduler."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Apenas lista quantas ocorrências seriam alteradas, sem gravar",
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options.get("dry_run")
+        alterados = atualizar_status_vencidos(dry_run=dry_run)
+
+        for status, ids in alterados.items():
+            self.stdout.write(f"{status}: {len(ids)} ocorrência(s) {ids if ids else ''}".rstrip())
+
+        total = sum(len(ids) for ids in alterados.values())
+        prefixo = "Simulação" if dry_run else "Atualização de status finalizada"
+        self.stdout.write(self.style.SUCCESS(f"{prefixo}: total={total}"))
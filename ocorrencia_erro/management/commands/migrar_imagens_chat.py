@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+from ocorrencia_erro.services.chat_imagens import ids_legados, migrar_mensagens
+
+
+class Command(BaseCommand):
+    help = "Converte imagens do chat salvas em Base64 (ChatMessage.image_base64) para arquivos + miniaturas, em lotes."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=100,
+            help="Quantidade de mensagens convertidas por lote (padrão: 100)",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Apenas conta as mensagens que seriam convertidas, sem gravar",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options.get("batch_size")
+        ids = list(ids_legados())
+
+        if options.get("dry_run"):
+            self.stdout.write(self.style.SUCCESS(f"Simulação: {len(ids)} mensagem(ns) com imagem em Base64"))
+            return
+
+        total = 0
+        nao_convertidas = 0
+        for inicio in range(0, len(ids), batch_size):
+            lote = ids[inicio:inicio + batch_size]
+            convertidas, falhas = migrar_mensagens(lote)
+            total += convertidas
+            nao_convertidas += falhas
+            self.stdout.write(
+                f"Lote {inicio // batch_size + 1}: {total}/{len(ids)} convertida(s), {nao_convertidas} não convertida(s)"
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Migração de imagens finalizada: total={total} não convertidas={nao_convertidas} "
+            "(formato/tamanho fora das regras do chat; mantidas em Base64)"
+        ))
@@ -1,6 +1,6 @@
 # ocorrencia/models.py
 
-from django.db import models
+from django.db import models, transaction, connection
 from datetime import timedelta
 from django.core.exceptions import ValidationError
 from django.utils import timezone
@@ -37,6 +37,50 @@ class CountryPermission(models.Model):
 def gerar_codigo_espanha():
     return ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
 
+
+def reservar_ids_record(quantidade):
+    """
+    Tira `quantidade` ids da própria sequence do id de Record (PostgreSQL), numa
+    consulta e sem lock: os ids seguem a ordem de criação e a sequence continua
+    sendo a única fonte. Retorna None nos bancos sem sequence (SQLite, MySQL);
+    nesses o INSERT gera o id e codigo_externo é gravado logo depois.
+    """
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT nextval(pg_get_serial_sequence(%s, 'id')) FROM generate_series(1, %s)",
+            [Record._meta.db_table, quantidade],
+        )
+        return sorted(linha[0] for linha in cursor.fetchall())
+
+
+class RecordQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        """bulk_create com ids/codigo_externo já atribuídos e a mesma preparação do save()."""
+        objs = list(objs)
+        novos = [obj for obj in objs if obj.id is None]
+        for obj, novo_id in zip(novos, (reservar_ids_record(len(novos)) or []) if novos else []):
+            obj.id = novo_id
+        for obj in objs:
+            obj.preparar_gravacao()
+        criados = super().bulk_create(objs, *args, **kwargs)
+
+        # Sem sequence: o id só existe depois do INSERT (quando o banco o devolve)
+        sem_codigo = [obj for obj in criados if obj.id and not obj.codigo_externo]
+        for obj in sem_codigo:
+            obj.codigo_externo = str(obj.id)
+        if sem_codigo:
+            self.model.objects.bulk_update(sem_codigo, ['codigo_externo'], batch_size=kwargs.get('batch_size'))
+
+        # bulk_create não dispara post_save: invalida os caches derivados de Record
+        from ocorrencia_erro.services.dashboard import invalidar_grafico_status
+        from ocorrencia_erro.services.filtros import invalidar_opcoes_filtro
+        invalidar_opcoes_filtro()
+        invalidar_grafico_status()
+        return criados
+
+
 class Record(models.Model):
     def is_awaiting_china_late(self):
         return self.status == self.STATUS_OCORRENCIA.AWAITING_CHINA and self.deadline and self.deadline < timezone.now().date()
@@ -49,7 +93,9 @@ class Record(models.Model):
         AWAITING_CHINA = "AWAITING_CHINA", "Aguardando China"
         AWAITING_CHINA_LATE = "AWAITING_CHINA_LATE", "China Atrasada"
 
-    # ID padrão autoincremental
+    objects = RecordQuerySet.as_manager()
+
+    # ID padrão autoincremental (no PostgreSQL o save() reserva o id na sequence antes do INSERT)
     id = models.AutoField(primary_key=True)
 
     # Novo campo código externo
@@ -296,16 +342,35 @@ class Record(models.Model):
         self.model = self.model.upper() if self.model else ''
         self.technical = self.technical.capitalize() if self.technical else ''
 
-    # O método save() não precisa de alterações.
-    def save(self, *args, **kwargs):
+    def preparar_gravacao(self):
+        """Normalizações aplicadas antes de gravar (save() e bulk_create)."""
         if not self.country_original and self.country:
             self.country_original = self.country.name
-        
+
         self.clean()
-        
+
+        if not self.codigo_externo and self.id:
+            self.codigo_externo = str(self.id)
+
+    def save(self, *args, **kwargs):
+        # PostgreSQL: id tirado da sequence antes do INSERT, codigo_externo vai na mesma escrita
+        if self._state.adding and self.id is None:
+            ids = reservar_ids_record(1)
+            if ids:
+                self.id = ids[0]
+                kwargs['force_insert'] = True
+
+        sem_codigo = not self.codigo_externo
+        self.preparar_gravacao()
+
+        update_fields = kwargs.get('update_fields')
+        if sem_codigo and update_fields is not None and 'codigo_externo' not in update_fields:
+            kwargs['update_fields'] = list(update_fields) + ['codigo_externo']
+
         super().save(*args, **kwargs)
 
-        if not self.codigo_externo and 'codigo_externo' not in (kwargs.get('update_fields') or []):
+        # Demais bancos: o id veio do INSERT, codigo_externo é gravado em seguida
+        if not self.codigo_externo:
             self.codigo_externo = str(self.id)
             super().save(update_fields=['codigo_externo'])
 
@@ -319,10 +384,41 @@ class ArquivoOcorrencia(models.Model):
         return f"{self.record} salve {self.arquivo}"
 
 
+class NotificacaoQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        """bulk_create que, como o post_save, atualiza o contador e avisa cada destinatário."""
+        from ocorrencia_erro.services.notificacoes import notificacao_criada
+
+        criadas = super().bulk_create(objs, *args, **kwargs)
+        for notificacao in criadas:
+            if notificacao.pk and not notificacao.lida:
+                transaction.on_commit(lambda n=notificacao: notificacao_criada(n), using=self.db)
+        return criadas
+
+    def marcar_como_lidas(self, user_id):
+        """
+        Marca como lidas as notificações não lidas do usuário neste queryset.
+        Lida = removida (ver Notificacao.marcar_como_lida): o post_delete de cada
+        linha não mexe no contador; ele é ajustado e enviado ao grupo user_{id}
+        uma vez só. Retorna quantas notificações foram afetadas.
+        """
+        from ocorrencia_erro.services.notificacoes import notificacoes_removidas, remocao_em_lote
+
+        qs = self.filter(user_id=user_id, lida=False)
+        with remocao_em_lote():
+            _, por_modelo = qs.delete()
+        total = por_modelo.get(self.model._meta.label, 0)
+        if total:
+            transaction.on_commit(lambda: notificacoes_removidas(user_id, total), using=qs.db)
+        return total
+
+
 class Notificacao(models.Model):
     """
     Modelo para notificações de feedback em ocorrências
     """
+    objects = NotificacaoQuerySet.as_manager()
+
     user = models.ForeignKey(
         User, 
         on_delete=models.CASCADE, 
@@ -380,7 +476,7 @@ class Notificacao(models.Model):
     def marcar_como_lida(self):
         """Marca a notificação como lida"""
         if not self.lida:
-            self.delete()
+            Notificacao.objects.filter(pk=self.pk).marcar_como_lidas(self.user_id)
             # self.lida = True
             # self.lida_em = timezone.now()
             # self.save(update_fields=['lida', 'lida_em'])
@@ -389,13 +485,19 @@ class ChatMessage(models.Model):
     record = models.ForeignKey(Record, on_delete=models.CASCADE)
     author = models.ForeignKey(User, on_delete=models.CASCADE)
     message = models.TextField(blank=True)
-    image_base64 = models.TextField(blank=True, null=True)  # Para armazenar Base64
+    image_base64 = models.TextField(blank=True, null=True)  # Legado: convertido por migrar_imagens_chat
+    imagem = models.ImageField(upload_to='chat_imagens/', blank=True, null=True)
+    miniatura = models.ImageField(upload_to='chat_imagens/miniaturas/', blank=True, null=True)
     image_type = models.CharField(max_length=50, blank=True, null=True)
     image_name = models.CharField(max_length=255, blank=True, null=True)
     timestamp = models.DateTimeField(auto_now_add=True)
     
     class Meta:
         ordering = ['timestamp']
+        indexes = [
+            # Paginação do histórico por cursor (record + id)
+            models.Index(fields=['record', 'id']),
+        ]
 
 
 class OptionItem(models.Model):
@@ -426,3 +528,21 @@ class OptionItem(models.Model):
 
     def __str__(self) -> str:
         return f"{self.get_category_display()} / {self.area} - {self.label}"
+
+
+class Traducao(models.Model):
+    """Cache persistente de traduções (DeepL), chaveado pelo hash do texto + idiomas."""
+    hash_texto = models.CharField(max_length=64)
+    source_lang = models.CharField(max_length=10)
+    target_lang = models.CharField(max_length=10)
+    texto_original = models.TextField()
+    texto_traduzido = models.TextField()
+    criado_em = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Tradução"
+        verbose_name_plural = "Traduções"
+        unique_together = ('hash_texto', 'source_lang', 'target_lang')
+
+    def __str__(self):
+        return f"{self.source_lang}->{self.target_lang} {self.hash_texto[:12]}"
@@ -1,6 +1,10 @@
 import json
+from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
 
+from .services.notificacoes import contar_nao_lidas
+from .services.status import GRUPO_STATUS
+
 class NotificationConsumer(AsyncWebsocketConsumer):
     async def connect(self):
         self.user = self.scope["user"]
@@ -14,14 +18,28 @@ class NotificationConsumer(AsyncWebsocketConsumer):
             self.user_group_name,
             self.channel_name
         )
+        await self.channel_layer.group_add(
+            GRUPO_STATUS,
+            self.channel_name
+        )
         await self.accept()
 
+        # Total inicial; depois disso o contador chega por push a cada mudança
+        await self.send(text_data=json.dumps({
+            'type': 'notification_count',
+            'total': await database_sync_to_async(contar_nao_lidas)(self.user.id),
+        }))
+
     async def disconnect(self, close_code):
         if self.user.is_authenticated:
             await self.channel_layer.group_discard(
                 self.user_group_name,
                 self.channel_name
             )
+            await self.channel_layer.group_discard(
+                GRUPO_STATUS,
+                self.channel_name
+            )
 
     async def new_chat_message(self, event):
         await self.send(text_data=json.dumps({
@@ -29,4 +47,31 @@ class NotificationConsumer(AsyncWebsocketConsumer):
             'message': event['message'],
             'sender': event['sender'],
             'record_id': event['record_id'],
-        }))
\ No newline at end of file
+        }))
+
+    async def notificacao_criada(self, event):
+        await self.send(text_data=json.dumps({
+            'type': 'notification_new',
+            'notificacao': event['notificacao'],
+            'total': event['total'],
+        }))
+
+    async def notificacoes_contador(self, event):
+        await self.send(text_data=json.dumps({
+            'type': 'notification_count',
+            'total': event['total'],
+            'delta': event.get('delta'),
+        }))
+
+    async def status_atualizado(self, event):
+        await self.send(text_data=json.dumps({
+            'type': 'status_update',
+            'ids': event['ids'],
+            'status': event['status'],
+        }))
+
+    async def pdf_pronto(self, event):
+        await self.send(text_data=json.dumps({
+            'type': 'pdf_ready',
+            **event['job'],
+        }))
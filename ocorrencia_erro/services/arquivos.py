@@ -0,0 +1,310 @@
+# ocorrencia/services/arquivos.py
+import hashlib
+import mimetypes
+import os
+import re
+import time
+import uuid
+import zipfile
+from collections import defaultdict
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe
+
+from ocorrencia_erro.models import ArquivoOcorrencia
+
+CHUNK_DOWNLOAD = 64 * 1024
+# Mídias já comprimidas: recomprimir só gasta CPU (ver ZIP_EXTENSOES_SEM_COMPRESSAO)
+EXTENSOES_SEM_COMPRESSAO = (
+    '.jpg', '.jpeg', '.png', '.gif', '.webp', '.heic',
+    '.mp4', '.mov', '.avi', '.mkv', '.webm', '.mp3',
+    '.zip', '.rar', '.7z', '.gz', '.bz2', '.xz', '.pdf',
+)
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def serializar_arquivo(arquivo, record):
+    return {
+        'id': arquivo.id,
+        'record_id': record.codigo_externo or str(record.id),
+        'url': arquivo.arquivo.url,
+        'nome_original': arquivo.nome_original,
+        "data_upload": arquivo.data_upload.strftime("%d/%m/%Y %H:%M")
+    }
+
+
+def arquivos_por_record(records):
+    """
+    Carrega os anexos de todos os records da página em UMA consulta.
+    Retorna {record_id: [arquivo serializado, ...]} reaproveitando o
+    próprio record (sem recarregar a FK de cada anexo).
+    """
+    records_por_id = {record.id: record for record in records}
+    agrupados = defaultdict(list)
+    if not records_por_id:
+        return agrupados
+
+    arquivos = (
+        ArquivoOcorrencia.objects
+        .filter(record_id__in=list(records_por_id))
+        .order_by('record_id', 'id')
+    )
+    for arquivo in arquivos:
+        record = records_por_id[arquivo.record_id]
+        agrupados[record.id].append(serializar_arquivo(arquivo, record))
+    return agrupados
+
+
+def _etag(stat):
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+def _nao_modificado(request, etag, mtime):
+    """Trata If-None-Match / If-Modified-Since (If-None-Match tem precedência)."""
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match is not None:
+        return if_none_match.strip() == '*' or etag in [tag.strip() for tag in if_none_match.split(',')]
+    desde = parse_http_date_safe(request.headers.get('If-Modified-Since') or '')
+    return desde is not None and int(mtime) <= desde
+
+
+def _intervalo(request, etag, mtime, tamanho):
+    """
+    Intervalo pedido no header Range (apenas um intervalo de bytes).
+    Retorna (inicio, fim) inclusivo, None para resposta completa ou
+    False quando o intervalo não pode ser atendido (416).
+    """
+    cabecalho = request.headers.get('Range')
+    if not cabecalho or request.method not in ('GET', 'HEAD'):
+        return None
+
+    # If-Range: só responde parcial se o arquivo ainda for o mesmo
+    if_range = request.headers.get('If-Range')
+    if if_range:
+        if if_range.startswith(('"', 'W/')):
+            if if_range != etag:
+                return None
+        elif parse_http_date_safe(if_range) != int(mtime):
+            return None
+
+    match = RANGE_RE.match(cabecalho.strip())
+    if not match:
+        return None  # múltiplos intervalos ou formato desconhecido: envia o arquivo inteiro
+    inicio, fim = match.groups()
+    if not inicio and not fim:
+        return None
+    if not inicio:
+        # "bytes=-N": últimos N bytes
+        sufixo = int(fim)
+        if sufixo == 0:
+            return False
+        return max(tamanho - sufixo, 0), tamanho - 1
+    inicio = int(inicio)
+    fim = min(int(fim), tamanho - 1) if fim else tamanho - 1
+    if inicio >= tamanho or inicio > fim:
+        return False
+    return inicio, fim
+
+
+def _ler_intervalo(caminho, inicio, tamanho):
+    with open(caminho, 'rb') as f:
+        f.seek(inicio)
+        restante = tamanho
+        while restante > 0:
+            bloco = f.read(min(CHUNK_DOWNLOAD, restante))
+            if not bloco:
+                break
+            restante -= len(bloco)
+            yield bloco
+
+
+def _resposta_proxy(caminho, content_type):
+    """
+    Delegação do envio ao proxy (DOWNLOAD_SENDFILE_MODE):
+      - 'x-accel-redirect' (nginx): caminho interno = DOWNLOAD_ACCEL_PREFIX + caminho relativo ao MEDIA_ROOT
+      - 'x-sendfile' (apache/lighttpd): caminho absoluto do arquivo
+    """
+    modo = getattr(settings, 'DOWNLOAD_SENDFILE_MODE', '')
+    response = HttpResponse(content_type=content_type)
+    if modo == 'x-accel-redirect':
+        relativo = os.path.relpath(caminho, settings.MEDIA_ROOT).replace(os.sep, '/')
+        prefixo = settings.DOWNLOAD_ACCEL_PREFIX.rstrip('/')
+        response['X-Accel-Redirect'] = quote(f'{prefixo}/{relativo}')
+    else:
+        response['X-Sendfile'] = caminho
+    return response
+
+
+def resposta_download(request, caminho, filename, content_type=None, as_attachment=True):
+    """
+    Resposta de download em streaming (sem carregar o arquivo na memória), com
+    ETag/Last-Modified (304), Range (206/416) e, se configurado, envio pelo proxy.
+    """
+    if content_type is None:
+        content_type, _ = mimetypes.guess_type(caminho)
+        content_type = content_type or 'application/octet-stream'
+
+    if getattr(settings, 'DOWNLOAD_SENDFILE_MODE', ''):
+        # O proxy cuida de Range/cache; aqui só a checagem de permissão já feita pela view
+        response = _resposta_proxy(caminho, content_type)
+        response['Content-Disposition'] = content_disposition_header(as_attachment, filename)
+        return response
+
+    stat = os.stat(caminho)
+    etag = _etag(stat)
+
+    if _nao_modificado(request, etag, stat.st_mtime):
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(stat.st_mtime)
+        return response
+
+    intervalo = _intervalo(request, etag, stat.st_mtime, stat.st_size)
+    if intervalo is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{stat.st_size}'
+    elif intervalo is not None:
+        inicio, fim = intervalo
+        tamanho = fim - inicio + 1
+        response = StreamingHttpResponse(
+            _ler_intervalo(caminho, inicio, tamanho), status=206, content_type=content_type
+        )
+        response['Content-Length'] = str(tamanho)
+        response['Content-Range'] = f'bytes {inicio}-{fim}/{stat.st_size}'
+    else:
+        response = FileResponse(open(caminho, 'rb'), content_type=content_type)
+        response.block_size = CHUNK_DOWNLOAD
+
+    response['Content-Disposition'] = content_disposition_header(as_attachment, filename)
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    return response
+
+
+class _SaidaZip:
+    """Arquivo só de escrita (não posicionável) que acumula o que o ZipFile grava."""
+
+    def __init__(self):
+        self._partes = []
+        self._posicao = 0
+
+    def write(self, dados):
+        self._partes.append(bytes(dados))
+        self._posicao += len(dados)
+        return len(dados)
+
+    def tell(self):
+        return self._posicao
+
+    def flush(self):
+        pass
+
+    def drenar(self):
+        dados = b''.join(self._partes)
+        self._partes = []
+        return dados
+
+
+def _compressao(caminho):
+    extensoes = getattr(settings, 'ZIP_EXTENSOES_SEM_COMPRESSAO', EXTENSOES_SEM_COMPRESSAO)
+    if os.path.splitext(caminho)[1].lower() in extensoes:
+        return zipfile.ZIP_STORED
+    return zipfile.ZIP_DEFLATED
+
+
+def gerar_zip(entradas):
+    """
+    Gera um ZIP em pedaços, à medida que cada entrada é lida/comprimida.
+    `entradas` é uma lista de (caminho no disco, nome dentro do zip).
+    """
+    saida = _SaidaZip()
+    usados = set()
+    with zipfile.ZipFile(saida, 'w') as zip_file:
+        for caminho, nome in entradas:
+            # Anexos com o mesmo nome original: "nome (2).ext", "nome (3).ext"...
+            base, ext = os.path.splitext(nome)
+            contador = 2
+            while nome in usados:
+                nome = f'{base} ({contador}){ext}'
+                contador += 1
+            usados.add(nome)
+
+            info = zipfile.ZipInfo.from_file(caminho, arcname=nome)
+            info.compress_type = _compressao(caminho)
+            with open(caminho, 'rb') as origem, zip_file.open(info, 'w', force_zip64=True) as destino:
+                while True:
+                    bloco = origem.read(CHUNK_DOWNLOAD)
+                    if not bloco:
+                        break
+                    destino.write(bloco)
+                    dados = saida.drenar()
+                    if dados:
+                        yield dados
+            dados = saida.drenar()
+            if dados:
+                yield dados
+    # Diretório central (escrito ao fechar o ZipFile)
+    dados = saida.drenar()
+    if dados:
+        yield dados
+
+
+def chave_zip(arquivos):
+    """Hash do conjunto de anexos (id, nome, tamanho e data de modificação de cada um)."""
+    partes = []
+    for arquivo in arquivos:
+        stat = os.stat(arquivo.arquivo.path)
+        partes.append(f'{arquivo.id}|{arquivo.nome_original}|{stat.st_size}|{stat.st_mtime_ns}')
+    extensoes = getattr(settings, 'ZIP_EXTENSOES_SEM_COMPRESSAO', EXTENSOES_SEM_COMPRESSAO)
+    partes.append(','.join(sorted(extensoes)))
+    return hashlib.sha256('\n'.join(partes).encode('utf-8')).hexdigest()
+
+
+def _limpar_zips_antigos(diretorio):
+    limite = time.time() - getattr(settings, 'ZIP_CACHE_DIAS', 7) * 24 * 60 * 60
+    for nome in os.listdir(diretorio):
+        caminho = os.path.join(diretorio, nome)
+        try:
+            if os.path.getmtime(caminho) < limite:
+                os.remove(caminho)
+        except OSError:
+            continue
+
+
+def _gerar_e_cachear(entradas, destino):
+    """Repassa os pedaços do ZIP e grava uma cópia; só publica no cache se o ZIP chegar ao fim."""
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    temporario = f'{destino}.{uuid.uuid4().hex}.tmp'
+    completo = False
+    try:
+        with open(temporario, 'wb') as copia:
+            for dados in gerar_zip(entradas):
+                copia.write(dados)
+                yield dados
+        completo = True
+    finally:
+        if completo:
+            os.replace(temporario, destino)
+            _limpar_zips_antigos(os.path.dirname(destino))
+        elif os.path.exists(temporario):
+            os.remove(temporario)
+
+
+def resposta_zip(request, arquivos, filename):
+    """
+    Download de vários anexos em um ZIP. Se o mesmo conjunto de anexos já foi
+    empacotado, serve o ZIP pronto do ZIP_CACHE_DIR (com Range/ETag); senão gera
+    em streaming, gravando a cópia para os próximos downloads.
+    """
+    arquivos = list(arquivos)
+    destino = os.path.join(settings.ZIP_CACHE_DIR, f'{chave_zip(arquivos)}.zip')
+    if os.path.exists(destino):
+        return resposta_download(request, destino, filename, 'application/zip')
+
+    entradas = [(arquivo.arquivo.path, arquivo.nome_original) for arquivo in arquivos]
+    response = StreamingHttpResponse(_gerar_e_cachear(entradas, destino), content_type='application/zip')
+    response['Content-Disposition'] = content_disposition_header(True, filename)
+    return response
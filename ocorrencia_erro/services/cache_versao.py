@@ -0,0 +1,25 @@
+# ocorrencia/services/cache_versao.py
+import time
+
+from django.core.cache import cache
+
+
+def versao_atual(chave_versao):
+    """
+    Versão corrente de um grupo de entradas de cache. As entradas incluem a
+    versão na chave; incrementar a versão invalida todas de uma vez.
+    """
+    versao = cache.get(chave_versao)
+    if versao is None:
+        # Nunca reinicia em 1: um valor baseado no relógio evita reaproveitar
+        # entradas antigas caso a chave de versão seja despejada do cache.
+        cache.add(chave_versao, time.time_ns(), None)
+        versao = cache.get(chave_versao)
+    return versao
+
+
+def incrementar_versao(chave_versao):
+    try:
+        cache.incr(chave_versao)
+    except ValueError:
+        cache.set(chave_versao, time.time_ns(), None)
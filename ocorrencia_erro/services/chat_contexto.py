@@ -0,0 +1,49 @@
+# ocorrencia/services/chat_contexto.py
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.contrib.auth.models import User
+
+from ocorrencia_erro.models import Record
+from ocorrencia_erro.services.responsaveis import ids_por_responsavel
+
+
+def grupo_chat(record_id):
+    return f'chat_{record_id}'
+
+
+def carregar_contexto_chat(record_id, user):
+    """
+    Contexto do chat de uma ocorrência para o usuário conectado: código exibido
+    nas notificações e quem recebe o aviso de nova mensagem (o responsável;
+    ou o gestor, quando quem escreve é o próprio responsável).
+    """
+    record = Record.objects.filter(id=record_id).values('id', 'codigo_externo', 'responsible').first()
+    if record is None:
+        return None
+
+    # Record.responsible guarda o nome completo; ids_por_responsavel também aceita username
+    responsaveis = ids_por_responsavel(record['responsible']) if record['responsible'] else []
+    if user.id in responsaveis:
+        gestor = getattr(settings, 'CHAT_GESTOR_USERNAME', 'welton')
+        recipient_id = User.objects.filter(username=gestor).values_list('id', flat=True).first()
+    else:
+        recipient_id = responsaveis[0] if responsaveis else None
+
+    return {
+        'codigo': record['codigo_externo'] or str(record['id']),
+        'responsible': record['responsible'],
+        'recipient_id': recipient_id,
+    }
+
+
+def avisar_mudanca_responsavel(record_id):
+    """Pede aos ChatConsumer conectados na ocorrência que recarreguem o contexto."""
+    try:
+        channel_layer = get_channel_layer()
+        async_to_sync(channel_layer.group_send)(
+            grupo_chat(record_id),
+            {'type': 'contexto_atualizado'}
+        )
+    except Exception as e:
+        print(f"Erro ao avisar mudança de responsável no chat: {e}")
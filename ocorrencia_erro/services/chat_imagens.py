@@ -0,0 +1,177 @@
+# ocorrencia/services/chat_imagens.py
+import base64
+import binascii
+import io
+import os
+import uuid
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from ocorrencia_erro.models import ChatMessage
+
+MINIATURA_TAMANHO = (320, 320)
+MINIATURA_QUALIDADE = 80
+
+# Formatos aceitos (Image.format detectado) -> extensão e content type gravados.
+# O que o cliente informa (image_name/image_type) nunca define o tipo do arquivo
+# servido em /media/: SVG, HTML etc. são recusados.
+FORMATOS_PERMITIDOS = {
+    'PNG': ('.png', 'image/png'),
+    'JPEG': ('.jpg', 'image/jpeg'),
+    'GIF': ('.gif', 'image/gif'),
+    'WEBP': ('.webp', 'image/webp'),
+}
+
+
+def _tamanho_maximo():
+    return getattr(settings, 'CHAT_IMAGEM_MAX_BYTES', 10 * 1024 * 1024)
+
+
+def decodificar_base64(image_base64, image_type=None):
+    """
+    Decodifica uma imagem em Base64 (com ou sem prefixo data:image/...;base64,).
+    Retorna (bytes, content_type); None se o conteúdo for inválido.
+    """
+    if not image_base64:
+        return None
+    conteudo = image_base64
+    if conteudo.startswith('data:') and ',' in conteudo:
+        cabecalho, conteudo = conteudo.split(',', 1)
+        image_type = image_type or cabecalho[5:].split(';')[0] or None
+    # Recusa antes de decodificar: Base64 ocupa 4/3 do tamanho final
+    if len(conteudo) * 3 // 4 > _tamanho_maximo():
+        return None
+    try:
+        dados = base64.b64decode(conteudo, validate=False)
+    except (binascii.Error, ValueError):
+        return None
+    if not dados or len(dados) > _tamanho_maximo():
+        return None
+    return dados, image_type or 'image/png'
+
+
+def identificar_imagem(dados):
+    """
+    Confere com o Pillow que os bytes são uma imagem de um formato permitido.
+    Retorna (extensão, content_type) do formato detectado ou None.
+    """
+    try:
+        with Image.open(io.BytesIO(dados)) as imagem:
+            formato = imagem.format
+            imagem.verify()
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, ValueError, SyntaxError):
+        return None
+    return FORMATOS_PERMITIDOS.get(formato)
+
+
+def gerar_miniatura(dados):
+    """Miniatura (no máximo MINIATURA_TAMANHO) em JPEG, ou PNG se houver transparência."""
+    try:
+        with Image.open(io.BytesIO(dados)) as imagem:
+            imagem = ImageOps.exif_transpose(imagem)
+            imagem.thumbnail(MINIATURA_TAMANHO)
+            saida = io.BytesIO()
+            if imagem.mode in ('RGBA', 'LA', 'P'):
+                imagem.save(saida, format='PNG', optimize=True)
+                return saida.getvalue(), '.png'
+            imagem.convert('RGB').save(saida, format='JPEG', quality=MINIATURA_QUALIDADE, optimize=True)
+            return saida.getvalue(), '.jpg'
+    except (UnidentifiedImageError, OSError, ValueError):
+        return None
+
+
+def aplicar_imagem(mensagem, image_base64, image_type=None, image_name=None):
+    """
+    Decodifica a imagem uma única vez e grava original + miniatura no storage
+    de mídia (sem salvar a mensagem). Retorna False se o conteúdo não for uma
+    imagem PNG/JPEG/GIF/WebP de até CHAT_IMAGEM_MAX_BYTES (nada é gravado).
+    """
+    decodificado = decodificar_base64(image_base64, image_type)
+    if decodificado is None:
+        return False
+    dados, _ = decodificado
+
+    formato = identificar_imagem(dados)
+    if formato is None:
+        return False
+    ext, content_type = formato
+
+    # Nome exibido no chat: o do cliente, mas com a extensão do formato detectado
+    base = os.path.splitext(os.path.basename(image_name or ''))[0][:200] or 'imagem'
+    image_name = f'{base}{ext}'
+    nome = uuid.uuid4().hex
+    mensagem.imagem.save(f'{nome}{ext}', ContentFile(dados), save=False)
+
+    miniatura = gerar_miniatura(dados)
+    if miniatura is not None:
+        conteudo, ext_miniatura = miniatura
+        mensagem.miniatura.save(f'{nome}{ext_miniatura}', ContentFile(conteudo), save=False)
+
+    mensagem.image_type = content_type
+    mensagem.image_name = image_name
+    mensagem.image_base64 = None
+    return True
+
+
+def migrar_mensagens(ids):
+    """
+    Converte mensagens legadas (image_base64 no banco) para arquivos.
+    Retorna (convertidas, nao_convertidas). As que não passam nas regras de
+    aplicar_imagem (formato/tamanho) ficam intactas: o Base64 é a única cópia.
+    """
+    convertidas = 0
+    nao_convertidas = 0
+    mensagens = (
+        ChatMessage.objects
+        .filter(id__in=ids)
+        .only('id', 'image_base64', 'image_type', 'image_name', 'imagem', 'miniatura')
+    )
+    for mensagem in mensagens:
+        if not mensagem.image_base64:
+            continue
+        if not aplicar_imagem(mensagem, mensagem.image_base64, mensagem.image_type, mensagem.image_name):
+            nao_convertidas += 1
+            continue
+        mensagem.save(update_fields=['image_base64', 'imagem', 'miniatura', 'image_type', 'image_name'])
+        convertidas += 1
+    return convertidas, nao_convertidas
+
+
+def dados_imagem_legada(image_base64, image_type=None, image_name=None):
+    """
+    Imagem antiga que não pôde ser convertida (ex.: BMP, TIFF, acima do limite):
+    enviada como data: URL, como antes dos arquivos em mídia, para não sumir do chat.
+    """
+    decodificado = decodificar_base64(image_base64, image_type)
+    if decodificado is None:
+        return {}
+    dados, content_type = decodificado
+    if not content_type.startswith('image/'):
+        content_type = 'application/octet-stream'
+    url = f"data:{content_type};base64,{base64.b64encode(dados).decode('ascii')}"
+    return {
+        'image_url': url,
+        'thumbnail_url': url,
+        'image_type': image_type,
+        'image_name': image_name,
+    }
+
+
+def ids_legados(queryset=None):
+    queryset = ChatMessage.objects.all() if queryset is None else queryset
+    return queryset.filter(image_base64__isnull=False).exclude(image_base64='').order_by('id').values_list('id', flat=True)
+
+
+def dados_imagem(imagem, miniatura, image_type=None, image_name=None):
+    """Campos de imagem enviados ao cliente: só URLs (a miniatura cai para o original)."""
+    if not imagem:
+        return {}
+    url = imagem.url
+    return {
+        'image_url': url,
+        'thumbnail_url': miniatura.url if miniatura else url,
+        'image_type': image_type,
+        'image_name': image_name,
+    }
@@ -1,6 +1,9 @@
 # ocorrencia/services/dashboard.py
+from django.core.cache import cache
 from django.db.models import Count, Q
-from ocorrencia_erro.models import Record, CountryPermission
+from ocorrencia_erro.models import Record
+from ocorrencia_erro.services.cache_versao import versao_atual, incrementar_versao
+from ocorrencia_erro.services.permissoes import escopo_do_usuario
 from datetime import timedelta
 from django.utils import timezone
 
@@ -35,21 +38,33 @@ def base_queryset_por_usuario(user):
     if user.is_superuser:
         return qs
 
-    paises_ids = CountryPermission.objects.filter(
-        user=user
-    ).values_list('country_id', flat=True)
+    escopo = escopo_do_usuario(user)
 
-    is_semi_admin = user.groups.filter(name='Semi Admin').exists()
+    if escopo.is_semi_admin:
+        return qs.filter(country_id__in=escopo.paises_ids)
 
-    if is_semi_admin:
-        return qs.filter(country_id__in=paises_ids)
-
-    nome_usuario = f"{user.first_name} {user.last_name}".strip() or user.username
     return qs.filter(
-        country_id__in=paises_ids,
-        responsible=nome_usuario
+        country_id__in=escopo.paises_ids,
+        responsible=escopo.responsavel
     )
 
+
+def chave_recorte_dashboard(user):
+    """
+    Identifica o recorte aplicado por base_queryset_por_usuario, para chaves de
+    cache. Não usar escopo.chave aqui: perfis "somente concluído" compartilham
+    essa chave, mas o dashboard os filtra por país e responsável.
+    """
+    if user.is_superuser:
+        return ['super']
+
+    escopo = escopo_do_usuario(user)
+
+    if escopo.is_semi_admin:
+        return ['semi', list(escopo.paises_ids)]
+
+    return ['tecnico', list(escopo.paises_ids), escopo.responsavel]
+
 from django.db.models import Count
 
 def dashboard_responsavel(user, request, responsible=None, status=None, country=None):
@@ -118,3 +133,32 @@ def lista_detalhada(user, request, responsible=None, status=None, country=None):
     qs = aplicar_filtro_data(qs, request)
 
     return qs.select_related("country", "device").order_by("responsible", "-data")
+
+
+GRAFICO_VERSAO_CACHE_KEY = 'ocorrencia:grafico_status:versao'
+GRAFICO_CACHE_TIMEOUT = 60 * 30
+
+
+def contagem_status_por_responsavel(escopo, qs):
+    """
+    Totais por (responsável, status) do gráfico da página inicial, agregados
+    no banco (GROUP BY) e cacheados por escopo de permissão. Qualquer escrita
+    em Record invalida (ver invalidar_grafico_status).
+    Retorna lista de tuplas (responsible, status, total).
+    """
+    chave = f'ocorrencia:grafico_status:{versao_atual(GRAFICO_VERSAO_CACHE_KEY)}:{escopo.chave}'
+    contagens = cache.get(chave)
+    if contagens is None:
+        contagens = list(
+            qs.exclude(responsible__isnull=True)
+            .exclude(responsible__in=['', 'Não identificado'])
+            .values_list('responsible', 'status')
+            .annotate(total=Count('id'))
+            .order_by('responsible', 'status')
+        )
+        cache.set(chave, contagens, GRAFICO_CACHE_TIMEOUT)
+    return contagens
+
+
+def invalidar_grafico_status():
+    incrementar_versao(GRAFICO_VERSAO_CACHE_KEY)
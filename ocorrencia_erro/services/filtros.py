@@ -0,0 +1,90 @@
+# ocorrencia/services/filtros.py
+from collections import defaultdict
+from datetime import datetime, date
+
+from django.core.cache import cache
+
+from ocorrencia_erro.services.cache_versao import versao_atual, incrementar_versao
+
+DATE_COLUMNS = ["data", "deadline", "finished"]
+STATUS_OCORRENCIA = {
+    'Concluído': 'DONE',
+    'Atrasado': 'LATE',
+    'Em progresso': 'PROGRESS',
+    'Requisitado': 'REQUESTED',
+    'Aguardando China': 'AWAITING_CHINA',
+    'China Atrasada': 'AWAITING_CHINA_LATE',
+}
+STATUS_MAP_REVERSED = {v: k for k, v in STATUS_OCORRENCIA.items()}
+
+FILTERABLE_COLUMNS_FOR_OPTIONS = [
+    'codigo_externo', 'technical', 'country', 'device', 'area', 'sistema', 'tipo_problema', 'serial', 'brand',
+    'model', 'year', 'version', 'status', 'responsible',
+    'data', 'deadline', 'finished'
+]
+
+# Versão global das opções: qualquer escrita em Record/Country/Device incrementa
+# e torna obsoletas todas as entradas já calculadas (de todos os escopos).
+VERSAO_CACHE_KEY = 'ocorrencia:filtros:versao'
+OPCOES_CACHE_TIMEOUT = 60 * 30
+
+
+def gerar_opcoes_filtro(options_queryset):
+    """
+    Calcula as opções de filtro (uma consulta DISTINCT por coluna) a partir do
+    queryset já restrito pelas permissões do usuário.
+    """
+    filter_options = {}
+    for col in FILTERABLE_COLUMNS_FOR_OPTIONS:
+        if col == 'country':
+            options = options_queryset.exclude(country__isnull=True).values_list('country__name', flat=True).distinct()
+            filter_options[col] = sorted(list(set([opt.upper() for opt in options if opt])))
+        elif col == 'device':
+            options = options_queryset.exclude(device__isnull=True).values_list('device__name', flat=True).distinct()
+            filter_options[col] = sorted(list(set([opt.upper() for opt in options if opt])))
+        elif col == 'status':
+            status_values = options_queryset.values_list('status', flat=True).distinct()
+            filter_options[col] = sorted(
+                [STATUS_MAP_REVERSED.get(opt, opt) for opt in status_values if opt],
+                key=lambda x: list(STATUS_OCORRENCIA.keys()).index(x) if x in STATUS_OCORRENCIA else float('inf')
+            )
+        elif col in DATE_COLUMNS:
+            dates = options_queryset.exclude(**{f'{col}__isnull': True}).values_list(col, flat=True).distinct()
+            date_tree = defaultdict(lambda: defaultdict(list))
+            for dt in dates:
+                if dt:
+                    try:
+                        dt = dt if isinstance(dt, date) else datetime.strptime(str(dt), '%Y-%m-%d').date()
+                        year = str(dt.year)
+                        month = dt.strftime('%m')
+                        day = dt.strftime('%d')
+                        if day not in date_tree[year][month]:
+                            date_tree[year][month].append(day)
+                    except:
+                        continue
+            for year in date_tree:
+                for month in date_tree[year]:
+                    date_tree[year][month] = sorted(date_tree[year][month])
+                date_tree[year] = dict(sorted(date_tree[year].items()))
+            filter_options[col] = dict(sorted(date_tree.items()))
+        elif col == 'codigo_externo':
+            options = options_queryset.values_list(col, flat=True).distinct()
+            filter_options[col] = sorted(list(set([opt for opt in options if opt is not None])))
+        else:
+            options = options_queryset.exclude(**{f'{col}__isnull': True}).exclude(**{f'{col}__exact': ''}).values_list(col, flat=True).distinct()
+            filter_options[col] = sorted(list(set([opt.upper() for opt in options if opt is not None])))
+    return filter_options
+
+
+def invalidar_opcoes_filtro():
+    incrementar_versao(VERSAO_CACHE_KEY)
+
+
+def opcoes_filtro_cacheadas(escopo, options_queryset):
+    """Retorna as opções de filtro do escopo, recalculando só quando houve escrita em Record."""
+    chave = f'ocorrencia:filtros:{versao_atual(VERSAO_CACHE_KEY)}:{escopo.chave}'
+    filter_options = cache.get(chave)
+    if filter_options is None:
+        filter_options = gerar_opcoes_filtro(options_queryset)
+        cache.set(chave, filter_options, OPCOES_CACHE_TIMEOUT)
+    return filter_options
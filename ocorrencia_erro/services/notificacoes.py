@@ -0,0 +1,97 @@
+# ocorrencia/services/notificacoes.py
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.core.cache import cache
+
+from ocorrencia_erro.models import Notificacao
+
+# O contador é mantido por deltas; o TTL só limita quanto tempo um desvio sobrevive
+CONTADOR_CACHE_TIMEOUT = 60 * 60 * 24
+
+_remocao_em_lote = ContextVar('notificacoes_remocao_em_lote', default=False)
+
+
+@contextmanager
+def remocao_em_lote():
+    """Durante o bloco o post_delete de Notificacao não ajusta o contador (quem remove ajusta uma vez)."""
+    token = _remocao_em_lote.set(True)
+    try:
+        yield
+    finally:
+        _remocao_em_lote.reset(token)
+
+
+def em_remocao_em_lote():
+    return _remocao_em_lote.get()
+
+
+def _chave_contador(user_id):
+    return f'notificacoes:nao_lidas:{user_id}'
+
+
+def contar_nao_lidas(user_id):
+    """Total de notificações não lidas do usuário (cache; COUNT só quando ausente)."""
+    chave = _chave_contador(user_id)
+    total = cache.get(chave)
+    if total is None:
+        total = Notificacao.objects.filter(user_id=user_id, lida=False).count()
+        cache.add(chave, total, CONTADOR_CACHE_TIMEOUT)
+    return total
+
+
+def ajustar_contador(user_id, delta):
+    """Aplica `delta` ao contador em cache e retorna o novo total."""
+    try:
+        total = cache.incr(_chave_contador(user_id), delta)
+    except ValueError:
+        # Sem contador em cache: recalcula a partir do banco (já com a mudança)
+        return contar_nao_lidas(user_id)
+    if total < 0:
+        cache.delete(_chave_contador(user_id))
+        return contar_nao_lidas(user_id)
+    return total
+
+
+def dados_notificacao(notificacao):
+    return {
+        'id': notificacao.id,
+        'titulo': notificacao.titulo,
+        'resumo': notificacao.resumo,
+        'tipo': notificacao.tipo,
+        'criada_em': notificacao.criada_em.strftime('%d/%m/%Y %H:%M'),
+        'record_id': notificacao.record_id,
+        'record_codigo': notificacao.record.codigo_externo or str(notificacao.record_id),
+    }
+
+
+def _enviar(user_id, evento):
+    try:
+        channel_layer = get_channel_layer()
+        async_to_sync(channel_layer.group_send)(f'user_{user_id}', evento)
+    except Exception as e:
+        print(f"Erro ao enviar atualização de notificações: {e}")
+
+
+def notificacao_criada(notificacao):
+    """Incrementa o contador e envia a nova notificação ao grupo user_{id}."""
+    total = ajustar_contador(notificacao.user_id, 1)
+    _enviar(notificacao.user_id, {
+        'type': 'notificacao_criada',
+        'notificacao': dados_notificacao(notificacao),
+        'total': total,
+    })
+
+
+def notificacoes_removidas(user_id, quantidade):
+    """Decrementa o contador e envia o novo total ao grupo user_{id}."""
+    if not quantidade:
+        return
+    total = ajustar_contador(user_id, -quantidade)
+    _enviar(user_id, {
+        'type': 'notificacoes_contador',
+        'total': total,
+        'delta': -quantidade,
+    })
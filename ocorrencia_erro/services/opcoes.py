@@ -0,0 +1,108 @@
+# ocorrencia/services/opcoes.py
+import hashlib
+import json
+import threading
+
+from django.core.cache import cache
+
+from ocorrencia_erro.models import OptionItem
+from ocorrencia_erro.services.cache_versao import versao_atual, incrementar_versao
+
+# Qualquer save/delete de OptionItem incrementa a versão e a árvore é remontada
+# na próxima leitura (ver signals.py)
+VERSAO_CACHE_KEY = 'ocorrencia:opcoes:versao'
+ARVORE_CACHE_TIMEOUT = 60 * 60 * 24
+
+AREAS = ('IMMO', 'Diagnosis', 'Device')
+
+# Cópia da árvore neste processo: (versão, {'json': bytes, 'etag': str})
+_local = None
+_local_lock = threading.Lock()
+
+
+def _com_outro(values):
+    # deduplica, remove vazio e 'Outro...' e garante 'Outro...' ao final
+    base = sorted({x for x in values if x and x != 'Outro...'}, key=lambda s: s.lower())
+    base.append('Outro...')
+    return base
+
+
+def montar_arvore():
+    """
+    Opções configuráveis:
+    - SISTEMA por área
+    - PROBLEMA por sistema (quando parent definido) e fallback por área
+      (interseção dos problemas de todos os sistemas da área + problemas globais)
+    """
+    itens = list(
+        OptionItem.objects.filter(active=True)
+        .order_by()
+        .values_list('id', 'category', 'area', 'label', 'parent_id')
+    )
+    rotulos = {item_id: label for item_id, _, _, label, _ in itens}
+    # Problemas ativos ligados a um sistema inativo continuam agrupados pelo rótulo dele
+    faltando = {parent_id for *_, parent_id in itens if parent_id and parent_id not in rotulos}
+    if faltando:
+        rotulos.update(OptionItem.objects.filter(id__in=faltando).order_by().values_list('id', 'label'))
+
+    sist = {area: set() for area in AREAS}
+    probs_por_sistema = {}  # rótulo do sistema (ou __GLOBAL__<AREA>__) -> set()
+    for _, category, area, label, parent_id in itens:
+        if category == 'SISTEMA':
+            sist.setdefault(area, set()).add(label)
+            continue
+        sistema = rotulos.get(parent_id) if parent_id else None
+        # Problema "global" (sem parent) entra no fallback de todos os sistemas da área
+        chave = sistema or f"__GLOBAL__{area}__"
+        probs_por_sistema.setdefault(chave, set()).add(label)
+
+    problema_por_area = {}
+    for area, sistemas in sist.items():
+        conjuntos = [probs_por_sistema[s] for s in sistemas if s in probs_por_sistema]
+        globais = probs_por_sistema.get(f"__GLOBAL__{area}__")
+        if globais:
+            conjuntos.insert(0, globais)
+        problema_por_area[area] = _com_outro(set.intersection(*conjuntos) if conjuntos else [])
+
+    return {
+        'SISTEMA': {area: sorted(vals, key=lambda s: s.lower()) for area, vals in sist.items()},
+        'PROBLEMA_BY_SYSTEM': {
+            sistema: _com_outro(vals)
+            for sistema, vals in probs_por_sistema.items()
+            if not sistema.startswith('__GLOBAL__')
+        },
+        'PROBLEMA_BY_AREA': problema_por_area,
+    }
+
+
+def arvore_opcoes():
+    """
+    Árvore já serializada + ETag: cópia em memória do processo, depois cache
+    compartilhado, e só então remontada a partir do banco.
+    """
+    global _local
+    versao = versao_atual(VERSAO_CACHE_KEY)
+    local = _local
+    if local is not None and local[0] == versao:
+        return local[1]
+
+    chave = f'ocorrencia:opcoes:arvore:{versao}'
+    arvore = cache.get(chave)
+    if arvore is None:
+        conteudo = json.dumps(montar_arvore(), sort_keys=True).encode('utf-8')
+        arvore = {
+            'json': conteudo,
+            'etag': '"%s"' % hashlib.sha1(conteudo).hexdigest(),
+        }
+        cache.set(chave, arvore, ARVORE_CACHE_TIMEOUT)
+
+    with _local_lock:
+        _local = (versao, arvore)
+    return arvore
+
+
+def invalidar_arvore_opcoes():
+    global _local
+    incrementar_versao(VERSAO_CACHE_KEY)
+    with _local_lock:
+        _local = None
@@ -0,0 +1,139 @@
+# ocorrencia/services/pdf.py
+import io
+
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import inch, mm
+from reportlab.pdfgen import canvas
+from reportlab.platypus import Paragraph
+
+from ocorrencia_erro.services.traducao import traduzir_textos_com_status
+from utils.pdf_jobs import Provisorio
+
+
+def dados_pdf_ocorrencia(record, exclude_problem=False):
+    """Entradas que definem o PDF da ocorrência (estado atual do record + opções)."""
+    dados = {f.attname: getattr(record, f.attname) for f in record._meta.concrete_fields}
+    dados['country_name'] = record.country.name if record.country else None
+    dados['device_name'] = record.device.name if record.device else None
+    dados['exclude_problem'] = exclude_problem
+    return dados
+
+
+def renderizar_pdf_ocorrencia(record, exclude_problem=False):
+    """
+    Gera (ReportLab) o PDF com os detalhes COMPLETOS de uma ocorrência,
+    com quebra de linha automática para textos longos. Retorna os bytes do PDF
+    (Provisorio quando a tradução falhou e os textos saíram no original).
+    """
+    # Cria um buffer de bytes em memória para o arquivo PDF
+    buffer = io.BytesIO()
+
+    # Cria o objeto PDF (canvas), usando o buffer como seu "arquivo"
+    p = canvas.Canvas(buffer, pagesize=letter)
+    width, height = letter  # Tamanho da página (8.5 x 11 polegadas)
+
+    # --- ESTILOS PARA OS PARÁGRAFOS ---
+    styles = getSampleStyleSheet()
+    style_body = styles['BodyText']
+    style_label = ParagraphStyle(name='Label', parent=style_body, fontName='Helvetica-Bold')
+
+    # --- FUNÇÕES AUXILIARES INTERNAS ---
+    def draw_field(x, y, label, value):
+        """Desenha um par de 'Rótulo: Valor' com alinhamento dinâmico."""
+        p.setFont("Helvetica-Bold", 11)
+        label_text = f"{label}:"
+        p.drawString(x, y, label_text)
+
+        label_width = p.stringWidth(label_text, "Helvetica-Bold", 11)
+        value_x_position = x + label_width + 10  # 10 pontos de espaçamento
+
+        p.setFont("Helvetica", 11)
+        p.drawString(value_x_position, y, str(value or "N/A"))
+
+        return y - (0.25 * inch) # Retorna a próxima posição Y
+
+    def draw_long_text_paragraph(x, y, label, translated_text):
+        """Desenha um rótulo e um parágrafo de texto longo (já traduzido) com quebra de linha automática."""
+        p.setFont("Helvetica-Bold", 12)
+        p.drawString(x, y, f"{label}:")
+        y -= 0.25 * inch
+
+        # Prepara o texto, substituindo quebras de linha \n por   
+
+        if translated_text and isinstance(translated_text, str) and translated_text.strip():
+            prepared_text = translated_text.replace('\n', '<br/>')
+        else:
+            prepared_text = "Nenhum conteúdo fornecido."
+
+        paragraph = Paragraph(prepared_text, style_body)
+
+        available_width = width - (2 * x)
+        w, h = paragraph.wrap(available_width, height)
+
+        if y - h < 0.75 * inch: # Margem de segurança inferior
+            p.showPage()
+            y = height - 1 * inch # Reinicia no topo da nova página
+
+        paragraph.drawOn(p, x, y - h)
+        return y - h - 0.5 * inch # Retorna a posição Y final
+
+    # ==================================================================
+    # INÍCIO DO DESENHO DO CONTEÚDO DO PDF
+    # ==================================================================
+
+    # --- Título ---
+    p.setFont("Helvetica-Bold", 18)
+    p.drawCentredString(width / 2.0, height - 0.75 * inch, "Relatório de Ocorrência")
+    p.setFont("Helvetica", 12)
+    p.drawCentredString(width / 2.0, height - 1.0 * inch, f"ID da Ocorrência: {record.codigo_externo or record.id}")
+
+    # --- Seção de Informações Gerais (2 colunas) ---
+    y_start = height - 1.5 * inch
+    p.line(0.5 * inch, y_start + 0.1 * inch, width - 0.5 * inch, y_start + 0.1 * inch)
+
+    x1 = 1 * inch
+    y1 = y_start - (6 * mm)
+
+    y1 = draw_field(x1, y1, "Tecnhical", record.technical)
+    y1 = draw_field(x1, y1, "Responsible", record.responsible)
+    y1 = draw_field(x1, y1, "Country", record.country.name if record.country else None)
+    y1 = draw_field(x1, y1, "Device", record.device.name if record.device else None)
+    y1 = draw_field(x1, y1, "Area", record.area)
+
+    # Coluna 2
+    x2 = 4.5 * inch
+    y2 = y_start - (6 * mm)
+
+    y2 = draw_field(x2, y2, "Brand", record.brand)
+    y2 = draw_field(x2, y2, "Model", record.model)
+    y2 = draw_field(x2, y2, "Serial", record.serial)
+    y2 = draw_field(x2, y2, "VIN", record.vin)
+    y2 = draw_field(x2, y2, "Year", record.year)
+    y2 = draw_field(x2, y2, "Version", record.version)
+
+    # --- Seção de Detalhes (Textos Longos) ---
+    y_next_section = min(y1, y2) - 0.3 * inch
+    p.line(0.5 * inch, y_next_section + 0.1 * inch, width - 0.5 * inch, y_next_section + 0.1 * inch)
+    y_text = y_next_section - 0.2 * inch
+    # Todas as seções longas traduzidas de uma vez (cache + uma requisição em lote)
+    textos_longos = [record.detalhes_responsavel]
+    if not exclude_problem:
+        textos_longos.insert(0, record.problem_detected)
+    traduzidos, traducao_completa = traduzir_textos_com_status(textos_longos, target_lang='EN')
+    # Problema detectado (opcional)
+    if not exclude_problem:
+        y_text = draw_long_text_paragraph(x1, y_text, "Problem Detected", traduzidos.pop(0))
+    # Detalhes do responsável
+    y_text = draw_long_text_paragraph(x1, y_text, "Responsible Details", traduzidos[0])
+
+    # ==================================================================
+    # FINALIZAÇÃO DO ARQUIVO PDF
+    # ==================================================================
+    p.showPage()
+    p.save()
+
+    if not traducao_completa:
+        # Não vai para o cache de PDFs: o próximo pedido tenta traduzir de novo
+        return Provisorio(buffer.getvalue())
+    return buffer.getvalue()
@@ -0,0 +1,124 @@
+# ocorrencia/services/permissoes.py
+import hashlib
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models import Q
+
+from ocorrencia_erro.models import Record
+from ocorrencia_erro.services.cache_versao import versao_atual, incrementar_versao
+
+GRUPO_SEMI_ADMIN = 'Semi Admin'
+GRUPO_TECNICOS_RESPONSAVEIS = 'Técnicos responsáveis'
+# Perfis de leitura: só enxergam ocorrências concluídas
+GRUPOS_SOMENTE_CONCLUIDO = ('Somente Concluído', 'Técnicos de reporte')
+
+VERSAO_CACHE_KEY = 'ocorrencia:permissoes:versao'
+ESCOPO_CACHE_TIMEOUT = 60 * 60
+
+
+class EscopoPermissao:
+    """
+    Recorte de permissão de um usuário nas ocorrências: flags de perfil,
+    países permitidos (CountryPermission) e nome usado como responsável.
+    """
+
+    def __init__(self, user_id, is_superuser, grupos, paises_ids, responsavel):
+        self.user_id = user_id
+        self.is_superuser = is_superuser
+        self.grupos = frozenset(grupos)
+        self.paises_ids = tuple(sorted(paises_ids))
+        self.responsavel = responsavel
+
+    @property
+    def is_semi_admin(self):
+        return GRUPO_SEMI_ADMIN in self.grupos
+
+    @property
+    def somente_concluido(self):
+        return any(grupo in self.grupos for grupo in GRUPOS_SOMENTE_CONCLUIDO)
+
+    @property
+    def pode_editar(self):
+        return self.is_superuser or self.is_semi_admin
+
+    @property
+    def chave(self):
+        """Chave estável do recorte (usuários com o mesmo recorte compartilham caches)."""
+        if self.is_superuser:
+            escopo = 'super'
+        elif self.somente_concluido:
+            escopo = 'concluido'
+        else:
+            paises = ','.join(str(pk) for pk in self.paises_ids)
+            escopo = f'semi|{paises}' if self.is_semi_admin else f'tecnico|{paises}|{self.responsavel}'
+        return hashlib.md5(escopo.encode('utf-8')).hexdigest()
+
+    def bloqueia_nao_concluido(self, record):
+        """Perfis de leitura não acessam ocorrências que ainda não foram concluídas."""
+        return self.somente_concluido and record.status != Record.STATUS_OCORRENCIA.DONE
+
+    def filtrar_records(self, queryset):
+        """Aplica ao queryset de Record as mesmas regras da listagem de ocorrências."""
+        if self.is_superuser:
+            return queryset
+        if self.somente_concluido:
+            # Pode visualizar TODAS as ocorrências concluídas (sem limitar por país ou responsável)
+            return queryset.filter(status=Record.STATUS_OCORRENCIA.DONE)
+        if self.is_semi_admin:
+            return queryset.filter(country_id__in=self.paises_ids)
+        return queryset.filter(
+            Q(country_id__in=self.paises_ids) &
+            Q(responsible=self.responsavel)
+        )
+
+    def to_dict(self):
+        return {
+            'user_id': self.user_id,
+            'is_superuser': self.is_superuser,
+            'grupos': sorted(self.grupos),
+            'paises_ids': list(self.paises_ids),
+            'responsavel': self.responsavel,
+        }
+
+
+def _cache_key(user_id):
+    return f'ocorrencia:permissoes:{versao_atual(VERSAO_CACHE_KEY)}:{user_id}'
+
+
+def _carregar_escopo(user):
+    # Grupos e países numa única consulta (LEFT JOIN nas duas relações)
+    linhas = User.objects.filter(pk=user.pk).values_list('groups__name', 'country_permissions__country_id')
+    grupos = {grupo for grupo, _ in linhas if grupo}
+    paises_ids = {pais_id for _, pais_id in linhas if pais_id is not None}
+    responsavel = f"{user.first_name} {user.last_name}".strip() or user.username
+    return EscopoPermissao(user.pk, user.is_superuser, grupos, paises_ids, responsavel)
+
+
+def escopo_do_usuario(user):
+    """
+    Retorna o EscopoPermissao do usuário. Fica memorizado no próprio objeto
+    user (uma resolução por request) e no cache compartilhado entre requests.
+    """
+    escopo = getattr(user, '_escopo_permissao', None)
+    if escopo is not None:
+        return escopo
+
+    chave = _cache_key(user.pk)
+    dados = cache.get(chave)
+    if dados is not None:
+        escopo = EscopoPermissao(**dados)
+    else:
+        escopo = _carregar_escopo(user)
+        cache.set(chave, escopo.to_dict(), ESCOPO_CACHE_TIMEOUT)
+
+    user._escopo_permissao = escopo
+    return escopo
+
+
+def invalidar_escopo(user_ids):
+    cache.delete_many([_cache_key(user_id) for user_id in user_ids])
+
+
+def invalidar_todos_escopos():
+    incrementar_versao(VERSAO_CACHE_KEY)
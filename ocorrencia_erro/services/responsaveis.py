@@ -0,0 +1,103 @@
+# ocorrencia/services/responsaveis.py
+import json
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+
+from ocorrencia_erro.models import Country
+from ocorrencia_erro.services.permissoes import GRUPO_TECNICOS_RESPONSAVEIS
+
+DIRETORIO_CACHE_KEY = 'ocorrencia:responsaveis:diretorio'
+DIRETORIO_CACHE_TIMEOUT = 60 * 60 * 6
+
+NOMES_CACHE_KEY = 'ocorrencia:responsaveis:nome_para_ids'
+NOMES_CACHE_TIMEOUT = 60 * 60 * 6
+
+
+def _nome_completo(first_name, last_name, username):
+    return f"{first_name} {last_name}".strip() or username
+
+
+def _montar_diretorio():
+    """
+    Monta o diretório de técnicos responsáveis por país.
+    Técnicos + países vêm de UMA consulta (LEFT JOIN em CountryPermission);
+    a lista de países é lida à parte para manter também os países sem técnico.
+    """
+    paises = list(Country.objects.order_by('name').values_list('id', 'name'))
+    nome_pais = dict(paises)
+
+    linhas = (
+        User.objects
+        .filter(groups__name=GRUPO_TECNICOS_RESPONSAVEIS)
+        .order_by('country_permissions__id')
+        .values_list('id', 'first_name', 'last_name', 'username', 'country_permissions__country_id')
+    )
+
+    tecnicos = {}
+    com_pais = set()
+    por_pais_id = {pais_id: [] for pais_id, _ in paises}
+    for user_id, first_name, last_name, username, pais_id in linhas:
+        nome = _nome_completo(first_name, last_name, username)
+        tecnicos[user_id] = nome
+        if pais_id is not None and pais_id in por_pais_id:
+            com_pais.add(user_id)
+            por_pais_id[pais_id].append({'id': user_id, 'name': nome})
+
+    todos = [{'id': user_id, 'name': tecnicos[user_id]} for user_id in sorted(tecnicos)]
+    por_pais_nome = {
+        nome_pais[pais_id]: [{'name': r['name']} for r in responsaveis]
+        for pais_id, responsaveis in por_pais_id.items()
+    }
+
+    return {
+        # Página principal (index): países por nome e apenas técnicos com país
+        'por_pais_nome_json': json.dumps(por_pais_nome),
+        'com_pais_json': json.dumps([r for r in todos if r['id'] in com_pais]),
+        # Formulário de abertura (subir_ocorrencia): países por id e todos os técnicos
+        'por_pais_id_json': json.dumps(por_pais_id),
+        'todos_json': json.dumps(todos),
+        'nomes_por_pais_id': {pais_id: [r['name'] for r in rs] for pais_id, rs in por_pais_id.items()},
+        'nomes': [r['name'] for r in todos],
+    }
+
+
+def diretorio_responsaveis():
+    """Diretório de responsáveis já serializado, lido do cache (recalculado se ausente)."""
+    diretorio = cache.get(DIRETORIO_CACHE_KEY)
+    if diretorio is None:
+        diretorio = _montar_diretorio()
+        cache.set(DIRETORIO_CACHE_KEY, diretorio, DIRETORIO_CACHE_TIMEOUT)
+    return diretorio
+
+
+def invalidar_diretorio_responsaveis():
+    cache.delete(DIRETORIO_CACHE_KEY)
+
+
+def normalizar_nome(nome):
+    return ' '.join((nome or '').split()).casefold()
+
+
+def _montar_mapa_nomes():
+    """Nome completo (como gravado em Record.responsible) e username -> ids de usuário."""
+    mapa = {}
+    for user_id, first_name, last_name, username in User.objects.values_list(
+        'id', 'first_name', 'last_name', 'username'
+    ):
+        for nome in {normalizar_nome(_nome_completo(first_name, last_name, username)), normalizar_nome(username)}:
+            mapa.setdefault(nome, []).append(user_id)
+    return mapa
+
+
+def ids_por_responsavel(nome):
+    """Ids dos usuários cujo nome completo ou username é exatamente `nome` (sem diferenciar caixa)."""
+    mapa = cache.get(NOMES_CACHE_KEY)
+    if mapa is None:
+        mapa = _montar_mapa_nomes()
+        cache.set(NOMES_CACHE_KEY, mapa, NOMES_CACHE_TIMEOUT)
+    return mapa.get(normalizar_nome(nome), [])
+
+
+def invalidar_mapa_nomes():
+    cache.delete(NOMES_CACHE_KEY)
@@ -0,0 +1,115 @@
+# ocorrencia/services/status.py
+import threading
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from ocorrencia_erro.models import Record
+from ocorrencia_erro.services.dashboard import invalidar_grafico_status
+from ocorrencia_erro.services.filtros import invalidar_opcoes_filtro
+
+STATUS = Record.STATUS_OCORRENCIA
+
+# Grupo WebSocket em que todos os NotificationConsumer escutam mudanças de status
+GRUPO_STATUS = 'ocorrencias_status'
+
+# (status de destino, status de origem) — mesma regra de Record.clean() para prazo vencido
+TRANSICOES_PRAZO = (
+    (STATUS.AWAITING_CHINA_LATE, (STATUS.AWAITING_CHINA,)),
+    (STATUS.LATE, (STATUS.REQUESTED, STATUS.PROGRESS)),
+)
+
+
+def records_vencidos(novo_status, hoje=None):
+    """Records sem conclusão e com prazo vencido que devem passar para `novo_status`."""
+    hoje = hoje or timezone.localdate()
+    origem = dict(TRANSICOES_PRAZO)[novo_status]
+    return Record.objects.filter(
+        status__in=origem,
+        finished__isnull=True,
+        deadline__lt=hoje,
+    )
+
+
+def notificar_status(ids, novo_status):
+    """Avisa os clientes conectados (ws/notifications/) quais ocorrências mudaram."""
+    if not ids:
+        return
+    try:
+        channel_layer = get_channel_layer()
+        async_to_sync(channel_layer.group_send)(
+            GRUPO_STATUS,
+            {
+                'type': 'status_atualizado',
+                'ids': ids,
+                'status': str(novo_status),
+            }
+        )
+    except Exception as e:
+        print(f"Erro ao notificar atualização de status: {e}")
+
+
+def atualizar_status_vencidos(hoje=None, dry_run=False, notificar=True):
+    """
+    Move em lote (UPDATE por conjunto) todas as ocorrências com prazo vencido:
+      - AWAITING_CHINA -> AWAITING_CHINA_LATE
+      - REQUESTED/PROGRESS -> LATE
+    Retorna {status_destino: [ids alterados]}.
+    """
+    hoje = hoje or timezone.localdate()
+    alterados = {}
+
+    with transaction.atomic():
+        for novo_status, origem in TRANSICOES_PRAZO:
+            qs = records_vencidos(novo_status, hoje).select_for_update()
+            ids = list(qs.values_list('id', flat=True))
+            if ids and not dry_run:
+                Record.objects.filter(id__in=ids, status__in=origem).update(status=novo_status)
+            alterados[novo_status] = ids
+
+    if dry_run or not any(alterados.values()):
+        return alterados
+
+    # UPDATE em lote não dispara post_save: invalida os caches derivados de Record aqui
+    invalidar_opcoes_filtro()
+    invalidar_grafico_status()
+
+    if notificar:
+        for novo_status, ids in alterados.items():
+            notificar_status(ids, novo_status)
+
+    return alterados
+
+
+_agendador = None
+
+
+def iniciar_agendador_status(intervalo):
+    """
+    Inicia (uma vez por processo) uma thread daemon que roda
+    atualizar_status_vencidos a cada `intervalo` segundos.
+    """
+    global _agendador
+    if _agendador is not None or not intervalo:
+        return _agendador
+
+    parar = threading.Event()
+
+    def loop():
+        while not parar.wait(intervalo):
+            try:
+                alterados = atualizar_status_vencidos()
+                total = sum(len(ids) for ids in alterados.values())
+                if total:
+                    print(f"Status de ocorrências atualizados: {total}")
+            except Exception as e:
+                print(f"Erro no agendador de status: {e}")
+            finally:
+                close_old_connections()
+
+    _agendador = threading.Thread(target=loop, name='ocorrencia-status', daemon=True)
+    _agendador.parar = parar
+    _agendador.start()
+    return _agendador
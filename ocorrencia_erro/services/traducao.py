@@ -0,0 +1,213 @@
+# ocorrencia/services/traducao.py
+import hashlib
+import threading
+from collections import OrderedDict
+
+import requests
+from django.conf import settings
+from langdetect import detect, DetectorFactory
+from requests.adapters import HTTPAdapter
+
+from ocorrencia_erro.models import Traducao
+
+DetectorFactory.seed = 0
+
+# Limite de textos por requisição da API do DeepL
+DEEPL_MAX_TEXTOS = 50
+LRU_TAMANHO = 512
+
+
+def detectar_idioma(texto):
+    if not texto or len(texto.strip()) < 3:  # textos muito curtos
+        return 'PT'  # fallback
+    try:
+        return detect(texto).upper()  # retorna 'PT', 'ES', 'EN', etc.
+    except:
+        return 'PT'
+
+
+def hash_texto(texto):
+    return hashlib.sha256(texto.encode('utf-8')).hexdigest()
+
+
+class _LRU:
+    """LRU em memória (por processo) na frente da tabela Traducao."""
+
+    def __init__(self, tamanho):
+        self.tamanho = tamanho
+        self._dados = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, chave):
+        with self._lock:
+            if chave not in self._dados:
+                return None
+            self._dados.move_to_end(chave)
+            return self._dados[chave]
+
+    def set(self, chave, valor):
+        with self._lock:
+            self._dados[chave] = valor
+            self._dados.move_to_end(chave)
+            while len(self._dados) > self.tamanho:
+                self._dados.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._dados.clear()
+
+
+_lru = _LRU(LRU_TAMANHO)
+
+
+class DeepLBackend:
+    """Traduz vários textos por requisição, reaproveitando conexões (Session com pool)."""
+
+    url = "https://api-free.deepl.com/v2/translate"
+
+    def __init__(self, api_key=None, url=None, timeout=None):
+        self.api_key = api_key or settings.DEEPL_API_KEY
+        self.url = url or getattr(settings, 'DEEPL_API_URL', self.url)
+        self.timeout = timeout or getattr(settings, 'TRADUCAO_TIMEOUT', 10)
+        self.session = requests.Session()
+        self.session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=10))
+        self.session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=10))
+
+    def traduzir_lote(self, textos, source_lang, target_lang):
+        traduzidos = []
+        for inicio in range(0, len(textos), DEEPL_MAX_TEXTOS):
+            bloco = textos[inicio:inicio + DEEPL_MAX_TEXTOS]
+            response = self.session.post(
+                self.url,
+                data={
+                    "text": bloco,
+                    "source_lang": source_lang,
+                    "target_lang": target_lang,
+                },
+                headers={"Authorization": f"DeepL-Auth-Key {self.api_key}"},
+                timeout=self.timeout,
+            )
+            response.raise_for_status()
+            traduzidos.extend(t['text'] for t in response.json()['translations'])
+        return traduzidos
+
+
+class LocalBackend:
+    """Backend de desenvolvimento/testes: não acessa a rede, só marca o idioma de destino."""
+
+    def traduzir_lote(self, textos, source_lang, target_lang):
+        return [f"[{target_lang}] {texto}" for texto in textos]
+
+
+BACKENDS = {
+    'deepl': DeepLBackend,
+    'local': LocalBackend,
+}
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = BACKENDS[getattr(settings, 'TRADUCAO_BACKEND', 'deepl')]()
+        return _backend
+
+
+def traduzir_textos(textos, target_lang='EN'):
+    """
+    Traduz uma lista de textos para `target_lang`, na ordem recebida.
+    Ordem de consulta: LRU em memória -> tabela Traducao -> backend (uma
+    requisição por idioma de origem). Em caso de erro devolve o texto original.
+    """
+    return traduzir_textos_com_status(textos, target_lang)[0]
+
+
+def traduzir_textos_com_status(textos, target_lang='EN'):
+    """
+    Como traduzir_textos, mas retorna (textos, completo): completo é False
+    quando algum texto ficou no original por falha do backend.
+    """
+    completo = True
+    resultado = [None] * len(textos)
+    pendentes = {}  # hash -> (texto, [posições])
+
+    for pos, texto in enumerate(textos):
+        if not texto:
+            resultado[pos] = "N/A"
+            continue
+        chave = hash_texto(texto)
+        traduzido = _lru.get((chave, target_lang))
+        if traduzido is not None:
+            resultado[pos] = traduzido
+        else:
+            pendentes.setdefault(chave, (texto, []))[1].append(pos)
+
+    if not pendentes:
+        return resultado, completo
+
+    # Idioma de origem só é detectado para o que não estava no LRU
+    por_origem = {}
+    for chave, (texto, _) in pendentes.items():
+        source_lang = detectar_idioma(texto)
+        if source_lang == target_lang:
+            traduzido = texto
+        else:
+            por_origem.setdefault(source_lang, []).append(chave)
+            continue
+        _lru.set((chave, target_lang), traduzido)
+        for pos in pendentes[chave][1]:
+            resultado[pos] = traduzido
+
+    for source_lang, chaves in por_origem.items():
+        traduzidos = dict(
+            Traducao.objects
+            .filter(hash_texto__in=chaves, source_lang=source_lang, target_lang=target_lang)
+            .values_list('hash_texto', 'texto_traduzido')
+        )
+
+        faltando = [chave for chave in chaves if chave not in traduzidos]
+        if faltando:
+            try:
+                novos = get_backend().traduzir_lote(
+                    [pendentes[chave][0] for chave in faltando], source_lang, target_lang
+                )
+            except Exception as e:
+                print(f"Erro na tradução: {e}")
+                novos = None
+
+            if novos is not None:
+                Traducao.objects.bulk_create(
+                    [
+                        Traducao(
+                            hash_texto=chave,
+                            source_lang=source_lang,
+                            target_lang=target_lang,
+                            texto_original=pendentes[chave][0],
+                            texto_traduzido=traduzido,
+                        )
+                        for chave, traduzido in zip(faltando, novos)
+                    ],
+                    ignore_conflicts=True,
+                )
+                traduzidos.update(zip(faltando, novos))
+
+        for chave in chaves:
+            texto, posicoes = pendentes[chave]
+            if chave in traduzidos:
+                traduzido = traduzidos[chave]
+                _lru.set((chave, target_lang), traduzido)
+            else:
+                # Falha no backend: não cacheia, tenta de novo na próxima chamada
+                traduzido = texto
+                completo = False
+            for pos in posicoes:
+                resultado[pos] = traduzido
+
+    return resultado, completo
+
+
+def traduzir(texto, target_lang='EN'):
+    return traduzir_textos([texto], target_lang)[0]
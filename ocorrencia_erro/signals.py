@@ -0,0 +1,109 @@
+from django.contrib.auth.models import User, Group
+from django.db import transaction
+from django.db.models.signals import post_init, post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from ocorrencia_erro.models import Record, Country, Device, CountryPermission, Notificacao, OptionItem
+from ocorrencia_erro.services.chat_contexto import avisar_mudanca_responsavel
+from ocorrencia_erro.services.dashboard import invalidar_grafico_status
+from ocorrencia_erro.services.filtros import invalidar_opcoes_filtro
+from ocorrencia_erro.services.notificacoes import em_remocao_em_lote, notificacao_criada, notificacoes_removidas
+from ocorrencia_erro.services.opcoes import invalidar_arvore_opcoes
+from ocorrencia_erro.services.permissoes import invalidar_escopo, invalidar_todos_escopos
+from ocorrencia_erro.services.responsaveis import invalidar_diretorio_responsaveis, invalidar_mapa_nomes
+
+
+@receiver(post_save, sender=Record)
+@receiver(post_delete, sender=Record)
+@receiver(post_save, sender=Country)
+@receiver(post_delete, sender=Country)
+@receiver(post_save, sender=Device)
+@receiver(post_delete, sender=Device)
+def atualizar_opcoes_filtro(sender, **kwargs):
+    # Opções de filtro exibem valores de Record e nomes de país/equipamento
+    invalidar_opcoes_filtro()
+    if sender is Record:
+        invalidar_grafico_status()
+    if sender is Country:
+        invalidar_diretorio_responsaveis()
+
+
+@receiver(post_init, sender=Record)
+def guardar_responsavel_inicial(sender, instance, **kwargs):
+    # Valor carregado do banco, para detectar troca de responsável no post_save
+    if 'responsible' not in instance.get_deferred_fields():
+        instance._responsible_inicial = instance.responsible
+
+
+@receiver(post_save, sender=Record)
+def atualizar_contexto_chat(sender, instance, created, **kwargs):
+    anterior = getattr(instance, '_responsible_inicial', None)
+    instance._responsible_inicial = instance.responsible
+    if not created and anterior != instance.responsible:
+        # Chats abertos recalculam quem recebe as notificações
+        avisar_mudanca_responsavel(instance.id)
+
+
+@receiver(post_save, sender=Notificacao)
+def enviar_notificacao_criada(sender, instance, created, **kwargs):
+    # Contador em cache + push no grupo user_{id} (sem polling de /notificacoes/contar/)
+    if created and not instance.lida:
+        transaction.on_commit(lambda: notificacao_criada(instance))
+
+
+@receiver(post_delete, sender=Notificacao)
+def enviar_notificacao_removida(sender, instance, **kwargs):
+    # marcar_como_lidas ajusta o contador uma vez para o lote inteiro
+    if not instance.lida and not em_remocao_em_lote():
+        transaction.on_commit(lambda: notificacoes_removidas(instance.user_id, 1))
+
+
+@receiver(post_save, sender=OptionItem)
+@receiver(post_delete, sender=OptionItem)
+def atualizar_arvore_opcoes(sender, **kwargs):
+    # options/ (SISTEMA/PROBLEMA do formulário) é remontado na próxima leitura
+    invalidar_arvore_opcoes()
+
+
+@receiver(post_save, sender=CountryPermission)
+@receiver(post_delete, sender=CountryPermission)
+def atualizar_escopo_por_pais(sender, instance, **kwargs):
+    invalidar_escopo([instance.user_id])
+    invalidar_diretorio_responsaveis()
+
+
+@receiver(post_save, sender=User)
+def atualizar_escopo_usuario(sender, instance, **kwargs):
+    # Nome (responsável) e is_superuser fazem parte do escopo
+    invalidar_escopo([instance.pk])
+    invalidar_diretorio_responsaveis()
+    invalidar_mapa_nomes()
+
+
+@receiver(post_delete, sender=User)
+def remover_usuario_do_mapa_nomes(sender, instance, **kwargs):
+    invalidar_mapa_nomes()
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def atualizar_escopo_por_grupo(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    invalidar_diretorio_responsaveis()
+    if not reverse:
+        # user.groups.add/remove/clear
+        invalidar_escopo([instance.pk])
+    elif pk_set:
+        # group.user_set.add/remove
+        invalidar_escopo(pk_set)
+    else:
+        # group.user_set.clear(): não sabemos quais usuários saíram
+        invalidar_todos_escopos()
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def atualizar_escopos_por_grupo_alterado(sender, **kwargs):
+    # Renomear/apagar um grupo muda o perfil de todos os seus membros
+    invalidar_todos_escopos()
+    invalidar_diretorio_responsaveis()
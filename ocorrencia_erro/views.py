@@ -10,14 +10,13 @@ from datetime import timedelta
 from utils.weasyprint_loader import configure_weasyprint
 configure_weasyprint()
 
-from langdetect import detect, DetectorFactory
-DetectorFactory.seed = 0
-
 from django.views.decorators.csrf import csrf_exempt
 from django.shortcuts import render, redirect, get_object_or_404
 from django.http import JsonResponse, HttpResponse, Http404
 from django.db.models import Q
 from django.core.paginator import Paginator
+from django.conf import settings
+from django.utils.cache import get_conditional_response
 from django.urls import reverse
 from django.contrib.auth import authenticate, login as login_django, logout as logout_django
 from django.contrib.auth.models import User, Group
@@ -45,9 +44,27 @@ from ocorrencia_erro.services.dashboard import (
     dashboard_responsavel,
     dashboard_por_status,
     dashboard_por_pais,
-    lista_detalhada
+    lista_detalhada,
+    chave_recorte_dashboard,
+    contagem_status_por_responsavel,
 )
 from ocorrencia_erro.services.dashboard import dashboard_responsavel
+from ocorrencia_erro.services.arquivos import arquivos_por_record, resposta_download, resposta_zip
+from ocorrencia_erro.services.filtros import (
+    DATE_COLUMNS,
+    STATUS_OCORRENCIA,
+    STATUS_MAP_REVERSED,
+    opcoes_filtro_cacheadas,
+)
+from ocorrencia_erro.services.notificacoes import contar_nao_lidas, dados_notificacao
+from ocorrencia_erro.services.opcoes import arvore_opcoes
+from ocorrencia_erro.services.permissoes import escopo_do_usuario
+from ocorrencia_erro.services.responsaveis import diretorio_responsaveis, ids_por_responsavel
+from ocorrencia_erro.services.traducao import traduzir, traduzir_textos
+from ocorrencia_erro.services.pdf import dados_pdf_ocorrencia, renderizar_pdf_ocorrencia
+from ocorrencia_erro.services.cache_versao import versao_atual
+from ocorrencia_erro.services import filtros as filtros_service
+from utils import pdf_jobs
 
 from django.template.loader import render_to_string
 from django.http import HttpResponse
@@ -58,16 +75,7 @@ from ocorrencia_erro.services.dashboard import dashboard_responsavel
 from .models import Record, Country, CountryPermission, Device, ArquivoOcorrencia, Notificacao, OptionItem, ChatMessage
 
 # Constantes
-DATE_COLUMNS = ["data", "deadline", "finished"]
-STATUS_OCORRENCIA = {
-    'Concluído': 'DONE',
-    'Atrasado': 'LATE',
-    'Em progresso': 'PROGRESS',
-    'Requisitado': 'REQUESTED',
-    'Aguardando China': 'AWAITING_CHINA',
-    'China Atrasada': 'AWAITING_CHINA_LATE', # Adicionado novo status
-}
-STATUS_MAP_REVERSED = {v: k for k, v in STATUS_OCORRENCIA.items()}
+# DATE_COLUMNS / STATUS_OCORRENCIA / STATUS_MAP_REVERSED vivem em services/filtros.py
 
 # Problemas padrão por área (usados ao criar um novo SISTEMA)
 # Mantém alinhado com as seeds de migração (0004_seed_problem_by_system)
@@ -119,22 +127,8 @@ ALLOWED_SORT_COLUMNS = [
     'serial', 'status', 'technical', 'version', 'year'
 ]
 
-FILTERABLE_COLUMNS_FOR_OPTIONS = [
-    'id','technical', 'country', 'device', 'area', 'sistema', 'tipo_problema', 'serial', 'brand',
-    'model', 'year', 'version', 'status', 'responsible',
-    'data', 'deadline', 'finished'
-]
-
 URL_LOGIN = 'subir_ocorrencia'
 
-def detectar_idioma(texto):
-    if not texto or len(texto.strip()) < 3:  # textos muito curtos
-        return 'PT'  # fallback
-    try:
-        return detect(texto).upper()  # retorna 'PT', 'ES', 'EN', etc.
-    except:
-        return 'PT'
-
 @require_http_methods(['POST'])
 def traduzir_api(request):
     """
@@ -159,88 +153,17 @@ def traduzir_api(request):
         return JsonResponse({"error": str(e)}, status=500)
 
 
-def traduzir_texto(texto, target_lang='EN', api_key='71437a8a-e2de-43da-a9d7-ef10bd2550cf:fx'):
+def traduzir_texto(texto, target_lang='EN'):
     """
-    Traduz texto curto ou longo para inglês usando DeepL Free,
-    detectando automaticamente o idioma de origem.
+    Traduz texto curto ou longo (padrão: inglês), detectando automaticamente
+    o idioma de origem. Usa o cache de traduções (ver services/traducao.py).
     """
-    if not texto:
-        return "N/A"
-
-    source_lang = detectar_idioma(texto)
-
-    url = "https://api-free.deepl.com/v2/translate"
-    headers = {"Content-Type": "application/x-www-form-urlencoded"}
-    payload = {
-        "auth_key": api_key,
-        "text": texto,
-        "source_lang": source_lang,
-        "target_lang": target_lang,
-    }
-
-    try:
-        response = requests.post(url, data=payload, headers=headers)
-        response.raise_for_status()
-        result = response.json()
-        return result['translations'][0]['text']
-    except Exception as e:
-        print(f"Erro na tradução: {e}")
-        return texto
+    return traduzir(texto, target_lang)
 
 def get_responsaveis():
-    paises = Country.objects.all().order_by('name')
-    responsaveis_por_pais = {}
-    todos_responsaveis = []
-    
-    # Buscar o grupo "Técnicos responsáveis"
-    try:
-        grupo_tecnicos = Group.objects.get(name='Técnicos responsáveis')
-    except Group.DoesNotExist:
-        # Se o grupo não existir, retorna estruturas vazias
-        return json.dumps({}), json.dumps([])
-    
-    # Buscar apenas usuários que são técnicos responsáveis E têm permissões de país
-    usuarios_tecnicos = grupo_tecnicos.user_set.filter(
-        country_permissions__isnull=False
-    ).distinct().values('id', 'first_name', 'last_name', 'username')
-    
-    # Criar lista de todos os responsáveis (apenas técnicos)
-    responsaveis_dict = {}
-    for user in usuarios_tecnicos:
-        nome_completo = f"{user['first_name']} {user['last_name']}".strip()
-        if not nome_completo:
-            nome_completo = user['username']
-        
-        responsavel_data = {
-            'id': user['id'],
-            'name': nome_completo
-        }
-        
-        todos_responsaveis.append(responsavel_data)
-        responsaveis_dict[user['id']] = responsavel_data
-            
-    # Mapear responsáveis por país usando CountryPermission (apenas técnicos)
-    for pais in paises:
-        # Buscar usuários técnicos que têm permissão neste país
-        permissoes = CountryPermission.objects.filter(
-            country=pais,
-            user__groups=grupo_tecnicos  # Filtra apenas usuários do grupo técnicos
-        ).select_related('user')
-        
-        responsaveis_por_pais[pais.name] = []
-        for permissao in permissoes:
-            user = permissao.user
-            nome_completo = f"{user.first_name} {user.last_name}".strip()
-            if not nome_completo:
-                nome_completo = user.username
-            
-            responsaveis_por_pais[pais.name].append({
-                'name': nome_completo,
-            })
-    
-    responsaveis_por_pais_json = json.dumps(responsaveis_por_pais)
-    todos_responsaveis_json = json.dumps(todos_responsaveis)
-    return (responsaveis_por_pais_json, todos_responsaveis_json)
+    """Responsáveis por país (nome) e lista de técnicos com país, já em JSON (cacheado)."""
+    diretorio = diretorio_responsaveis()
+    return (diretorio['por_pais_nome_json'], diretorio['com_pais_json'])
 
 def subir_arquivo(files, record):
     for file in files:
@@ -261,13 +184,10 @@ def subir_arquivo(files, record):
 def download_todos_arquivos(request, record_id):
     record = get_object_or_404(Record, id=record_id)
     # Usuários de leitura (reporte/concluído) só podem baixar arquivos de ocorrências concluídas
-    if (request.user.groups.filter(name='Somente Concluído').exists() or
-        request.user.groups.filter(name='Técnicos de reporte').exists()) and record.status != Record.STATUS_OCORRENCIA.DONE:
+    if escopo_do_usuario(request.user).bloqueia_nao_concluido(record):
         raise Http404("Arquivo não encontrado ou sem permissão")
     arquivos = ArquivoOcorrencia.objects.filter(record=record)
 
-    print(arquivos)
-
     if not arquivos.exists():
         return JsonResponse({'status': 'error', 'message': 'Nenhum arquivo encontrado.'}, status=404)
 
@@ -278,46 +198,17 @@ def download_todos_arquivos(request, record_id):
         response = FileResponse(arquivo.arquivo.open("rb"), as_attachment=True, filename=arquivo.nome_original)
         return response
     else:
-        # Gera o zip temporário
-        zip_buffer = io.BytesIO()
-        with zipfile.ZipFile(zip_buffer, 'w') as zip_file:
-            for arq in arquivos:
-                zip_file.write(arq.arquivo.path, arcname=arq.nome_original)
-        zip_buffer.seek(0)
-
-        response = HttpResponse(zip_buffer, content_type='application/zip')
-        response['Content-Disposition'] = f'attachment; filename=arquivos_ocorrencia_{record.id}.zip'
-        return response
+        # ZIP em streaming (ou o ZIP já pronto do cache, se os anexos não mudaram)
+        return resposta_zip(request, arquivos.order_by('id'), f'arquivos_ocorrencia_{record.id}.zip')
 
 
 @login_required(login_url=URL_LOGIN)
 def index(request):
     responsaveis_por_pais_json, todos_responsaveis_json = get_responsaveis()
     
-    ocorrencias_queryset = Record.objects.all()
     user = request.user
-
-    if not user.is_superuser:
-        # Usuário somente leitura de concluídos (reporte)
-        is_view_done_only = (
-            user.groups.filter(name='Somente Concluído').exists() or
-            user.groups.filter(name='Técnicos de reporte').exists()
-        )
-        if is_view_done_only:
-            # Pode visualizar TODAS as ocorrências concluídas (sem limitar por país ou responsável)
-            ocorrencias_queryset = Record.objects.filter(status=Record.STATUS_OCORRENCIA.DONE)
-        else:
-            paises_permitidos_ids = CountryPermission.objects.filter(user=user).values_list('country_id', flat=True)
-            is_semi_admin = user.groups.filter(name='Semi Admin').exists()
-
-            if is_semi_admin:
-                ocorrencias_queryset = ocorrencias_queryset.filter(country_id__in=list(paises_permitidos_ids))
-            else:
-                nome_completo_usuario = f"{user.first_name} {user.last_name}".strip() or user.username
-                ocorrencias_queryset = ocorrencias_queryset.filter(
-                    Q(country_id__in=list(paises_permitidos_ids)) & 
-                    Q(responsible=nome_completo_usuario)
-                )
+    escopo = escopo_do_usuario(user)
+    ocorrencias_queryset = escopo.filtrar_records(Record.objects.all())
 
     status_map = {
         Record.STATUS_OCORRENCIA.DONE: _("Concluído"),
@@ -331,28 +222,22 @@ def index(request):
 
     ocorrencias_dict = defaultdict(lambda: {label: 0 for label in status_map.values()})
 
-    for record in ocorrencias_queryset.values('responsible', 'status'):
-        nome = record['responsible']
-        status_codigo = record['status']
+    # Totais já agregados no banco (COUNT por responsável/status), cacheados por escopo
+    for nome, status_codigo, total in contagem_status_por_responsavel(escopo, ocorrencias_queryset):
         status_legivel = status_map.get(status_codigo)
 
         if nome and nome != "Não identificado" and status_legivel:
-            ocorrencias_dict[nome][status_legivel] += 1
+            ocorrencias_dict[nome][status_legivel] += total
 
     ocorrencias_json = json.dumps(ocorrencias_dict, ensure_ascii=False)
 
     # --- INÍCIO DA ALTERAÇÃO NECESSÁRIA ---
 
-    is_super = user.is_superuser
-    # 1. Reutiliza a verificação de 'is_semi_admin' que já fizemos
-    is_semi_admin = user.groups.filter(name='Semi Admin').exists() 
-    is_somente_concluido = (
-        user.groups.filter(name='Somente Concluído').exists() or
-        user.groups.filter(name='Técnicos de reporte').exists()
-    )
-    
+    is_super = escopo.is_superuser
+    is_somente_concluido = escopo.somente_concluido
+
     # 2. Cria a nova variável de permissão
-    has_edit_permission = is_super or is_semi_admin
+    has_edit_permission = escopo.pode_editar
 
     # --- FIM DA ALTERAÇÃO NECESSÁRIA ---
 
@@ -360,7 +245,7 @@ def index(request):
         permitted_countries = Country.objects.all().values_list('name', flat=True)
     else:
         permitted_countries = Country.objects.filter(
-            id__in=CountryPermission.objects.filter(user=user).values_list('country_id', flat=True)
+            id__in=escopo.paises_ids
         ).values_list('name', flat=True)
 
     context = {
@@ -375,6 +260,7 @@ def index(request):
         'responsaveis_por_pais': responsaveis_por_pais_json,
         'todos_responsaveis': todos_responsaveis_json,
         'ocorrencias_json': ocorrencias_json,
+        'notificacoes_polling': getattr(settings, 'NOTIFICACOES_POLLING', False),
     }
     return render(request, 'ocorrencia/index.html', context)
 
@@ -390,56 +276,9 @@ def filter_data_view(request):
             # 1. Consulta base otimizada
             base_queryset = Record.objects.select_related('device', 'country')
             
-            user = request.user
-            
-            # --- INÍCIO DA DEPURAÇÃO ---
-            print(f"--- Iniciando depuração para o usuário: {user.username} ---")
-            
-            if not user.is_superuser:
-                # 1. Quais países este usuário pode ver?
-                is_somente_concluido = (
-                    user.groups.filter(name='Somente Concluído').exists() or
-                    user.groups.filter(name='Técnicos de reporte').exists()
-                )
-                if is_somente_concluido:
-                    print("Usuário do grupo de leitura (reporte). Filtrando apenas status DONE, sem outras restrições.")
-                    base_queryset = base_queryset.filter(status=Record.STATUS_OCORRENCIA.DONE)
-                    paises_permitidos_lista = []
-                    is_semi_admin = False
-                else:
-                    paises_permitidos_ids = CountryPermission.objects.filter(user=user).values_list('country_id', flat=True)
-                    paises_permitidos_lista = list(paises_permitidos_ids)
-                    print(f"IDs dos países permitidos: {paises_permitidos_lista}")
-
-                    # 2. O usuário é Semi Admin?
-                    is_semi_admin = user.groups.filter(name='Semi Admin').exists()
-                    print(f"É Semi Admin? {is_semi_admin}")
-                
-                # 3. Quais são TODOS os grupos do usuário?
-                grupos_usuario = list(user.groups.all().values_list('name', flat=True))
-                print(f"Grupos do usuário: {grupos_usuario}")
-
-                if is_somente_concluido:
-                    # Já filtrado por DONE acima
-                    pass
-                elif is_semi_admin:
-                    print("Lógica de Semi Admin ativada. Filtrando por países...")
-                    base_queryset = base_queryset.filter(country_id__in=paises_permitidos_lista)
-                else:
-                    print("Lógica de Técnico Padrão ativada. Filtrando por países E responsável...")
-                    nome_completo_usuario = f"{user.first_name} {user.last_name}".strip() or user.username
-                    print(f"Filtrando por responsável: '{nome_completo_usuario}'")
-                    base_queryset = base_queryset.filter(
-                        Q(country_id__in=paises_permitidos_lista) & 
-                        Q(responsible=nome_completo_usuario)
-                    )
-                
-                print(f"Total de registros após filtro de permissão: {base_queryset.count()}")
-            else:
-                print("Usuário é Superuser. Nenhuma permissão aplicada.")
-            
-            print("--- Fim da depuração ---")
-            # --- FIM DA DEPURAÇÃO ---
+            # Recorte de permissão (país / responsável / somente concluídos)
+            escopo = escopo_do_usuario(request.user)
+            base_queryset = escopo.filtrar_records(base_queryset)
 
             queryset = base_queryset
             options_queryset = base_queryset     
@@ -535,7 +374,9 @@ def filter_data_view(request):
 
             # 5. Preparação dos dados para a resposta JSON
             records_data = []
-            for record in page_obj.object_list:
+            page_records = list(page_obj.object_list)
+            arquivos_da_pagina = arquivos_por_record(page_records)
+            for record in page_records:
                 record_data = {
                     'id': record.id,
                     'codigo_externo': record.codigo_externo or str(record.id),
@@ -573,78 +414,27 @@ def filter_data_view(request):
                     'deadline': record.deadline.strftime('%d/%m/%Y') if record.deadline else '',
                     'responsible': record.responsible or '',
                     'finished': record.finished.strftime('%d/%m/%Y') if record.finished else '',
-                    'arquivos': [
-                        {
-                            'id': arquivo.id,
-                            'record_id': arquivo.record.codigo_externo or str(arquivo.record_id),
-                            'url': arquivo.arquivo.url,
-                            'nome_original': arquivo.nome_original,
-                            "data_upload": arquivo.data_upload.strftime("%d/%m/%Y %H:%M")
-                        }
-                        for arquivo in ArquivoOcorrencia.objects.filter(record=record)
-                    ],
+                    'arquivos': arquivos_da_pagina.get(record.id, []),
                 }
                 record_data['status'] = record_data['status_display']
                 records_data.append(record_data)
 
-            # 6. Geração de opções de filtro dinâmicas
-            FILTERABLE_COLUMNS_FOR_OPTIONS = [
-                'codigo_externo', 'technical', 'country', 'device', 'area', 'sistema', 'tipo_problema', 'serial', 'brand',
-                'model', 'year', 'version', 'status', 'responsible',
-                'data', 'deadline', 'finished'
-            ]
-
-            filter_options = {}
-            # IMPORTANTE: As opções de filtro são geradas a partir do `queryset` que já foi
-            # filtrado por permissão, garantindo que o usuário só veja opções relevantes.
-            for col in FILTERABLE_COLUMNS_FOR_OPTIONS:
-                if col == 'country':
-                    options = options_queryset.exclude(country__isnull=True).values_list('country__name', flat=True).distinct()
-                    filter_options[col] = sorted(list(set([opt.upper() for opt in options if opt])))
-                elif col == 'device':
-                    options = options_queryset.exclude(device__isnull=True).values_list('device__name', flat=True).distinct()
-                    filter_options[col] = sorted(list(set([opt.upper() for opt in options if opt])))
-                elif col == 'status':
-                    status_values = options_queryset.values_list('status', flat=True).distinct()
-                    filter_options[col] = sorted(
-                        [STATUS_MAP_REVERSED.get(opt, opt) for opt in status_values if opt],
-                        key=lambda x: list(STATUS_OCORRENCIA.keys()).index(x) if x in STATUS_OCORRENCIA else float('inf')
-                    )
-                elif col in DATE_COLUMNS:
-                    dates = options_queryset.exclude(**{f'{col}__isnull': True}).values_list(col, flat=True).distinct()
-                    date_tree = defaultdict(lambda: defaultdict(list))
-                    for dt in dates:
-                        if dt:
-                            try:
-                                dt = dt if isinstance(dt, date) else datetime.strptime(str(dt), '%Y-%m-%d').date()
-                                year = str(dt.year)
-                                month = dt.strftime('%m')
-                                day = dt.strftime('%d')
-                                if day not in date_tree[year][month]:
-                                    date_tree[year][month].append(day)
-                            except:
-                                continue
-                    for year in date_tree:
-                        for month in date_tree[year]:
-                            date_tree[year][month] = sorted(date_tree[year][month])
-                        date_tree[year] = dict(sorted(date_tree[year].items()))
-                    filter_options[col] = dict(sorted(date_tree.items()))
-                elif col == 'codigo_externo':
-                    options = options_queryset.values_list(col, flat=True).distinct()
-                    filter_options[col] = sorted(list(set([opt for opt in options if opt is not None])))
-                else:
-                    options = options_queryset.exclude(**{f'{col}__isnull': True}).exclude(**{f'{col}__exact': ''}).values_list(col, flat=True).distinct()
-                    filter_options[col] = sorted(list(set([opt.upper() for opt in options if opt is not None])))
+            # 6. Opções de filtro dinâmicas (cacheadas por escopo de permissão).
+            # Navegação só de página pode pular o recálculo com include_filter_options=false.
+            response_data = {'records': records_data}
+            if data.get('include_filter_options', True):
+                # IMPORTANTE: As opções de filtro são geradas a partir do `queryset` que já foi
+                # filtrado por permissão, garantindo que o usuário só veja opções relevantes.
+                response_data['filter_options'] = opcoes_filtro_cacheadas(escopo, options_queryset)
 
             # 7. Resposta final
-            return JsonResponse({
-                'records': records_data,
-                'filter_options': filter_options,
+            response_data.update({
                 'num_pages': paginator.num_pages,
                 'current_page': page_obj.number,
                 'has_next': page_obj.has_next(),
                 'has_previous': page_obj.has_previous(),
             })
+            return JsonResponse(response_data)
 
         except Exception as e:
             import traceback
@@ -752,58 +542,6 @@ def criar_usuario(request):
 # @login_required(login_url='subir_ocorrencia')
 def subir_ocorrencia(request):
     has_full_permission = request.user.is_superuser
-    paises = Country.objects.all().order_by('name')
-    responsaveis_por_pais = {}
-    todos_responsaveis = []
-    todos_equipamentos = []
-    nome_responsaveis = []
-    # Buscar os dois grupos
-    grupo_responsaveis = Group.objects.filter(name='Técnicos responsáveis').first()
-
-    # Prepara lista de responsáveis (usuários de QUALQUER UM dos dois grupos)
-    usuarios_query = User.objects.all()
-    
-    # Filtra usuários que estão em pelo menos um dos grupos
-    if  grupo_responsaveis:
-        from django.db.models import Q
-        query_filter = Q()
-        if grupo_responsaveis:
-            query_filter |= Q(groups=grupo_responsaveis)
-        
-        usuarios_com_permissao = usuarios_query.filter(query_filter).distinct().values('id', 'first_name', 'last_name', 'username')
-    else:
-        usuarios_com_permissao = []
-
-    for user in usuarios_com_permissao:
-        nome_completo = f"{user['first_name']} {user['last_name']}".strip()
-        if not nome_completo:
-            nome_completo = user['username']
-        todos_responsaveis.append({'id': user['id'], 'name': nome_completo})
-        nome_responsaveis.append(nome_completo)
-        
-
-    # Prepara lista de equipamentos
-    todos_equipamentos = list(Device.objects.all().values('id', 'name'))
-
-    # Mapeia responsáveis por país (usuários de qualquer um dos dois grupos)
-    for pais in paises:
-        responsaveis_por_pais[pais.id] = []
-        
-        # Filtra CountryPermission pelos usuários dos grupos
-        permissoes_query = CountryPermission.objects.filter(country=pais)
-        
-        if grupo_responsaveis:
-            from django.db.models import Q
-            user_filter = Q()
-            if grupo_responsaveis:
-                user_filter |= Q(user__groups=grupo_responsaveis)
-            
-            permissoes_query = permissoes_query.filter(user_filter).distinct()
-        
-        for permissao in permissoes_query.select_related('user'):
-            user = permissao.user
-            nome_completo = f"{user.first_name} {user.last_name}".strip() or user.username
-            responsaveis_por_pais[pais.id].append({'id': user.id, 'name': nome_completo})
 
     if request.method == 'POST':
         try:
@@ -936,10 +674,11 @@ def subir_ocorrencia(request):
             technical = request.POST.get("technical").capitalize()
             print(technical)
 
-            # Extrai apenas os nomes da lista de dicionários
-            nomes_responsaveis_pais = [r['name'] for r in responsaveis_por_pais[pais.id]]
             if not has_full_permission:
-                if technical in nome_responsaveis and technical in nomes_responsaveis_pais:
+                # Técnico responsável pelo país selecionado assume a ocorrência
+                diretorio = diretorio_responsaveis()
+                nomes_responsaveis_pais = diretorio['nomes_por_pais_id'].get(country.id, [])
+                if technical in diretorio['nomes'] and technical in nomes_responsaveis_pais:
                     record_data['responsible'] = request.POST.get("technical").capitalize()
             try:
                 record = Record.objects.create(**record_data)
@@ -980,15 +719,19 @@ def subir_ocorrencia(request):
             }, status=500)
 
     # GET request - prepara dados para o template
+    # Diretório de técnicos responsáveis por país (cacheado; ver services/responsaveis.py)
+    diretorio = diretorio_responsaveis()
+    paises = Country.objects.all().order_by('name')
     paises_dict = {str(p.id): p.name for p in paises}
+    todos_equipamentos = list(Device.objects.all().values('id', 'name'))
 
     # se for GET normal (primeiro carregamento)
     context = {
         'paises': paises,
         'paises_json': json.dumps(paises_dict),
         'has_full_permission': has_full_permission,
-        'responsaveis_por_pais': json.dumps(responsaveis_por_pais),
-        'todos_responsaveis': json.dumps(todos_responsaveis),
+        'responsaveis_por_pais': diretorio['por_pais_id_json'],
+        'todos_responsaveis': diretorio['todos_json'],
         'todos_equipamentos_raw': todos_equipamentos,
     }
 
@@ -1074,7 +817,7 @@ def get_paises_por_responsavel(request):
 @login_required(login_url=URL_LOGIN)
 def alterar_dados(request):
     # Bloqueia edição para usuários de leitura (reporte/concluído)
-    if request.user.groups.filter(name='Somente Concluído').exists() or request.user.groups.filter(name='Técnicos de reporte').exists():
+    if escopo_do_usuario(request.user).somente_concluido:
         return JsonResponse({'status': 'error', 'message': 'Permissão negada.'}, status=403)
 
     if request.method != 'POST':
@@ -1182,15 +925,14 @@ def download_arquivo(request, arquivo_id):
         record = arquivo.record
         user = request.user
         
+        escopo = escopo_do_usuario(user)
+
         # Permite usuários de leitura (reporte/concluído) acessarem apenas arquivos de ocorrências concluídas
-        if user.groups.filter(name='Somente Concluído').exists() or user.groups.filter(name='Técnicos de reporte').exists():
+        if escopo.somente_concluido:
             if record.status != Record.STATUS_OCORRENCIA.DONE:
                 raise Http404("Arquivo não encontrado ou sem permissão")
         else:
-            has_permission = CountryPermission.objects.filter(
-                user=user,
-                country=record.country
-            ).exists()
+            has_permission = record.country_id in escopo.paises_ids
             if not has_permission:
                 raise Http404("Arquivo não encontrado ou sem permissão")
         
@@ -1227,9 +969,8 @@ def get_record(request, pk):
     try:
         record = Record.objects.prefetch_related('arquivos').get(id=pk)
         # Restringe visualização para usuários de leitura (reporte/concluído)
-        if request.user.is_authenticated and (request.user.groups.filter(name='Somente Concluído').exists() or request.user.groups.filter(name='Técnicos de reporte').exists()):
-            if record.status != Record.STATUS_OCORRENCIA.DONE:
-                return JsonResponse({'error': 'Registro não encontrado'}, status=404)
+        if request.user.is_authenticated and escopo_do_usuario(request.user).bloqueia_nao_concluido(record):
+            return JsonResponse({'error': 'Registro não encontrado'}, status=404)
         # Solução registrada no banco (preferencial)
         last_solution = getattr(record, 'solution', None)
         try:
@@ -1305,73 +1046,16 @@ def options_config(request):
       "PROBLEMA_BY_SYSTEM": {"Injeção Eletrônica": [...], ...},
       "PROBLEMA_BY_AREA": {"IMMO": [...], "Diagnosis": [...], "Device": [...]}
     }
+    A árvore é montada uma vez por alteração de OptionItem (services/opcoes.py)
+    e servida com ETag: o navegador revalida e recebe 304 enquanto não mudar.
     """
-    qs = OptionItem.objects.filter(active=True).order_by('category', 'area', 'parent__label', 'order', 'label')
-
-    # Usa sets internamente para evitar duplicados
-    sist = { 'IMMO': set(), 'Diagnosis': set(), 'Device': set() }
-    prob_by_sys = {}            # key: system label -> set()
-    # Para calcular fallback de área, vamos armazenar os conjuntos por SISTEMA (para fazer interseção)
-    area_systems = { 'IMMO': set(), 'Diagnosis': set(), 'Device': set() }  # nomes dos sistemas por área
-    probs_per_system = {}  # key: system label -> set()
-
-    for item in qs:
-        if item.category == 'SISTEMA':
-            sist.setdefault(item.area, set()).add(item.label)
-        else:  # PROBLEMA
-            if item.parent and item.parent.label:
-                key = item.parent.label
-                prob_by_sys.setdefault(key, set()).add(item.label)
-                probs_per_system.setdefault(key, set()).add(item.label)
-                # registra sistema -> área
-                # Precisamos ligar system label à sua área (buscaremos pela OptionItem de sistema abaixo se necessário)
-            else:
-                # Problema "global" (sem parent) — entra em todos os sistemas da área no fallback
-                # Guardaremos em um marcador especial por área usando um nome fictício de sistema "__GLOBAL__<AREA>"
-                key = f"__GLOBAL__{item.area}__"
-                prob_by_sys.setdefault(key, set()).add(item.label)
-                probs_per_system.setdefault(key, set()).add(item.label)
-            # Nota: o fallback por área será calculado por interseção entre sistemas + globais
-
-    def with_outro_sorted_unique(values):
-        # deduplica, remove vazio e 'Outro...' e garante 'Outro...' ao final
-        base = sorted({x for x in values if x and x != 'Outro...'}, key=lambda s: s.lower())
-        base.append('Outro...')
-        return base
-
-    # Constrói o mapa área -> [sets de problemas por sistema dessa área]
-    # 1) Obter sistemas por área a partir de OptionItem (category=SISTEMA)
-    sistemas_qs = OptionItem.objects.filter(category='SISTEMA', active=True)
-    system_area = {}
-    for s in sistemas_qs:
-        sist.setdefault(s.area, set()).add(s.label)
-        area_systems.setdefault(s.area, set()).add(s.label)
-        system_area[s.label] = s.area
-
-    # 2) Calcular fallback por área: interseção dos problemas de todos os sistemas da área
-    problema_by_area_final = {}
-    for area, systems in area_systems.items():
-        sets = []
-        # problemas "globais" sem parent contam para todas as áreas respectivas
-        global_key = f"__GLOBAL__{area}__"
-        if global_key in probs_per_system:
-            sets.append(probs_per_system[global_key])
-        for sys_label in systems:
-            if sys_label in probs_per_system:
-                sets.append(probs_per_system[sys_label])
-        if not sets:
-            problema_by_area_final[area] = with_outro_sorted_unique([])
-        else:
-            inter = set.intersection(*sets) if len(sets) > 1 else set(sets[0])
-            problema_by_area_final[area] = with_outro_sorted_unique(inter)
-
-    result = {
-        'SISTEMA': { area: sorted(list(vals), key=lambda s: s.lower()) for area, vals in sist.items() },
-        'PROBLEMA_BY_SYSTEM': { sys: with_outro_sorted_unique(vals) for sys, vals in prob_by_sys.items() if not sys.startswith('__GLOBAL__') },
-        'PROBLEMA_BY_AREA': problema_by_area_final,
-    }
-
-    return JsonResponse(result)
+    arvore = arvore_opcoes()
+    response = get_conditional_response(request, etag=arvore['etag'])
+    if response is None:
+        response = HttpResponse(arvore['json'], content_type='application/json')
+    response['ETag'] = arvore['etag']
+    response['Cache-Control'] = 'no-cache'
+    return response
 
 
 @require_http_methods(["POST"])
@@ -1469,38 +1153,41 @@ def criar_notificacao_feedback(record, tipo_feedback, gestor_user):
     Cria uma notificação quando um gestor adiciona feedback a uma ocorrência
     """
     try:
-        # Buscar o usuário responsável pela ocorrência
-        if record.responsible and record.responsible != "Não identificado":
-            # Tentar encontrar o usuário pelo nome completo ou username
-            usuarios_responsaveis = User.objects.filter(
-                Q(first_name__icontains=record.responsible.split()[0]) |
-                Q(username__icontains=record.responsible) |
-                Q(last_name__icontains=record.responsible.split()[-1] if len(record.responsible.split()) > 1 else record.responsible)
+        if not record.responsible or record.responsible == "Não identificado":
+            return
+
+        # Usuário(s) cujo nome completo ou username é o responsável (mapa nome -> id em cache),
+        # sem notificar o próprio gestor que fez o feedback
+        destinatarios = [
+            user_id for user_id in ids_por_responsavel(record.responsible)
+            if user_id != gestor_user.id
+        ]
+        if not destinatarios:
+            return
+
+        # Quem já tem uma notificação não lida desta ocorrência não recebe outra
+        ja_notificados = set(
+            Notificacao.objects.filter(
+                record=record,
+                tipo=tipo_feedback,
+                lida=False,
+                user_id__in=destinatarios,
+            ).values_list('user_id', flat=True)
+        )
+
+        titulo = f"Nova mensagem na ocorrência #{record.codigo_externo or record.id}"
+        resumo = f"{record.responsible} mandou uma nova mensagem"
+        Notificacao.objects.bulk_create([
+            Notificacao(
+                user_id=user_id,
+                record=record,
+                tipo=tipo_feedback,
+                titulo=titulo,
+                resumo=resumo
             )
-            
-            for usuario in usuarios_responsaveis:
-                # Evitar criar notificação para o próprio gestor que fez o feedback
-                if usuario.id != gestor_user.id:
-                    # Verificar se já existe uma notificação não lida para esta ocorrência e usuário
-                    notificacao_existente = Notificacao.objects.filter(
-                        user=usuario,
-                        record=record,
-                        tipo=tipo_feedback,
-                        lida=False
-                    ).first()
-                    
-                    if not notificacao_existente:
-                        # Criar nova notificação
-                        titulo = f"Nova mensagem na ocorrência #{record.codigo_externo or record.id}"
-                        resumo = f"{record.responsible} mandou uma nova mensagem"
-                        
-                        Notificacao.objects.create(
-                            user=usuario,
-                            record=record,
-                            tipo=tipo_feedback,
-                            titulo=titulo,
-                            resumo=resumo
-                        )
+            for user_id in destinatarios
+            if user_id not in ja_notificados
+        ])
     except Exception as e:
         print(f"Erro ao criar notificação: {e}")
 
@@ -1513,19 +1200,9 @@ def listar_notificacoes(request):
         notificacoes = Notificacao.objects.filter(
             user=request.user,
             lida=False
-        ).select_related('record', 'record__device').order_by('-criada_em')
+        ).select_related('record').order_by('-criada_em')
         
-        notificacoes_data = []
-        for notificacao in notificacoes:
-            notificacoes_data.append({
-                'id': notificacao.id,
-                'titulo': notificacao.titulo,
-                'resumo': notificacao.resumo,
-                'tipo': notificacao.tipo,
-                'criada_em': notificacao.criada_em.strftime('%d/%m/%Y %H:%M'),
-                'record_id': notificacao.record.id,
-                'record_codigo': notificacao.record.codigo_externo or str(notificacao.record.id)
-            })
+        notificacoes_data = [dados_notificacao(notificacao) for notificacao in notificacoes]
         
         return JsonResponse({
             'status': 'success',
@@ -1541,10 +1218,14 @@ def marcar_notificacao_lida(request, notificacao_id):
     API para marcar uma notificação como lida
     """
     try:
-        notificacao = get_object_or_404(Notificacao, id=notificacao_id, user=request.user)
-        notificacao.marcar_como_lida()
+        if not Notificacao.objects.filter(id=notificacao_id).marcar_como_lidas(request.user.id):
+            raise Http404("Notificação não encontrada")
         
-        return JsonResponse({'status': 'success', 'message': 'Notificação marcada como lida'})
+        return JsonResponse({
+            'status': 'success',
+            'message': 'Notificação marcada como lida',
+            'total': contar_nao_lidas(request.user.id),
+        })
     except Exception as e:
         return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
 
@@ -1554,18 +1235,14 @@ def marcar_notificacoes_por_record_como_lidas(request, record_id):
     API para marcar todas as notificações não lidas de um record como lidas
     """
     try:
-        notificacoes = Notificacao.objects.filter(
-            user =request.user,
-            record_id=record_id,
-        )
-        count = notificacoes.count()
-        for notificacao in notificacoes :
-            notificacao.marcar_como_lida()
+        # Um DELETE para todas as notificações do record; o novo total vai por push
+        count = Notificacao.objects.filter(record_id=record_id).marcar_como_lidas(request.user.id)
         
         return JsonResponse({
             'status': 'success', 
             'message': f'{count} notificação(s) marcada(s) como lida(s)',
-            'count': count
+            'count': count,
+            'total': contar_nao_lidas(request.user.id),
         })
     except Exception as e:
         return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
@@ -1576,13 +1253,20 @@ def contar_notificacoes_nao_lidas(request):
     API para contar notificações não lidas do usuário logado
     """
     try:
-        count = Notificacao.objects.filter(user=request.user, lida=False).count()
+        # Contador mantido em cache pelos signals de Notificacao
+        count = contar_nao_lidas(request.user.id)
         return JsonResponse({'status': 'success', 'count': count})
     except Exception as e:
         return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
 
 # Em seu arquivo views.py
 
+def modo_assincrono(request, data=None):
+    """PDF em modo job (?async=1 ou {"async": true}): responde com o id do job em vez do arquivo."""
+    if data is not None and data.get('async'):
+        return True
+    return request.GET.get('async') in ['1', 'true', 'True']
+
 @login_required(login_url='subir_ocorrencia' ) # Adapte 'URL_LOGIN' se necessário
 @require_http_methods(["GET", "POST"])
 def gerar_pdf_ocorrencia(request, record_id=None):
@@ -1593,6 +1277,7 @@ def gerar_pdf_ocorrencia(request, record_id=None):
     try:
         # Controle de seções opcionais
         exclude_problem = False
+        data = None
 
         # Se a requisição for POST, pega o ID do corpo da requisição
         if request.method == 'POST':
@@ -1611,120 +1296,24 @@ def gerar_pdf_ocorrencia(request, record_id=None):
         # Busca a ocorrência no banco de dados ou retorna um erro 404
         record = get_object_or_404(Record, id=record_id)
         # Se for usuário de leitura (reporte/concluído), só permite gerar PDF para concluídas
-        if request.user.groups.filter(name='Somente Concluído').exists() or request.user.groups.filter(name='Técnicos de reporte').exists():
-            if record.status != Record.STATUS_OCORRENCIA.DONE:
-                return JsonResponse({'status': 'error', 'message': 'Permissão negada.'}, status=403)
-
-        # Cria um buffer de bytes em memória para o arquivo PDF
-        buffer = io.BytesIO()
-
-        # Cria o objeto PDF (canvas), usando o buffer como seu "arquivo"
-        p = canvas.Canvas(buffer, pagesize=letter)
-        width, height = letter  # Tamanho da página (8.5 x 11 polegadas)
-
-        # --- ESTILOS PARA OS PARÁGRAFOS ---
-        styles = getSampleStyleSheet()
-        style_body = styles['BodyText']
-        style_label = ParagraphStyle(name='Label', parent=style_body, fontName='Helvetica-Bold')
-
-        # --- FUNÇÕES AUXILIARES INTERNAS ---
-        def draw_field(x, y, label, value):
-            """Desenha um par de 'Rótulo: Valor' com alinhamento dinâmico."""
-            p.setFont("Helvetica-Bold", 11)
-            label_text = f"{label}:"
-            p.drawString(x, y, label_text)
-            
-            label_width = p.stringWidth(label_text, "Helvetica-Bold", 11)
-            value_x_position = x + label_width + 10  # 10 pontos de espaçamento
-            
-            p.setFont("Helvetica", 11)
-            p.drawString(value_x_position, y, str(value or "N/A"))
-            
-            return y - (0.25 * inch) # Retorna a próxima posição Y
-
-        def draw_long_text_paragraph(x, y, label, text_content):
-            """Desenha um rótulo e um parágrafo de texto longo com quebra de linha automática."""
-            p.setFont("Helvetica-Bold", 12)
-            p.drawString(x, y, f"{label}:")
-            y -= 0.25 * inch
-
-            # Prepara o texto, substituindo quebras de linha \n por   
-            translated_text = traduzir_texto(text_content, target_lang='EN', api_key='71437a8a-e2de-43da-a9d7-ef10bd2550cf:fx')
-
-            if translated_text and isinstance(translated_text, str) and translated_text.strip():
-                prepared_text = translated_text.replace('\n', '<br/>')
-            else:
-                prepared_text = "Nenhum conteúdo fornecido."
-
-            paragraph = Paragraph(prepared_text, style_body)
-            
-            available_width = width - (2 * x)
-            w, h = paragraph.wrap(available_width, height)
-            
-            if y - h < 0.75 * inch: # Margem de segurança inferior
-                p.showPage()
-                y = height - 1 * inch # Reinicia no topo da nova página
-
-            paragraph.drawOn(p, x, y - h)
-            return y - h - 0.5 * inch # Retorna a posição Y final
+        if escopo_do_usuario(request.user).bloqueia_nao_concluido(record):
+            return JsonResponse({'status': 'error', 'message': 'Permissão negada.'}, status=403)
+
+        dados = dados_pdf_ocorrencia(record, exclude_problem)
+        job, future = pdf_jobs.submeter(
+            'ocorrencia',
+            dados,
+            lambda: renderizar_pdf_ocorrencia(record, exclude_problem),
+            filename=f'ocorrencia_{record.codigo_externo}.pdf',
+            user_id=request.user.id,
+        )
+        if modo_assincrono(request, data):
+            return pdf_jobs.resposta_job(job)
 
-        # ==================================================================
-        # INÍCIO DO DESENHO DO CONTEÚDO DO PDF
-        # ==================================================================
-        
-        # --- Título ---
-        p.setFont("Helvetica-Bold", 18)
-        p.drawCentredString(width / 2.0, height - 0.75 * inch, "Relatório de Ocorrência")
-        p.setFont("Helvetica", 12)
-        p.drawCentredString(width / 2.0, height - 1.0 * inch, f"ID da Ocorrência: {record.codigo_externo or record.id}")
-
-        # --- Seção de Informações Gerais (2 colunas) ---
-        y_start = height - 1.5 * inch
-        p.line(0.5 * inch, y_start + 0.1 * inch, width - 0.5 * inch, y_start + 0.1 * inch)
-        
-        x1 = 1 * inch
-        y1 = y_start - (6 * mm)
-        
-        y1 = draw_field(x1, y1, "Tecnhical", record.technical)
-        y1 = draw_field(x1, y1, "Responsible", record.responsible)
-        y1 = draw_field(x1, y1, "Country", record.country.name if record.country else None)
-        y1 = draw_field(x1, y1, "Device", record.device.name if record.device else None)
-        y1 = draw_field(x1, y1, "Area", record.area)
-
-        # Coluna 2
-        x2 = 4.5 * inch
-        y2 = y_start - (6 * mm)
-
-        y2 = draw_field(x2, y2, "Brand", record.brand)
-        y2 = draw_field(x2, y2, "Model", record.model)
-        y2 = draw_field(x2, y2, "Serial", record.serial)
-        y2 = draw_field(x2, y2, "VIN", record.vin)
-        y2 = draw_field(x2, y2, "Year", record.year)
-        y2 = draw_field(x2, y2, "Version", record.version)
-
-        # --- Seção de Detalhes (Textos Longos) ---
-        y_next_section = min(y1, y2) - 0.3 * inch
-        p.line(0.5 * inch, y_next_section + 0.1 * inch, width - 0.5 * inch, y_next_section + 0.1 * inch)
-        y_text = y_next_section - 0.2 * inch
-        # Problema detectado (opcional)
-        if not exclude_problem:
-            y_text = draw_long_text_paragraph(x1, y_text, "Problem Detected", record.problem_detected)
-        # Detalhes do responsável
-        y_text = draw_long_text_paragraph(x1, y_text, "Responsible Details", record.detalhes_responsavel)
-
-        # ==================================================================
-        # FINALIZAÇÃO DO ARQUIVO PDF
-        # ==================================================================
-        p.showPage()
-        p.save()
-
-        buffer.seek(0)
-        filename = f'ocorrencia_{record.codigo_externo}.pdf'
-        response = FileResponse(buffer, as_attachment=True, filename=filename)
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
-        response['Access-Control-Expose-Headers'] = 'Content-Disposition'
-        
-        return response
+        job = pdf_jobs.aguardar(job, future)
+        if job['status'] != pdf_jobs.STATUS_PRONTO:
+            return JsonResponse({'status': 'error', 'message': 'Ocorreu um erro interno ao gerar o PDF.'}, status=500)
+        return pdf_jobs.resposta_pdf(job)
 
     except Record.DoesNotExist:
         return JsonResponse({'status': 'error', 'message': 'Ocorrência não encontrada.'}, status=404)
@@ -1749,17 +1338,15 @@ def download_arquivo(request, arquivo_id):
         user = request.user
         
         if not user.is_superuser:
+            escopo = escopo_do_usuario(user)
             # Permite usuários de leitura (reporte/concluído) acessarem apenas arquivos de ocorrências concluídas
-            if user.groups.filter(name='Somente Concluído').exists() or user.groups.filter(name='Técnicos de reporte').exists():
+            if escopo.somente_concluido:
                 if record.status != Record.STATUS_OCORRENCIA.DONE:
                     raise Http404("Arquivo não encontrado ou sem permissão")
             else:
                 # Verifica se o usuário tem permissão para o país da ocorrência
-                if record.country:
-                    has_permission = CountryPermission.objects.filter(
-                        user=user,
-                        country=record.country
-                    ).exists()
+                if record.country_id:
+                    has_permission = record.country_id in escopo.paises_ids
                     if not has_permission:
                         raise Http404("Arquivo não encontrado ou sem permissão")
         
@@ -1775,15 +1362,9 @@ def download_arquivo(request, arquivo_id):
         if content_type is None:
             content_type = 'application/octet-stream'
         
-        # Lê o arquivo
-        with open(file_path, 'rb') as f:
-            response = HttpResponse(f.read(), content_type=content_type)
-        
-        # Define o cabeçalho para forçar download
+        # Envia em streaming (Range/ETag) ou delega ao proxy; força download
         filename = arquivo.nome_original or os.path.basename(file_path)
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
-        
-        return response
+        return resposta_download(request, file_path, filename, content_type)
         
     except ArquivoOcorrencia.DoesNotExist:
         raise Http404("Arquivo não encontrado")
@@ -1809,9 +1390,7 @@ def dashboard_view(request):
         ).distinct(),
         'status_list': Record.STATUS_OCORRENCIA.choices,
         'paises_permitidos': Country.objects.all() if request.user.is_superuser else Country.objects.filter(
-            id__in=CountryPermission.objects.filter(
-                user=request.user
-            ).values_list("country_id", flat=True)
+            id__in=escopo_do_usuario(request.user).paises_ids
         ),
     }
 
@@ -1827,27 +1406,46 @@ def gerar_relatorio_dashboard(request):
         status=request.GET.get("status"),
         country=request.GET.get("country"),
     )
-
-    html_string = render_to_string(
-        "ocorrencia/dashboard_pdf.html",
-        {
-            "records": records,
-            "filters": {
-                "status": request.GET.get("status") or "Todos",
-                "responsible": request.GET.get("responsible") or "Todos",
-            },
-            "now": timezone.now(),
-        }
+    filters = {
+        "status": request.GET.get("status") or "Todos",
+        "responsible": request.GET.get("responsible") or "Todos",
+    }
+    base_url = request.build_absolute_uri("/")
+
+    def render():
+        # Roda no pool de PDFs: o queryset só é avaliado aqui
+        html_string = render_to_string(
+            "ocorrencia/dashboard_pdf.html",
+            {
+                "records": records,
+                "filters": filters,
+                "now": timezone.now(),
+            }
+        )
+        return HTML(string=html_string, base_url=base_url).write_pdf()
+
+    # Mesmo recorte + mesmos filtros + nenhuma escrita em Record desde então = mesmo PDF
+    dados = {
+        "escopo": chave_recorte_dashboard(request.user),
+        "filtros": sorted((k, v) for k, v in request.GET.lists() if k != 'async'),
+        "versao_records": versao_atual(filtros_service.VERSAO_CACHE_KEY),
+        "dia": timezone.localdate(),
+    }
+    job, future = pdf_jobs.submeter(
+        'relatorio_dashboard',
+        dados,
+        render,
+        filename='relatorio_ocorrencias.pdf',
+        user_id=request.user.id,
+        inline=True,
     )
+    if modo_assincrono(request):
+        return pdf_jobs.resposta_job(job)
 
-    pdf = HTML(
-        string=html_string,
-        base_url=request.build_absolute_uri("/")
-    ).write_pdf()
-
-    response = HttpResponse(pdf, content_type="application/pdf")
-    response["Content-Disposition"] = "inline; filename=relatorio_ocorrencias.pdf"
-    return response
+    job = pdf_jobs.aguardar(job, future)
+    if job['status'] != pdf_jobs.STATUS_PRONTO:
+        return HttpResponse("Erro ao gerar o relatório.", status=500)
+    return pdf_jobs.resposta_pdf(job)
 
 
 @login_required(login_url='subir_ocorrencia')
@@ -8,7 +8,7 @@ from django.utils import formats  # ⬅️ para formatar respeitando locale
 from django.db import models
 from django.forms import Textarea
 
-from .models import Cliente
+from .models import Cliente, SincronizacaoOdoo
 
 class SerialDuplicadoFilter(admin.SimpleListFilter):
     title = 'Serial duplicado'
@@ -75,3 +75,9 @@ class ClienteAdmin(admin.ModelAdmin):
         # Converte para timezone atual e formata "F Y" (ex.: "outubro 2025") conforme locale
         dt = timezone.localtime(obj.updated_at)
         return formats.date_format(dt, "F Y")
+
+
+@admin.register(SincronizacaoOdoo)
+class SincronizacaoOdooAdmin(admin.ModelAdmin):
+    list_display = ('origem', 'ultimo_write_date', 'ultimo_id', 'status', 'iniciado_em', 'concluido_em')
+    readonly_fields = ('iniciado_em', 'concluido_em', 'erro')
@@ -0,0 +1,74 @@
+import json
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        "Servidor local que imita o search_codes externo, para testar buscar_serial sem rede. "
+        "Use com BUSCA_EXTERNA_URL=http://127.0.0.1:<porta>/search_codes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--porta", type=int, default=8099, help="Porta HTTP (padrão: 8099)")
+        parser.add_argument(
+            "--atraso",
+            type=float,
+            default=0,
+            help="Segundos de espera antes de cada resposta (simula upstream lento)",
+        )
+        parser.add_argument(
+            "--falhar",
+            action="store_true",
+            help="Responde 503 a todas as buscas (simula upstream fora do ar)",
+        )
+
+    def handle(self, *args, **options):
+        atraso = options["atraso"]
+        falhar = options["falhar"]
+        stdout = self.stdout
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                tamanho = int(self.headers.get("Content-Length") or 0)
+                try:
+                    serial = json.loads(self.rfile.read(tamanho) or b"{}").get("sn", "")
+                except ValueError:
+                    serial = ""
+                if atraso:
+                    time.sleep(atraso)
+
+                if falhar:
+                    status, corpo = 503, {"error": "unavailable"}
+                elif serial.upper().startswith("EXT"):
+                    # Seriais começando com EXT "existem" no serviço externo
+                    status, corpo = 200, {"codes": [{
+                        "sn": serial,
+                        "email": "cliente@example.com",
+                        "city": "Curitiba",
+                        "country": "BR",
+                        "created_at": "Mon, 06 Jan 2025 10:00:00 GMT",
+                    }]}
+                else:
+                    status, corpo = 200, {"codes": []}
+
+                dados = json.dumps(corpo).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(dados)))
+                self.end_headers()
+                self.wfile.write(dados)
+
+            def log_message(self, formato, *args):
+                stdout.write(formato % args)
+
+        servidor = ThreadingHTTPServer(("127.0.0.1", options["porta"]), Handler)
+        self.stdout.write(self.style.SUCCESS(f"search_codes falso em http://127.0.0.1:{options['porta']}/search_codes"))
+        try:
+            servidor.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            servidor.server_close()
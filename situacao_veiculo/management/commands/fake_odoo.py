@@ -0,0 +1,164 @@
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management.base import BaseCommand
+
+UID = 2
+
+
+class Command(BaseCommand):
+    help = (
+        "Servidor JSON-RPC local que imita o Odoo (login, stock.move.line, stock.picking, res.partner), "
+        "para testar a sincronização sem rede. Use com ODOO_URL=http://127.0.0.1:<porta>."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--porta", type=int, default=8069, help="Porta HTTP (padrão: 8069)")
+        parser.add_argument("--linhas", type=int, default=5000, help="Linhas de movimento geradas (padrão: 5000)")
+        parser.add_argument(
+            "--atraso",
+            type=float,
+            default=0,
+            help="Segundos de espera antes de cada resposta (simula Odoo lento)",
+        )
+        parser.add_argument(
+            "--falhar-a-cada",
+            type=int,
+            default=0,
+            help="Responde 503 a cada N requisições (simula falha transitória)",
+        )
+        parser.add_argument(
+            "--sem-lote",
+            action="store_true",
+            help="Recusa requisições JSON-RPC em lote, como o /jsonrpc padrão do Odoo",
+        )
+
+    def handle(self, *args, **options):
+        atraso = options["atraso"]
+        falhar_a_cada = options["falhar_a_cada"]
+        sem_lote = options["sem_lote"]
+        stdout = self.stdout
+        contador = {"n": 0}
+        lock = threading.Lock()
+
+        # Movimentos de saída com série: 3 por picking, 1 picking por parceiro a cada 50
+        inicio = datetime(2023, 1, 1)
+        moves = []
+        for k in range(1, options["linhas"] + 1):
+            quando = (inicio + timedelta(minutes=k)).strftime("%Y-%m-%d %H:%M:%S")
+            equipamento = "[EAATA010-BR] EAATA90" if k % 4 else "[EAATA020-BR] EAATA READER"
+            moves.append({
+                "id": k,
+                "date": quando,
+                "write_date": quando,
+                "qty_done": 1.0,
+                "product_id": [k % 4 + 1, equipamento],
+                "lot_id": [k, f"ODOO{k:06d}"],
+                "lot_name": False,
+                "picking_id": [(k - 1) // 3 + 1, f"WH/OUT/{(k - 1) // 3 + 1:05d}"],
+                "reference": f"WH/OUT/{(k - 1) // 3 + 1:05d}",
+            })
+
+        def parceiro_do_picking(picking_id):
+            return picking_id % 50 + 1
+
+        def filtrar_moves(domain, kwargs):
+            # Só os termos da sincronização (write_date >= e id >) são interpretados
+            write_date, ultimo_id = "", 0
+            for termo in domain:
+                if isinstance(termo, list) and termo[0] == "write_date" and termo[1] == ">=":
+                    write_date = termo[2]
+                if isinstance(termo, list) and termo[0] == "id" and termo[1] == ">":
+                    ultimo_id = termo[2]
+            linhas = [m for m in moves if m["write_date"] >= write_date and m["id"] > ultimo_id]
+            if "desc" in (kwargs.get("order") or ""):
+                linhas = list(reversed(linhas))
+            offset = kwargs.get("offset") or 0
+            limite = kwargs.get("limit")
+            linhas = linhas[offset:offset + limite] if limite else linhas[offset:]
+            campos = kwargs.get("fields")
+            return [{c: m[c] for c in ["id", *campos] if c in m} if campos else m for m in linhas]
+
+        def executar(args):
+            _db, uid, _senha, model, method, margs, kwargs = (list(args) + [None] * 7)[:7]
+            if uid != UID:
+                return {"error": {"code": 200, "message": "Odoo Server Error",
+                                  "data": {"name": "odoo.exceptions.AccessDenied", "message": "Access Denied"}}}
+            kwargs = kwargs or {}
+            if model == "stock.move.line" and method == "search_read":
+                return {"result": filtrar_moves(margs[0] if margs else [], kwargs)}
+            if model == "stock.picking" and method == "read":
+                return {"result": [
+                    {"id": pid, "name": f"WH/OUT/{pid:05d}", "date_done": False,
+                     "partner_id": [parceiro_do_picking(pid), f"Cliente {parceiro_do_picking(pid)}"]}
+                    for pid in margs[0]
+                ]}
+            if model == "res.partner" and method == "read":
+                return {"result": [
+                    {"id": pid, "name": f"Cliente {pid}", "phone": f"41 3000-{pid:04d}", "mobile": False,
+                     "email": f"cliente{pid}@example.com", "vat": f"{pid:014d}"}
+                    for pid in margs[0]
+                ]}
+            return {"error": {"code": 200, "message": f"{model}.{method} não suportado pelo servidor falso"}}
+
+        def responder_chamada(chamada):
+            params = chamada.get("params") or {}
+            if params.get("service") == "common" and params.get("method") == "login":
+                resposta = {"result": UID}
+            elif params.get("service") == "object" and params.get("method") == "execute_kw":
+                resposta = executar(params.get("args") or [])
+            else:
+                resposta = {"error": {"code": 200, "message": "método não suportado"}}
+            return {"jsonrpc": "2.0", "id": chamada.get("id"), **resposta}
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive
+
+            def do_POST(self):
+                tamanho = int(self.headers.get("Content-Length") or 0)
+                corpo = self.rfile.read(tamanho)
+                with lock:
+                    contador["n"] += 1
+                    n = contador["n"]
+                if atraso:
+                    time.sleep(atraso)
+
+                try:
+                    requisicao = json.loads(corpo or b"{}")
+                except ValueError:
+                    requisicao = None
+                if falhar_a_cada and n % falhar_a_cada == 0:
+                    status, resposta = 503, {"error": "unavailable"}
+                elif isinstance(requisicao, list):
+                    if sem_lote:
+                        status, resposta = 400, {"error": "batch not supported"}
+                    else:
+                        status, resposta = 200, [responder_chamada(c) for c in requisicao]
+                elif isinstance(requisicao, dict):
+                    status, resposta = 200, responder_chamada(requisicao)
+                else:
+                    status, resposta = 400, {"error": "invalid json"}
+
+                dados = json.dumps(resposta).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(dados)))
+                self.end_headers()
+                self.wfile.write(dados)
+
+            def log_message(self, formato, *args):
+                stdout.write(formato % args)
+
+        servidor = ThreadingHTTPServer(("127.0.0.1", options["porta"]), Handler)
+        self.stdout.write(self.style.SUCCESS(
+            f"Odoo falso em http://127.0.0.1:{options['porta']}/jsonrpc ({len(moves)} linhas de movimento)"
+        ))
+        try:
+            servidor.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            servidor.server_close()
@@ -0,0 +1,69 @@
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from situacao_veiculo.models import SERIAIS_PENDENTES_CACHE_KEY, Cliente, normalizar_serial
+
+
+class Command(BaseCommand):
+    help = (
+        "Preenche Cliente.serial_norm nos cadastros existentes (roda no deploy, logo após o migrate). "
+        "Seriais repetidos (ignorando caixa) ficam só no cadastro mais antigo; os demais são listados."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Quantidade de cadastros gravados por lote (padrão: 1000)",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Apenas conta o que seria preenchido e lista os duplicados, sem gravar",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options.get("batch_size")
+
+        # Dono de cada serial normalizado: o cadastro mais antigo, mesmo que um mais
+        # novo (salvo depois da coluna existir) já tenha ficado com o serial_norm
+        donos = {}
+        pendentes = []
+        liberar = []
+        duplicados = []
+        for cliente_id, serial, atual in (
+            Cliente.objects.order_by("id").values_list("id", "serial", "serial_norm").iterator()
+        ):
+            serial_norm = normalizar_serial(serial)
+            if serial_norm is None:
+                continue
+            if serial_norm in donos:
+                duplicados.append((cliente_id, serial))
+                if atual is not None:
+                    liberar.append(Cliente(id=cliente_id, serial_norm=None))
+                continue
+            donos[serial_norm] = cliente_id
+            if atual != serial_norm:
+                pendentes.append(Cliente(id=cliente_id, serial_norm=serial_norm))
+
+        for cliente_id, serial in duplicados:
+            self.stdout.write(self.style.WARNING(f"Serial duplicado mantido sem serial_norm: id={cliente_id} serial={serial!r}"))
+
+        if options.get("dry_run"):
+            self.stdout.write(self.style.SUCCESS(
+                f"Simulação: {len(pendentes)} cadastro(s) a preencher, {len(duplicados)} duplicado(s)"
+            ))
+            return
+
+        with transaction.atomic():
+            # bulk_update não passa pelo save(): só a coluna nova é gravada.
+            # Primeiro libera os serial_norm dos duplicados (índice único).
+            Cliente.objects.bulk_update(liberar, ["serial_norm"], batch_size=batch_size)
+            Cliente.objects.bulk_update(pendentes, ["serial_norm"], batch_size=batch_size)
+        cache.delete(SERIAIS_PENDENTES_CACHE_KEY)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"serial_norm preenchido: total={len(pendentes)} duplicados={len(duplicados)}"
+        ))
@@ -6,8 +6,9 @@ class Command(BaseCommand):
 
     def add_arguments(self, parser: CommandParser) -> None:
         parser.add_argument('--limit', type=int, default=None, help='Limite de linhas a buscar (None = ilimitado)')
+        parser.add_argument('--full', action='store_true', help="Ignora a marca d'água e relê todo o histórico")
 
     def handle(self, *args, **options):
         limit = options.get('limit')
-        stats = sync_odoo_to_clientes(max_rows=limit)
+        stats = sync_odoo_to_clientes(max_rows=limit, full=options.get('full'))
         self.stdout.write(self.style.SUCCESS(f"Sync concluído: {stats}"))
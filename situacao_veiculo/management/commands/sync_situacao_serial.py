@@ -12,10 +12,15 @@ class Command(BaseCommand):
             default=None,
             help="Limite opcional de linhas do Odoo para processar nesta execução",
         )
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Ignora a marca d'água e relê todo o histórico do Odoo (reconstrução)",
+        )
 
     def handle(self, *args, **options):
         max_rows = options.get("max_rows")
-        stats = sync_odoo_to_clientes(max_rows=max_rows)
+        stats = sync_odoo_to_clientes(max_rows=max_rows, full=options.get("full"))
         self.stdout.write(
             self.style.SUCCESS(
                 f"Odoo sync finalizado: fetched={stats.get('fetched')} created={stats.get('created')} updated={stats.get('updated')} skipped={stats.get('skipped')}"
@@ -1,9 +1,58 @@
+from django.core.cache import cache
 from django.db import models
+from django.db.models import Q
+from django.db.models.functions import Trim, Upper
 from dateutil.relativedelta import relativedelta
 from django.utils import timezone
 from django.core.exceptions import ValidationError
 from datetime import date
 
+
+def normalizar_serial(serial):
+    """Forma usada em Cliente.serial_norm: sem espaços nas pontas e em maiúsculas (None se vazio)."""
+    serial = (serial or '').strip().upper()
+    return serial or None
+
+
+SERIAIS_PENDENTES_CACHE_KEY = 'situacao:seriais_pendentes'
+SERIAIS_PENDENTES_CACHE_TIMEOUT = 60
+
+
+def seriais_pendentes():
+    """
+    True enquanto houver Cliente com serial e sem serial_norm (cadastros de antes
+    da coluna, até o normalizar_seriais rodar, e duplicados que ele deixou de fora).
+    """
+    pendentes = cache.get(SERIAIS_PENDENTES_CACHE_KEY)
+    if pendentes is None:
+        pendentes = Cliente.objects.filter(serial_norm__isnull=True, serial__regex=r'\S').exists()
+        cache.set(SERIAIS_PENDENTES_CACHE_KEY, pendentes, SERIAIS_PENDENTES_CACHE_TIMEOUT)
+    return pendentes
+
+
+class ClienteQuerySet(models.QuerySet):
+    def por_serial(self, serial):
+        """
+        Busca sem diferenciar caixa pelo índice único de serial_norm (substitui
+        serial__iexact). Enquanto houver cadastros sem serial_norm, eles também
+        são procurados por serial__iexact.
+        """
+        serial_norm = normalizar_serial(serial)
+        if serial_norm is None:
+            return self.none()
+        if seriais_pendentes():
+            return self.filter(Q(serial_norm=serial_norm) | Q(serial_norm__isnull=True, serial__iexact=serial.strip()))
+        return self.filter(serial_norm=serial_norm)
+
+    def por_seriais(self, seriais_norm):
+        """Versão IN de por_serial, para uma lista de seriais já normalizados."""
+        if seriais_pendentes():
+            return self.annotate(serial_legado=Upper(Trim('serial'))).filter(
+                Q(serial_norm__in=seriais_norm) | Q(serial_norm__isnull=True, serial_legado__in=seriais_norm)
+            )
+        return self.filter(serial_norm__in=seriais_norm)
+
+
 class Cliente(models.Model):
     data = models.DateField(verbose_name="Data", blank=False, default=timezone.now)
     vencimento = models.DateField(verbose_name="Vencimento", blank=True, null=True)
@@ -13,6 +62,9 @@ class Cliente(models.Model):
         help_text="Quantidade de anos até o vencimento."
     )
     serial = models.CharField(verbose_name="Serial", max_length=100, blank=True, default='')
+    # Serial normalizado (normalizar_serial), mantido no save(); o índice único atende
+    # as buscas sem diferenciar caixa. Cadastros antigos: comando normalizar_seriais.
+    serial_norm = models.CharField(max_length=100, unique=True, null=True, blank=True, editable=False)
     nome = models.CharField(verbose_name="Nome", max_length=100, blank=True, null=True)
     cnpj = models.CharField(max_length=30, verbose_name='CPF/CNPJ', blank=True, default="SEM DADO", null=True)
     tel = models.CharField(max_length=100, verbose_name='Telefone', blank=True, default="SEM DADO", null=True)
@@ -40,6 +92,8 @@ class Cliente(models.Model):
         help_text="Data/hora da última atualização deste cadastro."
     )
 
+    objects = ClienteQuerySet.as_manager()
+
     def has_custom_message(self):
         return bool(self.status_message_custom or self.mensagem)
     has_custom_message.boolean = True
@@ -48,18 +102,26 @@ class Cliente(models.Model):
     def clean(self):
         if self.serial:
             # Unicidade sem diferenciar maiúsculas/minúsculas
-            qs = Cliente.objects.filter(serial__iexact=self.serial)
+            qs = Cliente.objects.por_serial(self.serial)
             if self.pk:
                 qs = qs.exclude(pk=self.pk)
             if qs.exists():
                 raise ValidationError({'serial': 'Este serial já está cadastrado para outro cliente.'})
 
-    def save(self, *args, **kwargs):
+    def preparar_gravacao(self):
+        """Normalizações aplicadas antes de gravar (save() e bulk_create da sincronização com o Odoo)."""
         # Normaliza serial removendo espaços excedentes
         if isinstance(self.serial, str):
             self.serial = self.serial.strip()
+        self.serial_norm = normalizar_serial(self.serial)
         if not self.vencimento and self.data and self.anos_para_vencimento:
             self.vencimento = self.data + relativedelta(years=self.anos_para_vencimento)
+
+    def save(self, *args, **kwargs):
+        self.preparar_gravacao()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'serial' in update_fields and 'serial_norm' not in update_fields:
+            kwargs['update_fields'] = [*update_fields, 'serial_norm']
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -113,3 +175,34 @@ class Cliente(models.Model):
         if s in {'vencido', 'bloqueado_data_invalida'}:
             return self.status_message_default
         return self.mensagem or self.status_message_default
+
+
+class SincronizacaoOdoo(models.Model):
+    """
+    Marca d'água da sincronização incremental com o Odoo. ultimo_write_date é o
+    limite inferior (write_date >=) da execução; ultimo_id é o cursor de id da
+    execução em andamento, salvo a cada página, então uma execução que falhar
+    (ou parar em max_rows) retoma da última página gravada. Ao concluir,
+    ultimo_write_date passa ao maior write_date lido e ultimo_id volta a 0.
+    """
+    STATUS_CHOICES = (
+        ('em_andamento', 'Em andamento'),
+        ('ok', 'Concluída'),
+        ('erro', 'Erro'),
+    )
+
+    origem = models.CharField("Origem", max_length=100, unique=True)
+    # write_date como o Odoo devolve (UTC, 'AAAA-MM-DD HH:MM:SS', só segundos); vazio = desde o início
+    ultimo_write_date = models.CharField("Último write_date", max_length=19, blank=True, default='')
+    ultimo_id = models.PositiveBigIntegerField("Último id", default=0)
+    status = models.CharField("Status", max_length=20, choices=STATUS_CHOICES, blank=True, default='')
+    erro = models.TextField("Erro", blank=True, default='')
+    iniciado_em = models.DateTimeField("Iniciada em", null=True, blank=True)
+    concluido_em = models.DateTimeField("Concluída em", null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Sincronização com o Odoo"
+        verbose_name_plural = "Sincronizações com o Odoo"
+
+    def __str__(self):
+        return f"{self.origem} até {self.ultimo_write_date or '-'} (id {self.ultimo_id})"
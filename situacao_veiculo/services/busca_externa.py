@@ -0,0 +1,205 @@
+# situacao_veiculo/services/busca_externa.py
+"""
+Consulta de serial no serviço externo (search_codes), usada por buscar_serial
+quando o serial não está em Cliente.
+
+- As chamadas rodam num pool de threads próprio (BUSCA_EXTERNA_WORKERS) com uma
+  Session compartilhada (conexões reaproveitadas); a view assíncrona só aguarda
+  o resultado, sem ocupar o worker durante a espera.
+- Resultados ficam em cache: encontrado por BUSCA_EXTERNA_CACHE_POSITIVO
+  segundos, não encontrado por BUSCA_EXTERNA_CACHE_NEGATIVO. Erros não são
+  cacheados.
+- Disjuntor: após BUSCA_EXTERNA_FALHAS falhas seguidas o serviço é considerado
+  fora do ar por BUSCA_EXTERNA_PAUSA segundos e a busca responde na hora
+  (sem dados); passada a pausa, uma chamada de teste decide se ele volta.
+
+Para testes locais: `python manage.py fake_busca_externa` e
+BUSCA_EXTERNA_URL=http://127.0.0.1:8099/search_codes.
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from requests.adapters import HTTPAdapter
+
+from situacao_veiculo.models import normalizar_serial
+
+ERRO_INDISPONIVEL = 'Serviço externo indisponível no momento.'
+
+
+def _config(nome, padrao):
+    return getattr(settings, nome, padrao)
+
+
+class Disjuntor:
+    """Circuit breaker por processo: fechado -> aberto (após N falhas) -> meio-aberto (1 teste)."""
+
+    def __init__(self, limite_falhas, pausa):
+        self.limite_falhas = limite_falhas
+        self.pausa = pausa
+        self._falhas = 0
+        self._aberto_ate = 0
+        self._testando = False
+        self._lock = threading.Lock()
+
+    def permitir(self):
+        with self._lock:
+            if self._falhas < self.limite_falhas:
+                return True
+            # Aberto: só libera uma chamada de teste depois da pausa
+            if time.monotonic() < self._aberto_ate or self._testando:
+                return False
+            self._testando = True
+            return True
+
+    def sucesso(self):
+        with self._lock:
+            self._falhas = 0
+            self._testando = False
+
+    def falha(self):
+        with self._lock:
+            self._falhas += 1
+            self._testando = False
+            if self._falhas >= self.limite_falhas:
+                self._aberto_ate = time.monotonic() + self.pausa
+
+    @property
+    def aberto(self):
+        with self._lock:
+            return self._falhas >= self.limite_falhas and time.monotonic() < self._aberto_ate
+
+
+_session = None
+_executor = None
+_disjuntor = None
+_lock = threading.Lock()
+
+
+def _get_session():
+    global _session
+    with _lock:
+        if _session is None:
+            tamanho = _config('BUSCA_EXTERNA_WORKERS', 4)
+            _session = requests.Session()
+            _session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=tamanho))
+            _session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=tamanho))
+            _session.headers.update({
+                'Accept': '*/*',
+                'Content-Type': 'application/json',
+            })
+            cookie = _config('BUSCA_EXTERNA_COOKIE', '')
+            if cookie:
+                _session.cookies.set('session', cookie)
+        return _session
+
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=_config('BUSCA_EXTERNA_WORKERS', 4),
+                thread_name_prefix='busca-externa',
+            )
+        return _executor
+
+
+def get_disjuntor():
+    global _disjuntor
+    with _lock:
+        if _disjuntor is None:
+            _disjuntor = Disjuntor(
+                _config('BUSCA_EXTERNA_FALHAS', 5),
+                _config('BUSCA_EXTERNA_PAUSA', 30),
+            )
+        return _disjuntor
+
+
+def _interpretar(status, resp_json):
+    """Monta o payload external_search usado pelo template a partir da resposta."""
+    external_info = {'status': status, 'data': resp_json}
+    try:
+        if isinstance(resp_json, dict):
+            codes = resp_json.get('codes')
+            if codes and isinstance(codes, list) and len(codes) > 0:
+                first = codes[0]
+                created_at_str = first.get('created_at')
+                external_info['cliente'] = first.get('email')
+                external_info['sn'] = first.get('sn')
+
+                if created_at_str:
+                    try:
+                        created_dt = parsedate_to_datetime(created_at_str)
+                        # Compute +2 years (fallback for Feb 29)
+                        try:
+                            venc_dt = created_dt.replace(year=created_dt.year + 2)
+                        except ValueError:
+                            venc_dt = created_dt.replace(month=2, day=28, year=created_dt.year + 2)
+                        external_info['created_at'] = created_dt.isoformat()
+                        external_info['vencimento'] = venc_dt.date().isoformat()
+                    except Exception:
+                        pass
+    except Exception:
+        pass
+    return external_info
+
+
+def encontrado(external_info):
+    data = external_info.get('data') if isinstance(external_info, dict) else None
+    codes = data.get('codes') if isinstance(data, dict) else None
+    return bool(codes and isinstance(codes, list))
+
+
+def buscar_externo(serial):
+    """
+    Busca síncrona (roda no pool). Retorna o payload external_search:
+    {'status', 'data', ...} ou {'error': ...} quando a busca falhou.
+    """
+    serial_norm = normalizar_serial(serial)
+    chave = f'situacao:externo:{serial_norm}'
+    external_info = cache.get(chave)
+    if external_info is not None:
+        return external_info
+
+    disjuntor = get_disjuntor()
+    if not disjuntor.permitir():
+        return {'error': ERRO_INDISPONIVEL}
+
+    try:
+        resp = _get_session().post(
+            _config('BUSCA_EXTERNA_URL', ''),
+            json={'sn': serial},
+            timeout=_config('BUSCA_EXTERNA_TIMEOUT', 5),
+        )
+        if resp.status_code >= 500:
+            raise requests.HTTPError(f'{resp.status_code} {resp.reason}', response=resp)
+    except requests.RequestException as exc:
+        disjuntor.falha()
+        return {'error': str(exc)}
+    disjuntor.sucesso()
+
+    try:
+        resp_json = resp.json()
+    except ValueError:
+        resp_json = {'status_code': resp.status_code, 'text': resp.text}
+
+    external_info = _interpretar(resp.status_code, resp_json)
+    if encontrado(external_info):
+        cache.set(chave, external_info, _config('BUSCA_EXTERNA_CACHE_POSITIVO', 60 * 10))
+    else:
+        cache.set(chave, external_info, _config('BUSCA_EXTERNA_CACHE_NEGATIVO', 60))
+    return external_info
+
+
+async def buscar_externo_async(serial):
+    """Versão para views assíncronas: responde na hora com o disjuntor aberto, senão aguarda o pool."""
+    if get_disjuntor().aberto and cache.get(f'situacao:externo:{normalizar_serial(serial)}') is None:
+        return {'error': ERRO_INDISPONIVEL}
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), buscar_externo, serial)
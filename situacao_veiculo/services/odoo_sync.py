@@ -1,14 +1,71 @@
 import os
+import queue
 import re
+import threading
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, date
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 from django.utils import timezone
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
-from situacao_veiculo.models import Cliente
+from django.core.cache import cache
+from django.db import transaction
+
+from serial_vci.models import SerialVCI
+from situacao_veiculo.models import Cliente, SincronizacaoOdoo, normalizar_serial
+from situacao_veiculo.services.situacao import invalidar_situacao
 from django.conf import settings
 
+# Linhas por INSERT/UPDATE em lote e seriais por consulta IN na sincronização
+SYNC_BATCH = int(os.getenv("ODOO_SYNC_BATCH", "1000"))
+
+# Linha de SincronizacaoOdoo com a marca d'água das linhas de movimento
+ORIGEM_MOVES = "stock.move.line"
+
+# Ids por chamada de `read` (stock.picking / res.partner) e chamadas simultâneas
+READ_CHUNK = int(os.getenv("ODOO_READ_CHUNK", "200"))
+FETCH_WORKERS = int(os.getenv("ODOO_FETCH_WORKERS", "4"))
+
+# Tentativas extras por chamada em falha transitória (conexão, timeout, 429/502/503/504)
+RPC_RETRIES = int(os.getenv("ODOO_RPC_RETRIES", "3"))
+RPC_BACKOFF = float(os.getenv("ODOO_RPC_BACKOFF", "0.5"))
+# Validade do uid em cache entre execuções (segundos)
+UID_CACHE_TIMEOUT = int(os.getenv("ODOO_UID_CACHE_TIMEOUT", str(60 * 60 * 24)))
+
+_sessions: Dict[str, requests.Session] = {}
+_sessions_lock = threading.Lock()
+# Endpoints que responderam a um lote JSON-RPC com erro ou resposta única
+_sem_lote: set = set()
+
+
+def _get_session(endpoint: str) -> requests.Session:
+    """Session por endpoint, compartilhada entre execuções e threads (keep-alive)."""
+    with _sessions_lock:
+        session = _sessions.get(endpoint)
+        if session is None:
+            retry = Retry(
+                total=RPC_RETRIES,
+                backoff_factor=RPC_BACKOFF,
+                status_forcelist=(429, 502, 503, 504),
+                allowed_methods=frozenset({"POST"}),  # só leituras/login passam por aqui
+                raise_on_status=False,
+            )
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=FETCH_WORKERS + 1, max_retries=retry)
+            session = requests.Session()
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _sessions[endpoint] = session
+        return session
+
+
+class OdooAccessDenied(RuntimeError):
+    pass
+
+
 # Simple JSON-RPC helper for Odoo
+# Para testes locais: `python manage.py fake_odoo` e ODOO_URL=http://127.0.0.1:8069
 class OdooClient:
     def __init__(self, url: str, db: str, user: str, password: str, timeout: int = 20):
         # Permite receber tanto a URL base (ex: https://host) quanto o endpoint completo (/jsonrpc)
@@ -18,6 +75,7 @@ class OdooClient:
         self.password = password
         self.timeout = timeout
         self.uid: Optional[int] = None
+        self.session = _get_session(self.endpoint)
 
     @property
     def endpoint(self) -> str:
@@ -26,7 +84,12 @@ class OdooClient:
             return self.url
         return f"{self.url}/jsonrpc"
 
-    def _rpc(self, service: str, method: str, args: list, kwargs: Optional[dict] = None) -> Any:
+    @property
+    def _uid_cache_key(self) -> str:
+        return f"odoo:uid:{self.endpoint}:{self.db}:{self.user}"
+
+    @staticmethod
+    def _payload(service: str, method: str, args: list, kwargs: Optional[dict] = None, id: int = 1) -> dict:
         payload = {
             "jsonrpc": "2.0",
             "method": "call",
@@ -35,121 +98,203 @@ class OdooClient:
                 "method": method,
                 "args": args if args is not None else [],
             },
-            "id": 1,
+            "id": id,
         }
         if kwargs:
             payload["params"]["kwargs"] = kwargs
-        resp = requests.post(self.endpoint, json=payload, timeout=self.timeout)
-        resp.raise_for_status()
-        data = resp.json()
+        return payload
+
+    @staticmethod
+    def _resultado(data: dict) -> Any:
         if "error" in data:
-            raise RuntimeError(data["error"])  # surface Odoo error
+            erro = data["error"]
+            nome = ((erro.get("data") or {}).get("name") or "") if isinstance(erro, dict) else ""
+            if nome.endswith("AccessDenied"):
+                raise OdooAccessDenied(erro)
+            raise RuntimeError(erro)  # surface Odoo error
         return data.get("result")
 
-    def login(self) -> int:
+    def _post(self, payload: Any) -> requests.Response:
+        # Retries com backoff ficam no adapter da Session (urllib3 Retry)
+        resp = self.session.post(self.endpoint, json=payload, timeout=self.timeout)
+        resp.raise_for_status()
+        return resp
+
+    def _rpc(self, service: str, method: str, args: list, kwargs: Optional[dict] = None) -> Any:
+        return self._resultado(self._post(self._payload(service, method, args, kwargs)).json())
+
+    def login(self, forcar: bool = False) -> int:
+        """Autentica; o uid fica em cache (UID_CACHE_TIMEOUT) e é reaproveitado nas próximas execuções."""
+        if not forcar:
+            uid = cache.get(self._uid_cache_key)
+            if uid:
+                self.uid = uid
+                return uid
         uid = self._rpc("common", "login", [self.db, self.user, self.password])
         if not uid:
             raise RuntimeError("Odoo login failed")
         self.uid = uid
+        cache.set(self._uid_cache_key, uid, UID_CACHE_TIMEOUT)
         return uid
 
-    def execute_kw(self, model: str, method: str, args: list, kwargs: Optional[dict] = None) -> Any:
+    def _com_login(self, chamada):
         if self.uid is None:
             self.login()
-        return self._rpc("object", "execute_kw", [self.db, self.uid, self.password, model, method, args, kwargs or {}])
+        try:
+            return chamada()
+        except OdooAccessDenied:
+            # uid em cache inválido (senha/usuário mudou): autentica de novo uma vez
+            cache.delete(self._uid_cache_key)
+            self.login(forcar=True)
+            return chamada()
+
+    def execute_kw(self, model: str, method: str, args: list, kwargs: Optional[dict] = None) -> Any:
+        return self._com_login(lambda: self._rpc(
+            "object", "execute_kw", [self.db, self.uid, self.password, model, method, args, kwargs or {}]
+        ))
+
+    def execute_kw_lote(self, chamadas: List[Tuple[str, str, list, Optional[dict]]]) -> Optional[List[Any]]:
+        """
+        Várias execute_kw (model, method, args, kwargs) numa única requisição JSON-RPC
+        em lote. Retorna None se o servidor não aceita lote (o /jsonrpc padrão do Odoo
+        não aceita); o endpoint fica marcado e as próximas chamadas nem tentam.
+        """
+        if self.endpoint in _sem_lote:
+            return None
+
+        def enviar():
+            payload = [
+                self._payload("object", "execute_kw", [self.db, self.uid, self.password, model, method, args, kwargs or {}], id=n)
+                for n, (model, method, args, kwargs) in enumerate(chamadas)
+            ]
+            try:
+                data = self._post(payload).json()
+            except (requests.HTTPError, ValueError):
+                data = None
+            if not isinstance(data, list) or len(data) != len(chamadas):
+                _sem_lote.add(self.endpoint)
+                return None
+            por_id = {item.get("id"): item for item in data if isinstance(item, dict)}
+            return [self._resultado(por_id.get(n, {})) for n in range(len(chamadas))]
+
+        return self._com_login(enviar)
 
 
 def _norm_serial(s: str) -> str:
     return (s or '').strip()
 
 
-def fetch_done_outgoing_moves_with_serial(client: OdooClient, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+def _anos_por_equip(equip: str) -> int:
+    return 1 if (equip or '').lower().find('reader') != -1 else 2
+
+
+def _format_equip_name(name: str) -> str:
     """
-    Busca linhas de movimento (stock.move.line) concluídas de saída (outgoing)
-    que possuam lote/número de série.
+    Normaliza o nome do equipamento removendo prefixos em colchetes
+    e também espaços. Ex.: "[EAATA010-BR] EAATA90" -> "EAATA90".
     """
-    domain = [
-        ("state", "=", "done"),
-        ("picking_id.picking_type_id.code", "=", "outgoing"),
-        "|",
-        ("lot_id", "!=", False),
-        ("lot_name", "!=", False),
-    ]
-    fields = [
-        "date",
-        "qty_done",
-        "product_id",
-        "lot_id",
-        "lot_name",
-        "picking_id",
-        "reference",
-    ]
-    # search_read em blocos
-    result: List[Dict[str, Any]] = []
-    offset = 0
-    step = int(os.getenv("ODOO_READ_STEP", "500"))  # lote de leitura
-    while True:
-        # calcula limite do lote quando limite total é definido
-        per_call_limit = step if (limit is None) else min(step, max(1, limit - offset))
-        if limit is not None and per_call_limit <= 0:
-            break
+    if not name:
+        return ""
+    # remove prefixo em colchetes do início
+    s = re.sub(r"^\[[^\]]*\]\s*", "", str(name)).strip()
+    # normaliza múltiplos espaços, preservando espaços entre palavras
+    s = re.sub(r"\s+", " ", s).strip()
+    # padroniza em maiúsculas
+    return s.upper()
 
-        batch = client.execute_kw(
-            "stock.move.line",
-            "search_read",
-            [domain],
-            {"fields": fields, "limit": per_call_limit, "offset": offset, "order": "date desc"},
-        )
-        if not batch:
-            break
-        result.extend(batch)
-        offset += len(batch)
-        if limit is not None and offset >= limit:
-            break
-    # Map picking -> partner (inclui dados detalhados do parceiro)
-    picking_ids = list({rec["picking_id"][0] for rec in result if isinstance(rec.get("picking_id"), list)})
+
+def _no_limite(valor: str, campo: str) -> str:
+    """Corta `valor` no max_length do campo de Cliente (o bulk_create falharia a página inteira)."""
+    return valor[:Cliente._meta.get_field(campo).max_length]
+
+
+def _em_blocos(itens: List[Any], tamanho: int = SYNC_BATCH):
+    for inicio in range(0, len(itens), tamanho):
+        yield itens[inicio:inicio + tamanho]
+
+
+MOVE_DOMAIN = [
+    ("state", "=", "done"),
+    ("picking_id.picking_type_id.code", "=", "outgoing"),
+    "|",
+    ("lot_id", "!=", False),
+    ("lot_name", "!=", False),
+]
+MOVE_FIELDS = [
+    "date",
+    "write_date",
+    "qty_done",
+    "product_id",
+    "lot_id",
+    "lot_name",
+    "picking_id",
+    "reference",
+]
+
+
+def _domain_desde(desde: Optional[str], apos_id: int = 0) -> list:
+    """
+    Domínio de uma página: linhas alteradas a partir de `desde` (write_date,
+    limite inferior da execução) com id maior que `apos_id` (cursor da página).
+    O write_date devolvido pelo `read` tem só segundos (no banco tem
+    microssegundos), então não serve de cursor: a paginação é só pelo id.
+    """
+    domain = list(MOVE_DOMAIN)
+    if desde:
+        domain.append(("write_date", ">=", desde))
+    if apos_id:
+        domain.append(("id", ">", apos_id))
+    return domain
+
+
+def _ler_em_blocos(client: OdooClient, model: str, ids: List[int], fields: List[str]) -> List[Dict[str, Any]]:
+    """`read` dividido em blocos de READ_CHUNK ids (em lote JSON-RPC ou em paralelo)."""
+    blocos = list(_em_blocos(ids, READ_CHUNK))
+    if len(blocos) <= 1:
+        return client.execute_kw(model, "read", [ids], {"fields": fields}) if ids else []
+    # Servidor com suporte a lote: uma requisição só; senão, blocos em paralelo
+    partes = client.execute_kw_lote([(model, "read", [bloco], {"fields": fields}) for bloco in blocos])
+    if partes is not None:
+        return [registro for parte in partes for registro in parte]
+    with ThreadPoolExecutor(max_workers=min(FETCH_WORKERS, len(blocos)), thread_name_prefix="odoo-read") as pool:
+        partes = pool.map(lambda bloco: client.execute_kw(model, "read", [bloco], {"fields": fields}), blocos)
+        return [registro for parte in partes for registro in parte]
+
+
+def _enriquecer_com_parceiros(
+    client: OdooClient,
+    rows: List[Dict[str, Any]],
+    parceiros: Dict[int, Dict[str, Optional[str]]],
+) -> None:
+    """
+    Completa as linhas com nome/contatos do parceiro do picking. `parceiros`
+    guarda os res.partner já lidos nesta execução (não são relidos a cada página).
+    """
+    picking_ids = sorted({rec["picking_id"][0] for rec in rows if isinstance(rec.get("picking_id"), list)})
     picking_partner_name: Dict[int, Optional[str]] = {}
     picking_partner_id_map: Dict[int, Optional[int]] = {}
-    partner_ids: List[int] = []
-    if picking_ids:
-        pickings = client.execute_kw("stock.picking", "read", [picking_ids], {"fields": ["name", "partner_id", "date_done"]})
-        for p in pickings:
-            partner = p.get("partner_id")
-            pid = p.get("id")
-            partner_id = partner[0] if isinstance(partner, list) and len(partner) > 0 else None
-            partner_name = partner[1] if isinstance(partner, list) and len(partner) > 1 else None
-            picking_partner_name[pid] = partner_name
-            picking_partner_id_map[pid] = partner_id
-            if partner_id:
-                partner_ids.append(partner_id)
-
-    partner_info: Dict[int, Dict[str, Optional[str]]] = {}
-    if partner_ids:
-        # Remove duplicados
-        partner_ids = list(sorted(set(partner_ids)))
-        partners = client.execute_kw(
-            "res.partner",
-            "read",
-            [partner_ids],
-            {"fields": ["name", "phone", "mobile", "email", "vat"]},
-        )
-        for p in partners:
-            partner_info[p.get("id")] = {
-                "name": p.get("name"),
-                "phone": p.get("phone"),
-                "mobile": p.get("mobile"),
-                "email": p.get("email"),
-                "vat": p.get("vat"),
-            }
-
-    # Enriquecer resultado final com dados de parceiro (nome/contatos)
-    for r in result:
+    for p in _ler_em_blocos(client, "stock.picking", picking_ids, ["name", "partner_id", "date_done"]):
+        partner = p.get("partner_id")
+        pid = p.get("id")
+        picking_partner_id_map[pid] = partner[0] if isinstance(partner, list) and len(partner) > 0 else None
+        picking_partner_name[pid] = partner[1] if isinstance(partner, list) and len(partner) > 1 else None
+
+    faltando = sorted({pid for pid in picking_partner_id_map.values() if pid and pid not in parceiros})
+    for p in _ler_em_blocos(client, "res.partner", faltando, ["name", "phone", "mobile", "email", "vat"]):
+        parceiros[p.get("id")] = {
+            "name": p.get("name"),
+            "phone": p.get("phone"),
+            "mobile": p.get("mobile"),
+            "email": p.get("email"),
+            "vat": p.get("vat"),
+        }
+
+    for r in rows:
         pid = r.get("picking_id")
         if isinstance(pid, list):
             pick_id = pid[0]
             r["partner_name"] = picking_partner_name.get(pick_id)
-            p_id = picking_partner_id_map.get(pick_id)
-            pinfo = partner_info.get(p_id or -1, {})
+            pinfo = parceiros.get(picking_partner_id_map.get(pick_id) or -1, {})
             r["partner_phone"] = pinfo.get("mobile") or pinfo.get("phone")
             r["partner_email"] = pinfo.get("email")
             r["partner_vat"] = pinfo.get("vat")
@@ -158,18 +303,118 @@ def fetch_done_outgoing_moves_with_serial(client: OdooClient, limit: Optional[in
             r["partner_phone"] = None
             r["partner_email"] = None
             r["partner_vat"] = None
-    return result
 
 
-def sync_odoo_to_clientes(max_rows: Optional[int] = None) -> Dict[str, int]:
+def iterar_moves_com_serial(
+    client: OdooClient,
+    desde: Optional[str] = None,
+    apos_id: int = 0,
+    limit: Optional[int] = None,
+    step: Optional[int] = None,
+) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Gera páginas de linhas de movimento (stock.move.line) concluídas de saída
+    com lote/número de série, já com os dados do parceiro, em ordem crescente
+    de id, alteradas a partir de `desde` (write_date). Paginação por keyset
+    (sem offset): cada página começa depois do último id da anterior. Só uma
+    página fica em memória por vez.
+    """
+    step = step or int(os.getenv("ODOO_READ_STEP", "500"))
+    if client.uid is None:
+        client.login()  # antes das leituras em paralelo
+    parceiros: Dict[int, Dict[str, Optional[str]]] = {}
+    lidas = 0
+    while limit is None or lidas < limit:
+        per_call_limit = step if limit is None else min(step, limit - lidas)
+        batch = client.execute_kw(
+            "stock.move.line",
+            "search_read",
+            [_domain_desde(desde, apos_id)],
+            {"fields": MOVE_FIELDS, "limit": per_call_limit, "order": "id asc"},
+        )
+        if not batch:
+            break
+        ultimo_id = batch[-1].get("id") or 0
+        if ultimo_id <= apos_id:
+            # O cursor não avançou (servidor ignorou o domínio/ordem): evita repetir a página para sempre
+            raise RuntimeError(f"Paginação do Odoo não avançou após o id {apos_id}")
+        _enriquecer_com_parceiros(client, batch, parceiros)
+        yield batch
+        lidas += len(batch)
+        apos_id = ultimo_id
+        if len(batch) < per_call_limit:
+            break
+
+
+def em_segundo_plano(paginas: Iterable[Any], buffer: int = 2) -> Iterator[Any]:
+    """
+    Consome `paginas` numa thread enquanto quem chama processa as anteriores
+    (no máximo `buffer` páginas adiantadas). Exceções do produtor são relançadas.
+    """
+    fila: "queue.Queue[Tuple[str, Any]]" = queue.Queue(maxsize=buffer)
+    parar = threading.Event()
+
+    def colocar(item) -> bool:
+        # Nunca bloqueia para sempre: se quem consome desistiu (erro ao gravar),
+        # a thread termina em vez de esperar espaço na fila
+        while not parar.is_set():
+            try:
+                fila.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produzir():
+        try:
+            for pagina in paginas:
+                if not colocar(("pagina", pagina)):
+                    return
+            colocar(("fim", None))
+        except BaseException as exc:
+            colocar(("erro", exc))
+
+    produtor = threading.Thread(target=produzir, name="odoo-fetch", daemon=True)
+    produtor.start()
+    try:
+        while True:
+            tipo, valor = fila.get()
+            if tipo == "fim":
+                return
+            if tipo == "erro":
+                raise valor
+            yield valor
+    finally:
+        parar.set()
+
+
+def fetch_done_outgoing_moves_with_serial(
+    client: OdooClient,
+    limit: Optional[int] = None,
+    desde: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Busca linhas de movimento (stock.move.line) concluídas de saída (outgoing)
+    que possuam lote/número de série, numa lista só (ver iterar_moves_com_serial
+    para processar página a página).
+    """
+    return [rec for pagina in iterar_moves_com_serial(client, desde=desde, limit=limit) for rec in pagina]
+
+
+def sync_odoo_to_clientes(max_rows: Optional[int] = None, full: bool = False) -> Dict[str, int]:
     """Sincroniza movimentos de saída com série em Clientes.
     Regras:
       - Serial = lot_name (ou lot_id[1])
       - Nome = partner_name (se houver)
       - Equipamento = product_id[1]
-      - Data = date (ou hoje se ausente)
+      - Data = date do movimento mais recente do serial (ou hoje se ausente)
       - anos_para_vencimento: 1 se equipamento contém 'reader', senão 2 (mesma regra do app)
       - Se já existir Cliente com o serial, não duplica; atualiza nome/equipamento quando vazios.
+    Incremental: só busca linhas com write_date a partir da marca d'água em
+    SincronizacaoOdoo, em ordem de id e em páginas de ODOO_READ_STEP. O id da
+    última linha gravada é salvo junto com cada página (uma execução que falhar
+    retoma dali); ao terminar, a marca passa a ser o maior write_date lido.
+    `full=True` recomeça do início.
     """
     # Ordem de prioridade: Django settings -> env vars -> defaults dev
     url = getattr(settings, "ODOO_URL", None) or os.getenv("ODOO_URL", "http://localhost:8069")
@@ -184,48 +429,157 @@ def sync_odoo_to_clientes(max_rows: Optional[int] = None) -> Dict[str, int]:
     )
 
     client = OdooClient(url, db, user, password)
-    rows = fetch_done_outgoing_moves_with_serial(client, limit=max_rows)
 
-    created = 0
-    updated = 0
-    skipped = 0
+    estado, _ = SincronizacaoOdoo.objects.get_or_create(origem=ORIGEM_MOVES)
+    if full:
+        estado.ultimo_write_date = ""
+        estado.ultimo_id = 0
+    estado.status = "em_andamento"
+    estado.erro = ""
+    estado.iniciado_em = timezone.now()
+    estado.concluido_em = None
+    estado.save()
 
-    def anos_por_equip(equip: str) -> int:
-        return 1 if (equip or '').lower().find('reader') != -1 else 2
+    stats = {"created": 0, "updated": 0, "skipped": 0, "fetched": 0}
+    desde = estado.ultimo_write_date or None
+    maior_write_date = ""
+    criados: set = set()  # seriais criados nesta execução (data ainda pode avançar)
+    try:
+        # A próxima página é buscada no Odoo enquanto a atual é gravada
+        paginas = iterar_moves_com_serial(client, desde=desde, apos_id=estado.ultimo_id, limit=max_rows)
+        for rows in em_segundo_plano(paginas):
+            with transaction.atomic():
+                parcial = aplicar_linhas_odoo(rows, criados)
+                estado.ultimo_id = rows[-1].get("id") or estado.ultimo_id
+                estado.save(update_fields=["ultimo_id"])
+            maior_write_date = max([maior_write_date, *(r.get("write_date") or "" for r in rows)])
+
+            for chave, valor in parcial.items():
+                stats[chave] += valor
+            stats["fetched"] += len(rows)
+    except Exception as exc:
+        # ultimo_id fica na última página gravada: a próxima execução retoma dali
+        estado.status = "erro"
+        estado.erro = str(exc)
+        estado.save(update_fields=["status", "erro"])
+        raise
+
+    if max_rows is None or stats["fetched"] < max_rows:
+        # Execução completa: a próxima parte do maior write_date lido (>=, então
+        # linhas do mesmo segundo são relidas; o upsert é idempotente)
+        estado.ultimo_write_date = maior_write_date or estado.ultimo_write_date
+        estado.ultimo_id = 0
+    estado.status = "ok"
+    estado.concluido_em = timezone.now()
+    estado.save(update_fields=["ultimo_write_date", "ultimo_id", "status", "concluido_em"])
+    return stats
 
-    def format_equip_name(name: str) -> str:
-        """
-        Normaliza o nome do equipamento removendo prefixos em colchetes
-        e também espaços. Ex.: "[EAATA010-BR] EAATA90" -> "EAATA90".
-        """
-        if not name:
-            return ""
-        # remove prefixo em colchetes do início
-        s = re.sub(r"^\[[^\]]*\]\s*", "", str(name)).strip()
-        # normaliza múltiplos espaços, preservando espaços entre palavras
-        s = re.sub(r"\s+", " ", s).strip()
-        # padroniza em maiúsculas
-        return s.upper()
 
+def _carregar_clientes(seriais_norm: List[str]) -> Dict[str, Cliente]:
+    """Clientes existentes por serial normalizado (uma consulta IN por bloco de seriais)."""
+    existentes: Dict[str, Cliente] = {}
+    for bloco in _em_blocos(seriais_norm):
+        for cliente in Cliente.objects.por_seriais(bloco).only(
+            "id", "serial", "serial_norm", "nome", "tel", "equipamento", "data", "vencimento", "anos_para_vencimento"
+        ).order_by("id"):
+            # Cadastro ainda sem serial_norm (antes do normalizar_seriais) também conta;
+            # havendo repetidos, fica o mais antigo, como no backfill
+            existentes.setdefault(cliente.serial_norm or normalizar_serial(cliente.serial), cliente)
+    return existentes
+
+
+def espelhar_serial_vci(clientes: List[Cliente]) -> None:
+    """
+    Versão em lote do signal sincronizar_serial: cria ou atualiza o SerialVCI
+    (numero_vci = serial) de cada cliente com nome, telefone e data.
+    """
+    por_serial: Dict[str, Cliente] = {c.serial: c for c in clientes}
+    seriais = list(por_serial)
+
+    atualizar: List[SerialVCI] = []
+    encontrados = set()
+    for bloco in _em_blocos(seriais):
+        for vci in SerialVCI.objects.filter(numero_vci__in=bloco).only("id", "numero_vci", "cliente", "telefone", "data"):
+            cliente = por_serial[vci.numero_vci]
+            encontrados.add(vci.numero_vci)
+            if (vci.cliente, vci.telefone, vci.data) != (cliente.nome, cliente.tel, cliente.data):
+                vci.cliente = cliente.nome
+                vci.telefone = cliente.tel
+                vci.data = cliente.data
+                atualizar.append(vci)
+
+    novos = [
+        SerialVCI(
+            numero_vci=serial,
+            data=cliente.data,
+            cliente=cliente.nome,
+            telefone=cliente.tel,
+            email="",
+            pedido="",
+            numero_tablet="",
+            numero_prog="",
+        )
+        for serial, cliente in por_serial.items()
+        if serial not in encontrados
+    ]
+    SerialVCI.objects.bulk_create(novos, batch_size=SYNC_BATCH)
+    SerialVCI.objects.bulk_update(atualizar, ["cliente", "telefone", "data"], batch_size=SYNC_BATCH)
+
+
+def aplicar_linhas_odoo(rows: List[Dict[str, Any]], criados: Optional[set] = None) -> Dict[str, int]:
+    """
+    Aplica linhas de movimento do Odoo em Clientes (upsert em lote):
+    carrega os clientes existentes por serial normalizado, calcula as mudanças
+    em memória (mesmas regras de antes, linha a linha) e grava com
+    bulk_create/bulk_update em blocos, numa transação.
+
+    A data de um cliente novo é a do movimento MAIS RECENTE do serial (como na
+    busca antiga, em ordem de data decrescente). As linhas chegam em ordem de
+    id (não de data), então enquanto o cliente é desta execução (ainda não gravado,
+    ou em `criados`: seriais criados em páginas anteriores da mesma
+    sincronização) uma linha mais nova avança data e vencimento. Clientes que
+    já existiam antes da execução não têm a data alterada.
+    """
+    criados = set() if criados is None else criados
+    linhas = []
     for rec in rows:
         serial = _norm_serial(rec.get("lot_name") or (rec.get("lot_id")[1] if isinstance(rec.get("lot_id"), list) else None))
-        if not serial:
+        linhas.append((serial, normalizar_serial(serial), rec))
+
+    existentes = _carregar_clientes(sorted({norm for _, norm, _ in linhas if norm}))
+
+    created = 0
+    updated = 0
+    skipped = 0
+    novos: Dict[str, Cliente] = {}
+    alterados: Dict[str, Cliente] = {}
+
+    serial_max = Cliente._meta.get_field("serial").max_length
+    for serial, serial_norm, rec in linhas:
+        # Serial que não cabe no campo não pode ser cortado (mudaria a identidade): pula a linha
+        if not serial_norm or len(serial) > serial_max:
             skipped += 1
             continue
         produto = rec.get("product_id")
         equipamento_raw = produto[1] if isinstance(produto, list) and len(produto) > 1 else ""
-        equipamento = format_equip_name(equipamento_raw)
-        partner_name = rec.get("partner_name") or ""
-        partner_phone = rec.get("partner_phone") or ""
+        equipamento = _no_limite(_format_equip_name(equipamento_raw), "equipamento")
+        partner_name = _no_limite(rec.get("partner_name") or "", "nome")
+        partner_phone = _no_limite(rec.get("partner_phone") or "", "tel")
         dt = rec.get("date")
         try:
             data_date = datetime.fromisoformat(dt.replace('Z','+00:00')).date() if isinstance(dt, str) else timezone.localdate()
         except Exception:
             data_date = timezone.localdate()
 
-        obj = Cliente.objects.filter(serial__iexact=serial).first()
+        obj = existentes.get(serial_norm) or novos.get(serial_norm)
         if obj:
             changed = False
+            # Cliente desta execução: fica com a data do movimento mais recente
+            if (obj.pk is None or serial_norm in criados) and obj.data and data_date > obj.data:
+                obj.data = data_date
+                obj.vencimento = None
+                obj.preparar_gravacao()
+                changed = True
             # Atualiza nome somente se vazio
             if not obj.nome and partner_name:
                 obj.nome = partner_name
@@ -239,25 +593,39 @@ def sync_odoo_to_clientes(max_rows: Optional[int] = None) -> Dict[str, int]:
                 obj.equipamento = equipamento
                 changed = True
             if changed:
-                obj.save(update_fields=["nome", "tel", "equipamento"])  # não altera 'data' em updates
+                if obj.pk:
+                    alterados[serial_norm] = obj
                 updated += 1
             else:
                 skipped += 1
             continue
 
         # Criar novo
-        try:
-            Cliente.objects.create(
-                data=data_date,
-                anos_para_vencimento=anos_por_equip(equipamento),
-                serial=serial,
-                nome=partner_name,
-                cnpj=None,
-                tel=partner_phone or None,
-                equipamento=equipamento or "N/D",
+        obj = Cliente(
+            data=data_date,
+            anos_para_vencimento=_anos_por_equip(equipamento),
+            serial=serial,
+            nome=partner_name,
+            cnpj=None,
+            tel=partner_phone or None,
+            equipamento=equipamento or "N/D",
+        )
+        obj.preparar_gravacao()
+        novos[serial_norm] = obj
+        created += 1
+
+    if novos or alterados:
+        with transaction.atomic():
+            # bulk_* não disparam post_save: o espelho SerialVCI e o cache da
+            # consulta de situação são atualizados aqui, uma vez por sincronização
+            Cliente.objects.bulk_create(list(novos.values()), batch_size=SYNC_BATCH)
+            Cliente.objects.bulk_update(
+                list(alterados.values()),
+                ["nome", "tel", "equipamento", "data", "vencimento"],
+                batch_size=SYNC_BATCH,
             )
-            created += 1
-        except Exception:
-            skipped += 1
+            espelhar_serial_vci([*novos.values(), *alterados.values()])
+        invalidar_situacao()
+        criados.update(novos)
 
-    return {"created": created, "updated": updated, "skipped": skipped, "fetched": len(rows)}
+    return {"created": created, "updated": updated, "skipped": skipped}
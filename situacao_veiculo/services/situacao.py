@@ -0,0 +1,47 @@
+# situacao_veiculo/services/situacao.py
+from datetime import date
+
+from django.conf import settings
+from django.core.cache import cache
+
+from ocorrencia_erro.services.cache_versao import incrementar_versao, versao_atual
+from situacao_veiculo.models import Cliente, normalizar_serial
+
+# Qualquer save/delete de Cliente incrementa a versão (ver signals.py). A data
+# também faz parte da chave: status e mensagens mudam na virada do dia.
+VERSAO_CACHE_KEY = 'situacao:serial:versao'
+
+CAMPOS_CLIENTE = ('id', 'nome', 'cnpj', 'tel', 'equipamento', 'vencimento')
+
+
+def _dados_cliente(cliente):
+    return {
+        'cliente': {campo: getattr(cliente, campo) for campo in CAMPOS_CLIENTE},
+        'status': cliente.status,
+        'vencimento_dias': cliente._vencimento_dias,
+        'status_message': cliente.status_message,  # curta efetiva
+        'mensagem': cliente.message_effective,  # detalhada efetiva
+    }
+
+
+def consultar_situacao(serial):
+    """
+    Situação de suporte dos cadastros com o serial (sem diferenciar caixa):
+    lista com cliente, status e mensagens já calculados, vinda de uma única
+    consulta e guardada em cache (SITUACAO_CACHE_TIMEOUT). Lista vazia = não
+    cadastrado.
+    """
+    serial_norm = normalizar_serial(serial)
+    if serial_norm is None:
+        return []
+
+    chave = f'situacao:serial:{versao_atual(VERSAO_CACHE_KEY)}:{date.today().isoformat()}:{serial_norm}'
+    situacao = cache.get(chave)
+    if situacao is None:
+        situacao = [_dados_cliente(cliente) for cliente in Cliente.objects.por_serial(serial_norm)]
+        cache.set(chave, situacao, getattr(settings, 'SITUACAO_CACHE_TIMEOUT', 60 * 10))
+    return situacao
+
+
+def invalidar_situacao():
+    incrementar_versao(VERSAO_CACHE_KEY)
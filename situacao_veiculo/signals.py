@@ -1,7 +1,8 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 
 from situacao_veiculo.models import Cliente
+from situacao_veiculo.services.situacao import invalidar_situacao
 from serial_vci.models import SerialVCI
 
 
@@ -26,3 +27,10 @@ def sincronizar_serial(sender, instance, **kwargs):
         serial.telefone = instance.tel
         serial.data = instance.data  # <- agora atualiza a data também
         serial.save()
+
+
+@receiver(post_save, sender=Cliente)
+@receiver(post_delete, sender=Cliente)
+def atualizar_situacao_serial(sender, **kwargs):
+    # Consulta de situação (buscar_serial) é recalculada na próxima busca
+    invalidar_situacao()
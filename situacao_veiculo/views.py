@@ -1,5 +1,6 @@
 from datetime import date, datetime
 
+from asgiref.sync import sync_to_async
 from django.db import IntegrityError
 from django.http import JsonResponse
 from django.shortcuts import redirect, render
@@ -16,185 +17,118 @@ from django.views.decorators.csrf import csrf_exempt
 from django.db.models import Q
 from ocorrencia_erro.models import Device
 from .services.odoo_sync import sync_odoo_to_clientes
+from .services.busca_externa import buscar_externo_async, encontrado
+from .services.situacao import consultar_situacao
 import requests
 import os
 from django.conf import settings
 import unicodedata
 
-def buscar_serial(request):
-    context = {}
-    if request.method == 'POST':
-        serial = request.POST.get('serial', '').strip()
-        context['serial_digitado'] = serial
-
-        # Busca case-insensitive para evitar falhas por maiúsculas/minúsculas
-        clientes = Cliente.objects.filter(serial__iexact=serial)
-
-        if not clientes.exists():
-            # Busca em serviço externo usando o serial digitado (headers e cookie conforme curl)
-            try:
-                cookie_value = 'eyJ1c2VyX2lkIjoiZWFhdGFkbWluIn0.aV_2TA.URbvR1qfUJFd6H56IRWZc_hSSp0'
-                headers = {
-                    'Accept': '*/*',
-                    'Accept-Language': 'pt-PT,pt;q=0.9,en-US;q=0.8,en;q=0.7,es;q=0.6',
-                    'Connection': 'keep-alive',
-                    'Content-Type': 'application/json',
-                    'Origin': 'http://20.83.150.13:8088',
-                    'Referer': 'http://20.83.150.13:8088/dashboard',
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/143.0.0.0 Safari/537.36',
-                }
-                resp = requests.post(
-                    'http://20.83.150.13:8088/search_codes',
-                    json={'sn': serial},
-                    headers=headers,
-                    cookies={'session': cookie_value},
-                    timeout=10,
-                )
-                print(resp.text)
-                try:
-                    resp_json = resp.json()
-                except ValueError:
-                    resp_json = {'status_code': resp.status_code, 'text': resp.text}
+async def buscar_serial(request):
+    if request.method != 'POST':
+        return redirect('index')  # GET -> homepage
 
-                # Prepare a rich external_search payload for the template/front
-                external_info = {'status': resp.status_code, 'data': resp_json}
-                print(external_info)
+    context = {}
+    serial = request.POST.get('serial', '').strip()
+    context['serial_digitado'] = serial
+
+    # Busca case-insensitive (índice de serial_norm), com status e mensagens já calculados (cache)
+    clientes = await sync_to_async(consultar_situacao)(serial)
+
+    if not clientes:
+        # Busca no serviço externo: pool próprio, cache e disjuntor (services/busca_externa.py)
+        context['external_search'] = await buscar_externo_async(serial)
+
+        # Se o serviço externo retornou algum código, sinaliza que é preciso atualizar os dados.
+        # Serviço fora do ar (disjuntor aberto) ou erro: cai direto em "SEM DADOS".
+        es = context.get('external_search')
+        if encontrado(es):
+            # Indica que os dados foram obtidos externamente e precisam de atualização
+            context['mensagem'] = 'Dados captaados externamente, necessário atualização'
+            # Mapear dados externos para o formato que o template espera (cliente, vencimento)
+            data = es.get('data') if isinstance(es, dict) else None
+            first = None
+            if isinstance(data, dict):
+                codes = data.get('codes')
+                if codes and isinstance(codes, list) and len(codes) > 0:
+                    first = codes[0]
+
+            cliente_dict = {
+                'nome': es.get('email') or (first.get('email') if first else '') or '',
+                'cnpj': '',
+                'tel': '',
+                'equipamento': ('{} - {}'.format(first.get('city',''), first.get('country','')).strip(' -') if first else ''),
+                'vencimento': es.get('vencimento') or (first.get('created_at') if first else None),
+            }
+            context['cliente'] = cliente_dict
+
+            # Determina status com base em vencimento (created_at + 2 anos)
+            status_val = 'indefinido'
+            venc_str = es.get('vencimento') if isinstance(es, dict) else None
+            if venc_str:
                 try:
-                    if isinstance(resp_json, dict):
-                        codes = resp_json.get('codes')
-                        if codes and isinstance(codes, list) and len(codes) > 0:
-                            first = codes[0]
-                            created_at_str = first.get('created_at')
-                            email = first.get('email')
-                            external_info['cliente'] = email
-                            external_info['sn'] = first.get('sn')
-
-                            if created_at_str:
-                                try:
-                                    created_dt = parsedate_to_datetime(created_at_str)
-                                    # Compute +2 years (fallback for Feb 29)
-                                    try:
-                                        venc_dt = created_dt.replace(year=created_dt.year + 2)
-                                    except ValueError:
-                                        venc_dt = created_dt.replace(month=2, day=28, year=created_dt.year + 2)
-                                    external_info['created_at'] = created_dt.isoformat()
-                                    external_info['vencimento'] = venc_dt.date().isoformat()
-                                except Exception:
-                                    pass
+                    venc_date = parse_date(venc_str)
+                    if isinstance(venc_date, datetime):
+                        venc_date = venc_date.date()
+                    dias = (venc_date - date.today()).days
+                    if dias > 30:
+                        status_val = 'direito'
+                    elif dias < 1:
+                        status_val = 'vencido'
+                    else:
+                        status_val = 'vencendo'
                 except Exception:
-                    pass
-
-                context['external_search'] = external_info
-            except requests.RequestException as exc:
-                context['external_search'] = {'error': str(exc)}
-
-            # Se o serviço externo retornou algum código, sinaliza que é preciso atualizar os dados
-            found_external = False
-            es = context.get('external_search')
-            if isinstance(es, dict):
-                data = es.get('data')
-                if isinstance(data, dict):
-                    codes = data.get('codes')
-                    if codes and isinstance(codes, list) and len(codes) > 0:
-                        found_external = True
-
-            if found_external:
-                # Indica que os dados foram obtidos externamente e precisam de atualização
-                context['mensagem'] = 'Dados captaados externamente, necessário atualização'
-                # Mapear dados externos para o formato que o template espera (cliente, vencimento)
-                data = es.get('data') if isinstance(es, dict) else None
-                first = None
-                if isinstance(data, dict):
-                    codes = data.get('codes')
-                    if codes and isinstance(codes, list) and len(codes) > 0:
-                        first = codes[0]
-
-                cliente_dict = {
-                    'nome': es.get('email') or (first.get('email') if first else '') or '',
-                    'cnpj': '',
-                    'tel': '',
-                    'equipamento': ('{} - {}'.format(first.get('city',''), first.get('country','')).strip(' -') if first else ''),
-                    'vencimento': es.get('vencimento') or (first.get('created_at') if first else None),
-                }
-                context['cliente'] = cliente_dict
-
-                # Determina status com base em vencimento (created_at + 2 anos)
-                status_val = 'indefinido'
-                venc_str = es.get('vencimento') if isinstance(es, dict) else None
-                if venc_str:
+                    status_val = 'indefinido'
+            else:
+                # fallback: calcule a partir de created_at se estiver disponível
+                created_at_str = None
+                if first:
+                    created_at_str = first.get('created_at')
+                if created_at_str:
                     try:
-                        venc_date = parse_date(venc_str)
-                        if isinstance(venc_date, datetime):
-                            venc_date = venc_date.date()
-                        dias = (venc_date - date.today()).days
+                        created_dt = parsedate_to_datetime(created_at_str)
+                        try:
+                            venc_dt = created_dt.replace(year=created_dt.year + 2)
+                        except ValueError:
+                            venc_dt = created_dt.replace(month=2, day=28, year=created_dt.year + 2)
+                        dias = (venc_dt.date() - date.today()).days
                         if dias > 30:
                             status_val = 'direito'
                         elif dias < 1:
                             status_val = 'vencido'
                         else:
                             status_val = 'vencendo'
+                        if not cliente_dict.get('vencimento'):
+                            cliente_dict['vencimento'] = venc_dt.date().isoformat()
                     except Exception:
                         status_val = 'indefinido'
-                else:
-                    # fallback: calcule a partir de created_at se estiver disponível
-                    created_at_str = None
-                    if first:
-                        created_at_str = first.get('created_at')
-                    if created_at_str:
-                        try:
-                            created_dt = parsedate_to_datetime(created_at_str)
-                            try:
-                                venc_dt = created_dt.replace(year=created_dt.year + 2)
-                            except ValueError:
-                                venc_dt = created_dt.replace(month=2, day=28, year=created_dt.year + 2)
-                            dias = (venc_dt.date() - date.today()).days
-                            if dias > 30:
-                                status_val = 'direito'
-                            elif dias < 1:
-                                status_val = 'vencido'
-                            else:
-                                status_val = 'vencendo'
-                            if not cliente_dict.get('vencimento'):
-                                cliente_dict['vencimento'] = venc_dt.date().isoformat()
-                        except Exception:
-                            status_val = 'indefinido'
-
-                context['status'] = status_val
-                # Map status to short message following the same rules as models.status_message_default
-                if status_val == 'direito':
-                    context['status_message'] = "SUPORTE LIBERADO - Atualizar dados e atender normalmente"
-                elif status_val == 'vencido':
-                    context['status_message'] = "SUPORTE VENCIDO - Não fazer atendimento"
-                elif status_val == 'vencendo':
-                    context['status_message'] = "SUPORTE A VENCER - Atualizar dados e atender normalmente"
-            else:
-                context['status_message'] = 'SEM DADOS'
-                context['mensagem'] = 'Passar para o comercial atualizar o cadastro.'
-
-            return render(request, 'situacao/index.html', context)
-
-        if clientes.count() > 1:
-            lista_clientes = []
-            for cliente in clientes:
-                lista_clientes.append({
-                    'cliente': cliente,
-                    'status': cliente.status,
-                    'vencimento_dias': getattr(cliente, '_vencimento_dias', None),
-                    'status_message': cliente.status_message,  # já é “efetiva”
-                })
-            context['clientes_duplicados'] = lista_clientes
-            context['mensagem'] = 'Encontradas múltiplas ocorrências para esse serial. Verifique os dados abaixo:'
-            return render(request, 'situacao/index.html', context)
-
-        # Único cliente
-        cliente = clientes.first()
-        context['cliente'] = cliente
-        context['status'] = cliente.status
-        context['mensagem'] = cliente.message_effective   # detalhada efetiva
-        context['status_message'] = cliente.status_message  # curta efetiva
-        return render(request, 'situacao/index.html', context)
-
-    return redirect('index')  # GET -> homepage
+
+            context['status'] = status_val
+            # Map status to short message following the same rules as models.status_message_default
+            if status_val == 'direito':
+                context['status_message'] = "SUPORTE LIBERADO - Atualizar dados e atender normalmente"
+            elif status_val == 'vencido':
+                context['status_message'] = "SUPORTE VENCIDO - Não fazer atendimento"
+            elif status_val == 'vencendo':
+                context['status_message'] = "SUPORTE A VENCER - Atualizar dados e atender normalmente"
+        else:
+            context['status_message'] = 'SEM DADOS'
+            context['mensagem'] = 'Passar para o comercial atualizar o cadastro.'
+
+        return await sync_to_async(render)(request, 'situacao/index.html', context)
+
+    if len(clientes) > 1:
+        context['clientes_duplicados'] = clientes
+        context['mensagem'] = 'Encontradas múltiplas ocorrências para esse serial. Verifique os dados abaixo:'
+        return await sync_to_async(render)(request, 'situacao/index.html', context)
+
+    # Único cliente
+    situacao = clientes[0]
+    context['cliente'] = situacao['cliente']
+    context['status'] = situacao['status']
+    context['mensagem'] = situacao['mensagem']   # detalhada efetiva
+    context['status_message'] = situacao['status_message']  # curta efetiva
+    return await sync_to_async(render)(request, 'situacao/index.html', context)
 
 def _anos_por_equipamento(equipamento: str) -> int:
     if not equipamento:
@@ -283,7 +217,7 @@ def cadastrar_serial(request):
 
     try:
         # Evita duplicidade ignorando caixa
-        if Cliente.objects.filter(serial__iexact=serial).exists():
+        if Cliente.objects.por_serial(serial).exists():
             return JsonResponse(
                 {"ok": False, "message": "Serial já em uso.", "field_errors": {"serial": "Serial já cadastrado."}},
                 status=409,
@@ -357,7 +291,7 @@ def api_buscar_cliente(request):
         return JsonResponse({"ok": False, "message": "Informe o serial."}, status=400)
 
     try:
-        cliente = Cliente.objects.filter(serial__iexact=serial).first()
+        cliente = Cliente.objects.por_serial(serial).first()
     except Cliente.DoesNotExist:
         cliente = None
     if not cliente:
@@ -385,7 +319,7 @@ def api_atualizar_cliente(request):
     if field not in ALLOWED_FIELDS:
         return JsonResponse({"ok": False, "message": "Campo não permitido para atualização."}, status=400)
 
-    cliente = Cliente.objects.filter(serial__iexact=serial).first()
+    cliente = Cliente.objects.por_serial(serial).first()
     if not cliente:
         return JsonResponse({"ok": False, "message": "Serial não encontrado."}, status=404)
 
@@ -464,7 +398,7 @@ def importar_excel(request):
             errors.append({"row": row_index, "message": "Serial ausente."})
             continue
 
-        if Cliente.objects.filter(serial__iexact=serial).exists():
+        if Cliente.objects.por_serial(serial).exists():
             duplicates += 1
             continue
 
@@ -566,7 +500,9 @@ def odoo_sync(request):
             except ValueError:
                 eff_limit = None
 
-        stats = sync_odoo_to_clientes(max_rows=eff_limit)
+        # ?full=1 ignora a marca d'água e relê todo o histórico
+        full = request.GET.get('full') in ('1', 'true', 'True')
+        stats = sync_odoo_to_clientes(max_rows=eff_limit, full=full)
         return JsonResponse({"ok": True, "message": "Sync concluído", "data": {**stats, "using_url": used_url, "using_db": used_db}})
     except (requests.exceptions.RequestException, ConnectionError) as e:
         used_url = getattr(settings, 'ODOO_URL', None) or os.getenv('ODOO_URL')
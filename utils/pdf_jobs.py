@@ -0,0 +1,257 @@
+"""
+Fila de renderização de PDFs.
+
+Cada pedido vira um job (id uuid) executado por um pool de threads; o PDF
+gerado fica em disco (PDF_CACHE_DIR) com o nome igual ao hash das entradas.
+Um pedido repetido com as mesmas entradas é servido direto do disco, e dois
+pedidos iguais em andamento compartilham a mesma renderização. Um render que
+devolve Provisorio (ex.: tradução indisponível) é entregue só aos jobs que o
+aguardavam e não é reaproveitado.
+
+O estado do job fica no cache do Django (compartilhado entre workers) e o
+dono do job é avisado pelo grupo WebSocket user_{id} quando o PDF fica pronto.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.http import FileResponse, Http404, JsonResponse
+from django.urls import reverse
+
+STATUS_PENDENTE = 'pendente'
+STATUS_PRONTO = 'pronto'
+STATUS_ERRO = 'erro'
+
+JOB_CACHE_TIMEOUT = 60 * 60
+# Intervalo mínimo entre limpezas dos PDFs antigos em disco
+LIMPEZA_INTERVALO = 60 * 60
+
+_executor = None
+_executor_lock = threading.Lock()
+_em_andamento = {}  # chave -> Future (renderizações em curso neste processo)
+_finalizar_lock = threading.Lock()
+_ultima_limpeza = 0
+
+
+class Provisorio(bytes):
+    """PDF que não deve ser servido do cache a pedidos futuros (render degradado)."""
+
+
+def chave_entrada(tipo, dados):
+    """Hash estável das entradas de um PDF (tipo + dados serializáveis em JSON)."""
+    bruto = json.dumps([tipo, dados], sort_keys=True, cls=DjangoJSONEncoder, default=str)
+    return hashlib.sha256(bruto.encode('utf-8')).hexdigest()
+
+
+def caminho_artefato(chave):
+    return os.path.join(settings.PDF_CACHE_DIR, f'{chave}.pdf')
+
+
+def _job_cache_key(job_id):
+    return f'pdf_job:{job_id}'
+
+
+def obter_job(job_id):
+    return cache.get(_job_cache_key(job_id))
+
+
+def _salvar_job(job):
+    cache.set(_job_cache_key(job['id']), job, JOB_CACHE_TIMEOUT)
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'PDF_JOB_WORKERS', 2),
+                thread_name_prefix='pdf-job',
+            )
+        return _executor
+
+
+def _limpar_artefatos_antigos():
+    """Remove PDFs em disco mais velhos que PDF_CACHE_DIAS (no máximo uma vez por hora)."""
+    global _ultima_limpeza
+    agora = time.time()
+    if agora - _ultima_limpeza < LIMPEZA_INTERVALO:
+        return
+    _ultima_limpeza = agora
+    if not os.path.isdir(settings.PDF_CACHE_DIR):
+        return
+
+    limite = agora - getattr(settings, 'PDF_CACHE_DIAS', 7) * 24 * 60 * 60
+    try:
+        for nome in os.listdir(settings.PDF_CACHE_DIR):
+            caminho = os.path.join(settings.PDF_CACHE_DIR, nome)
+            if nome.endswith('.pdf') and os.path.getmtime(caminho) < limite:
+                os.remove(caminho)
+    except OSError as e:
+        print(f"Erro ao limpar cache de PDFs: {e}")
+
+
+def _renderizar(chave, render):
+    """
+    Executa no pool: gera o PDF e grava de forma atômica (arquivo temporário + rename).
+    Retorna a chave do arquivo gravado: a própria chave das entradas ou, para um
+    PDF Provisorio, uma chave única que nenhum pedido futuro vai encontrar.
+    """
+    try:
+        pdf = render()
+        if not pdf:
+            raise RuntimeError('Renderização não retornou conteúdo.')
+        if isinstance(pdf, Provisorio):
+            chave = f'{chave}-{uuid.uuid4().hex}'
+        os.makedirs(settings.PDF_CACHE_DIR, exist_ok=True)
+        destino = caminho_artefato(chave)
+        temporario = f'{destino}.{uuid.uuid4().hex}.tmp'
+        with open(temporario, 'wb') as f:
+            f.write(pdf)
+        os.replace(temporario, destino)
+        return chave
+    finally:
+        # Conexões abertas pela thread do pool não são fechadas pelo ciclo de request
+        connections.close_all()
+
+
+def _notificar(job):
+    if not job.get('user_id'):
+        return
+    try:
+        channel_layer = get_channel_layer()
+        async_to_sync(channel_layer.group_send)(
+            f"user_{job['user_id']}",
+            {
+                'type': 'pdf_pronto',
+                'job': dados_publicos(job),
+            }
+        )
+    except Exception as e:
+        print(f"Erro ao notificar PDF pronto: {e}")
+
+
+def _finalizar(job_id, future):
+    # Chamado pelo callback do future e por aguardar(): o lock garante que só um
+    # deles grava o status e avisa o usuário (o outro encontra o job já finalizado)
+    with _finalizar_lock:
+        job = obter_job(job_id)
+        if job is None or job['status'] != STATUS_PENDENTE:
+            return
+        erro = future.exception()
+        if erro is None:
+            job['status'] = STATUS_PRONTO
+            job['chave'] = future.result()
+        else:
+            print(f"Erro ao gerar PDF ({job_id}): {erro}")
+            job['status'] = STATUS_ERRO
+            job['erro'] = 'Ocorreu um erro interno ao gerar o PDF.'
+        _salvar_job(job)
+    _notificar(job)
+
+
+def submeter(tipo, dados, render, filename, user_id=None, inline=False):
+    """
+    Enfileira a renderização `render()` (callable que devolve os bytes do PDF).
+    Retorna (job, future); future é None quando o PDF já estava em cache.
+    """
+    chave = chave_entrada(tipo, dados)
+    job = {
+        'id': uuid.uuid4().hex,
+        'tipo': tipo,
+        'chave': chave,
+        'status': STATUS_PENDENTE,
+        'filename': filename,
+        'inline': inline,
+        'user_id': user_id,
+        'erro': None,
+    }
+
+    if os.path.exists(caminho_artefato(chave)):
+        job['status'] = STATUS_PRONTO
+        _salvar_job(job)
+        return job, None
+
+    _salvar_job(job)
+    _limpar_artefatos_antigos()
+
+    executor = _get_executor()
+    with _executor_lock:
+        # Consulta e registro no mesmo lock: dois pedidos iguais não renderizam duas vezes
+        future = _em_andamento.get(chave)
+        if future is None:
+            future = executor.submit(_renderizar, chave, render)
+            _em_andamento[chave] = future
+            future.add_done_callback(lambda f: _em_andamento.pop(chave, None))
+    future.add_done_callback(lambda f: _finalizar(job['id'], f))
+    return job, future
+
+
+def aguardar(job, future, timeout=None):
+    """Espera o job terminar (modo síncrono). Retorna o job atualizado."""
+    if future is not None:
+        try:
+            future.result(timeout=timeout or getattr(settings, 'PDF_JOB_TIMEOUT', 120))
+        except TimeoutError:
+            return obter_job(job['id']) or job
+        except Exception:
+            pass
+        _finalizar(job['id'], future)
+    return obter_job(job['id']) or job
+
+
+def dados_publicos(job):
+    dados = {
+        'job_id': job['id'],
+        'status': job['status'],
+        'erro': job.get('erro'),
+        'status_url': reverse('pdf_job_status', args=[job['id']]),
+    }
+    if job['status'] == STATUS_PRONTO:
+        dados['download_url'] = reverse('pdf_job_download', args=[job['id']])
+    return dados
+
+
+def resposta_job(job, status=202):
+    """Resposta JSON para o modo assíncrono (submit -> job id)."""
+    return JsonResponse(dados_publicos(job), status=200 if job['status'] == STATUS_PRONTO else status)
+
+
+def resposta_pdf(job):
+    """FileResponse com o PDF do job (já pronto)."""
+    caminho = caminho_artefato(job['chave'])
+    if job['status'] != STATUS_PRONTO or not os.path.exists(caminho):
+        raise Http404("PDF não disponível")
+    response = FileResponse(
+        open(caminho, 'rb'),
+        as_attachment=not job['inline'],
+        filename=job['filename'],
+        content_type='application/pdf',
+    )
+    response['Access-Control-Expose-Headers'] = 'Content-Disposition'
+    return response
+
+
+def _job_do_request(request, job_id):
+    job = obter_job(job_id)
+    # Jobs com dono só são visíveis para o próprio usuário
+    if job is None or (job.get('user_id') and job['user_id'] != request.user.id):
+        raise Http404("Job não encontrado")
+    return job
+
+
+def status_job_view(request, job_id):
+    return JsonResponse(dados_publicos(_job_do_request(request, job_id)))
+
+
+def download_job_view(request, job_id):
+    return resposta_pdf(_job_do_request(request, job_id))